@@ -1,14 +1,69 @@
 from pydantic_settings import BaseSettings
 from pydantic import AnyHttpUrl, field_validator
-from typing import List
+from typing import List, Literal, Optional
 
 class Settings(BaseSettings):
     MONGODB_URI: str
     MONGO_DB_NAME: str = "appdb"
+    # pool de conexões do Motor
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 5
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = 2000
+    MONGO_COMPRESSORS: str = ""  # ex.: "zstd,snappy,zlib" (zstd/snappy exigem libs extras)
+    # read preference das rotas só de leitura (read_db em app/db/mongo.py):
+    # padrão + exceções por rota ("feed=secondaryPreferred,orders=primary")
+    MONGO_READ_PREFERENCE: str = "primary"
+    MONGO_READ_ROUTES: str = ""
+    MONGO_MAX_STALENESS_SECONDS: int = 0  # 0 = sem limite; o Mongo exige >= 90
     JWT_SECRET: str
     JWT_EXPIRES_MIN: int = 60
+    # "jose" (python-jose) ou "pyjwt" (PyJWT, opcional e mais rápido)
+    JWT_BACKEND: Literal["jose", "pyjwt"] = "jose"
+    # tokens já verificados mantidos em memória (0 desliga)
+    TOKEN_CACHE_SIZE: int = 10000
     API_PREFIX: str = "/api"
+    # custo do PBKDF2 e pool que executa hash/verify fora do event loop
+    PASSWORD_HASH_ROUNDS: int = 29000
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
     CORS_ORIGINS: List[AnyHttpUrl] | List[str] = []
+    # checkout/cancelamento em transação (exige replica set ou mongos).
+    # False = modo standalone: sem transação, a reserva de estoque devolve os
+    # anúncios já abatidos se algum faltar (app/services/stock.py).
+    # Sem valor = detecta pelo hello na primeira escrita (setName/mongos -> True).
+    MONGO_TRANSACTIONS: Optional[bool] = None
+    # cache do feed: "memory" (LRU+TTL no processo), "redis" ou "off"
+    CACHE_BACKEND: str = "memory"
+    CACHE_TTL_SECONDS: int = 30
+    CACHE_MAX_ENTRIES: int = 2048
+    REDIS_URL: str = "redis://localhost:6379/0"
+    # uploads de imagens (/listings/upload)
+    MEDIA_DIR: str = "media"
+    UPLOAD_MAX_FILE_MB: int = 10
+    UPLOAD_MAX_REQUEST_MB: int = 40
+    UPLOAD_MAX_FILES: int = 12
+    # processos que geram as miniaturas WebP
+    IMAGE_WORKERS: int = 2
+    # Idempotency-Key de POST /orders, /listings e /cart/checkout
+    IDEMPOTENCY_TTL_SECONDS: int = 86400   # quanto tempo a resposta fica guardada
+    IDEMPOTENCY_LOCK_SECONDS: int = 60     # prazo da 1ª execução antes de outra poder assumir
+    IDEMPOTENCY_WAIT_SECONDS: float = 10   # quanto uma repetição espera a 1ª terminar
+    # painel do vendedor: anúncio ativo com estoque <= isto conta como "estoque baixo"
+    LOW_STOCK_THRESHOLD: int = 2
+    # IDs favoritados por usuário em memória (isFavorite no feed); TTL 0 desliga
+    FAVORITE_SET_TTL_SECONDS: int = 60
+    FAVORITE_SET_MAX_USERS: int = 10000
+    # reaper dos favoritos (anúncios apagados, listingActive desatualizado); 0 desliga
+    FAVORITE_REAPER_INTERVAL_SECONDS: float = 30
+    FAVORITE_REAPER_BATCH: int = 1000
+    # GET /metrics (Prometheus): latência por rota e por comando do Mongo
+    METRICS_ENABLED: bool = True
+    # profiler de consultas lentas: loga/registra find/aggregate acima disto (0 desliga)
+    PROFILE_SLOW_MS: float = 0
+    PROFILE_EXPLAIN: bool = True     # roda explain (executionStats) uma vez por formato
+    PROFILE_MAX_SHAPES: int = 200
+    # usuários (sub do JWT, separados por vírgula) com acesso a /api/admin
+    ADMIN_USER_IDS: str = ""
 
     @field_validator("CORS_ORIGINS", mode="before")
     @classmethod
@@ -1,3 +1,8 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
 from fastapi import Depends, HTTPException, status
 from jose import jwt, JWTError
 from app.core.config import settings
@@ -9,13 +14,138 @@ ALGO = "HS256"
 async def get_db_dep(db=Depends(get_db)):
     return db
 
-def get_current_user_id(request: Request):
+
+# ===== decodificação do JWT =====
+class InvalidToken(Exception):
+    pass
+
+def _decode_jose(token: str) -> dict:
+    try:
+        return jwt.decode(token, settings.JWT_SECRET, algorithms=[ALGO])
+    except JWTError as e:
+        raise InvalidToken(str(e))
+
+def _pyjwt_decoder() -> Callable[[str], dict]:
+    # dependência opcional (PyJWT), mais rápida que python-jose: importada aqui,
+    # na carga do módulo, para faltar no boot e não na primeira requisição
+    try:
+        import jwt as pyjwt
+        pyjwt_error = pyjwt.PyJWTError
+    except (ImportError, AttributeError) as e:
+        raise RuntimeError('JWT_BACKEND="pyjwt" exige o pacote PyJWT (pip install PyJWT)') from e
+
+    def _decode_pyjwt(token: str) -> dict:
+        try:
+            return pyjwt.decode(token, settings.JWT_SECRET, algorithms=[ALGO])
+        except pyjwt_error as e:
+            raise InvalidToken(str(e))
+
+    return _decode_pyjwt
+
+# JWT_BACKEND já vem validado pelo Settings ("jose" ou "pyjwt")
+decode_token: Callable[[str], dict] = _pyjwt_decoder() if settings.JWT_BACKEND == "pyjwt" else _decode_jose
+
+# ===== cache de tokens já verificados =====
+class VerifiedTokenCache:
+    """
+    LRU token -> (sub, exp). Uma entrada vale até o exp do próprio token,
+    então o cache nunca aceita um token que o decode recusaria por expiração.
+
+    Protegido por um lock: get_current_user_id roda no event loop, mas
+    revoke_token pode ser chamado de rotas síncronas (threadpool).
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        # tokens revogados -> exp (guardados só até expirarem)
+        self._revoked: dict = {}
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(token)
+            if entry is None:
+                return None
+            sub, exp = entry
+            if exp <= time.time():
+                self._data.pop(token, None)
+                return None
+            self._data.move_to_end(token)
+            return sub
+
+    def put(self, token: str, sub: str, exp: float) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            # revogado enquanto esta requisição decodificava: não volta para o cache
+            if token in self._revoked:
+                return
+            self._data[token] = (sub, exp)
+            self._data.move_to_end(token)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def revoke(self, token: str, exp: Optional[float] = None) -> None:
+        now = time.time()
+        with self._lock:
+            entry = self._data.pop(token, None)
+            self._revoked[token] = exp or (entry[1] if entry else now + settings.JWT_EXPIRES_MIN * 60)
+            # limpeza preguiçosa dos revogados já expirados
+            for t in [t for t, e in self._revoked.items() if e <= now]:
+                del self._revoked[t]
+
+    def is_revoked(self, token: str) -> bool:
+        with self._lock:
+            return token in self._revoked
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+token_cache = VerifiedTokenCache(settings.TOKEN_CACHE_SIZE)
+
+# ganchos de revogação: fn(sub, claims) -> True se o token deve ser recusado
+# (ex.: usuário desativado). Rodam só na verificação completa (cache miss);
+# quem revogar algo deve chamar revoke_token/token_cache.clear().
+revocation_hooks: List[Callable[[str, dict], bool]] = []
+
+def revoke_token(token: str) -> None:
+    token_cache.revoke(token)
+
+
+async def get_current_user_id(request: Request):
+    # async: roda no event loop, sem o salto para o threadpool de um def síncrono
+    # (cache hit é uma busca no dicionário; o decode HS256 leva microssegundos)
     auth = request.headers.get("Authorization", "")
     if not auth.startswith("Bearer "):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing token")
     token = auth.split(" ", 1)[1]
+
+    sub = token_cache.get(token)
+    if sub is not None:
+        return sub
+
+    if token_cache.is_revoked(token):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[ALGO])
-        return payload["sub"]
-    except JWTError:
+        payload = decode_token(token)
+        sub = payload["sub"]
+    except (InvalidToken, KeyError):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    if any(hook(sub, payload) for hook in revocation_hooks):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+
+    if "exp" in payload:
+        token_cache.put(token, sub, float(payload["exp"]))
+    return sub
+
+
+ADMIN_USER_IDS = frozenset(s.strip() for s in settings.ADMIN_USER_IDS.split(",") if s.strip())
+
+def require_admin(user_id: str = Depends(get_current_user_id)):
+    """Só os usuários de ADMIN_USER_IDS (vazio = ninguém)."""
+    if str(user_id) not in ADMIN_USER_IDS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acesso restrito")
+    return user_id
@@ -0,0 +1,58 @@
+# app/core/fields.py
+"""
+Sparse fieldsets: ?fields=id,title,price nas rotas de lista.
+
+Cada rota declara um FieldSet com os campos da resposta e os campos do
+documento no Mongo que cada um precisa. Com fields= o router lê só esses
+campos (projeção) e devolve só eles; sem fields= nada muda.
+"""
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+from fastapi import HTTPException, Query
+
+# parâmetro de rota: fields: Optional[str] = FIELDS_QUERY
+FIELDS_QUERY = Query(
+    None,
+    description="Campos da resposta separados por vírgula (ex.: id,title,price); omitido = todos",
+)
+
+
+class FieldSet:
+    def __init__(self, sources: Dict[str, Iterable[str]], always: Iterable[str] = ("_id",)):
+        # campo da resposta -> campos do documento necessários para montá-lo
+        self.sources = {name: tuple(src) for name, src in sources.items()}
+        # campos do documento lidos sempre (cursor, ids usados pelo serializer)
+        self.always = tuple(always)
+
+    def parse(self, raw: Optional[str]) -> Optional[FrozenSet[str]]:
+        """Campos pedidos, ou None para todos. 400 em campo desconhecido."""
+        if not raw:
+            return None
+        selected = frozenset(f.strip() for f in raw.split(",") if f.strip())
+        unknown = selected - self.sources.keys()
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"fields inválido: {', '.join(sorted(unknown))} (disponíveis: {', '.join(self.sources)})",
+            )
+        return selected or None
+
+    def projection(self, selected: Optional[FrozenSet[str]], base: Optional[dict] = None) -> Optional[dict]:
+        """Projeção do find; sem seleção devolve base (que pode ser None = documento inteiro)."""
+        if selected is None:
+            return base
+        projection = {f: 1 for f in self.always}
+        for name in selected:
+            for src in self.sources[name]:
+                projection[src] = 1
+        return projection
+
+    def needs(self, selected: Optional[FrozenSet[str]], *names: str) -> bool:
+        """Algum dos campos foi pedido? (para pular trabalho, ex.: buscar o anúncio)"""
+        return selected is None or any(n in selected for n in names)
+
+    @staticmethod
+    def pick(items: List[dict], selected: Optional[FrozenSet[str]]) -> List[dict]:
+        if selected is None:
+            return items
+        return [{k: v for k, v in item.items() if k in selected} for item in items]
@@ -0,0 +1,177 @@
+# app/core/metrics.py
+"""
+Métricas em memória no formato de texto do Prometheus (GET /metrics).
+
+Sem dependência externa: contadores e histogramas com rótulos fixos,
+guardados em dicionários e protegidos por um lock (os eventos do Mongo
+chegam de threads do driver). No caminho quente cada observação é uma
+busca no dicionário, uma bisseção nos limites e três somas.
+
+    http_requests_total{method,route,status}
+    http_request_duration_seconds{method,route}          (histograma)
+    mongo_command_duration_seconds{collection,command}   (histograma)
+    mongo_command_failures_total{collection,command}
+
+route é o template da rota sem o API_PREFIX ("/listings/{listing_id}",
+"/health", "/favorites"), nunca o path cru, para o número de séries não
+crescer com os IDs.
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from app.core.config import settings
+
+# limites (s) dos histogramas de latência
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str]):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_labels(self.labels, labels)} {value:g}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str], buckets: Sequence[float]):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        # por série: [contagem por faixa (não acumulada)..., +Inf, soma]
+        self._series: Dict[Labels, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Labels, seconds: float) -> None:
+        idx = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[idx] += 1
+            series[-1] += seconds
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._series.items()]
+        for labels, series in items:
+            acc = 0
+            for limit, n in zip((*self.buckets, "+Inf"), series):
+                acc += n
+                le = 'le="%s"' % (limit if isinstance(limit, str) else f"{limit:g}")
+                yield f"{self.name}_bucket{_labels(self.labels, labels, le)} {acc}"
+            yield f"{self.name}_sum{_labels(self.labels, labels)} {series[-1]:.6f}"
+            yield f"{self.name}_count{_labels(self.labels, labels)} {acc}"
+
+
+http_requests = Counter(
+    "http_requests_total", "Requisições HTTP por rota e status.", ("method", "route", "status")
+)
+http_latency = Histogram(
+    "http_request_duration_seconds", "Latência das requisições HTTP.", ("method", "route"), HTTP_BUCKETS
+)
+mongo_latency = Histogram(
+    "mongo_command_duration_seconds", "Duração dos comandos do Mongo.", ("collection", "command"), MONGO_BUCKETS
+)
+mongo_failures = Counter(
+    "mongo_command_failures_total", "Comandos do Mongo que falharam.", ("collection", "command")
+)
+
+REGISTRY = (http_requests, http_latency, mongo_latency, mongo_failures)
+
+
+def render(extra: Iterable[str] = ()) -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    lines.extend(extra)
+    return "\n".join(lines) + "\n"
+
+
+def single(name: str, help: str, value: float, kind: str = "gauge") -> Iterable[str]:
+    """Linhas de uma métrica sem rótulos lida de outro módulo (pool de conexões, cache)."""
+    yield f"# HELP {name} {help}"
+    yield f"# TYPE {name} {kind}"
+    yield f"{name} {value:g}"
+
+
+# ===== middleware HTTP =====
+def route_label(route, prefix: str = "") -> str:
+    """Template da rota sem o prefixo da API; "unmatched" sem rota."""
+    path = getattr(route, "path_format", None) or getattr(route, "path", None)
+    if not path:
+        return "unmatched"
+    if prefix and (path == prefix or path.startswith(prefix + "/")):
+        path = path[len(prefix):] or "/"
+    return path
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI puro (sem BaseHTTPMiddleware, que cria uma task por
+    requisição): mede do início até o último chunk da resposta. A rota vem
+    de scope["route"], preenchido pelo roteador durante a chamada; 404 sem
+    rota vira route="unmatched".
+
+    O FastAPI guarda ali a rota original: as de routers incluídos vêm com o
+    template do próprio router ("/listings"), as declaradas direto no router
+    com prefixo vêm com ele ("/api/health"). O prefixo é tirado sempre, para
+    o rótulo não depender de onde a rota foi declarada.
+    """
+
+    def __init__(self, app, prefix: str = ""):
+        self.app = app
+        self.prefix = prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = route_label(route, self.prefix)
+            method = scope["method"]
+            http_requests.inc((method, path, str(status)))
+            http_latency.observe((method, path), time.perf_counter() - start)
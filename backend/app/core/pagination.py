@@ -0,0 +1,71 @@
+# app/core/pagination.py
+"""
+Paginação por cursor (keyset) em (createdAt, _id).
+
+O cursor é opaco para o cliente: base64url de "<createdAt em ms>:<_id>".
+A listagem precisa estar ordenada por {createdAt: -1, _id: -1} para o
+cursor funcionar (o _id desempata anúncios criados no mesmo milissegundo).
+"""
+import base64
+import binascii
+from datetime import datetime, timezone
+from typing import Dict, Optional, Sequence
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# ordenação exigida pelo cursor (usar em .sort() ou no $sort do pipeline)
+KEYSET_SORT = [("createdAt", -1), ("_id", -1)]
+
+
+def _to_millis(dt: datetime) -> int:
+    # o Motor devolve datetimes "naive" em UTC
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+def encode_cursor(created_at: datetime, _id: ObjectId) -> str:
+    raw = f"{_to_millis(created_at)}:{_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, ObjectId]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        millis, oid = base64.urlsafe_b64decode(padded.encode()).decode().split(":", 1)
+        created_at = datetime.fromtimestamp(int(millis) / 1000, tz=timezone.utc)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="cursor inválido")
+    if not ObjectId.is_valid(oid):
+        raise HTTPException(status_code=400, detail="cursor inválido")
+    return created_at, ObjectId(oid)
+
+
+def keyset_match(cursor: str) -> dict:
+    """Filtro "depois do cursor" para ordenação decrescente em (createdAt, _id)."""
+    created_at, oid = decode_cursor(cursor)
+    return {
+        "$or": [
+            {"createdAt": {"$lt": created_at}},
+            {"createdAt": created_at, "_id": {"$lt": oid}},
+        ]
+    }
+
+
+def next_cursor(docs: Sequence[dict], limit: int) -> Optional[str]:
+    """Cursor da próxima página, ou None se esta já é a última."""
+    if len(docs) < limit or not docs:
+        return None
+    last = docs[-1]
+    if last.get("createdAt") is None:
+        return None
+    return encode_cursor(last["createdAt"], last["_id"])
+
+
+def cursor_headers(docs: Sequence[dict], limit: int) -> Dict[str, str]:
+    """Headers com o próximo cursor (o corpo continua sendo a lista)."""
+    cursor = next_cursor(docs, limit)
+    return {NEXT_CURSOR_HEADER: cursor} if cursor else {}
@@ -1,18 +1,75 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
 from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
 
 # Trocar para PBKDF2 (sem limite de 72 bytes e sem lib nativa)
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# min/max = default: hashes com outro custo são refeitos no próximo login
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256"],
+    deprecated="auto",
+    pbkdf2_sha256__default_rounds=settings.PASSWORD_HASH_ROUNDS,
+    pbkdf2_sha256__min_rounds=settings.PASSWORD_HASH_ROUNDS,
+    pbkdf2_sha256__max_rounds=settings.PASSWORD_HASH_ROUNDS,
+)
 ALGO = "HS256"
 
+# PBKDF2 é CPU pura; hashlib libera o GIL, então threads dão paralelismo real
+# e o event loop continua atendendo as outras rotas.
+_hash_executor: Optional[ThreadPoolExecutor] = None
+_pending = 0
+
+
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_password(password: str, hashed: str) -> bool:
     return pwd_context.verify(password, hashed)
 
+def _get_hash_executor() -> ThreadPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="pwhash"
+        )
+    return _hash_executor
+
+async def _run_hashing(fn, *args):
+    """
+    Executa fn no pool de hashing. Acima de PASSWORD_HASH_MAX_PENDING
+    operações na fila responde 503 em vez de acumular latência.
+    """
+    global _pending
+    if _pending >= settings.PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado, tente novamente",
+            headers={"Retry-After": "1"},
+        )
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_hash_executor(), fn, *args)
+    finally:
+        _pending -= 1
+
+async def hash_password_async(password: str) -> str:
+    return await _run_hashing(pwd_context.hash, password)
+
+async def verify_and_update_password(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """(senha confere?, novo hash se os parâmetros mudaram)."""
+    return await _run_hashing(pwd_context.verify_and_update, password, hashed)
+
+def shutdown_hash_executor() -> None:
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+        _hash_executor = None
+
 def create_access_token(sub: str) -> str:
     expire = datetime.utcnow() + timedelta(minutes=settings.JWT_EXPIRES_MIN)
     return jwt.encode({"sub": sub, "exp": expire}, settings.JWT_SECRET, algorithm=ALGO)
@@ -0,0 +1,58 @@
+# app/core/serialization.py
+"""
+Serialização direta para bytes JSON.
+
+As rotas convertem documentos do Mongo em dicts simples (app/services/serializers.py)
+e devolvem JSONBytesResponse. Como a resposta já é um Response, o FastAPI
+não revalida pelo response_model — o response_model continua na rota só
+para o schema do OpenAPI.
+
+orjson é opcional; sem ele cai para o json da stdlib.
+"""
+import json
+from datetime import date, datetime
+from typing import Any, Mapping, Optional
+
+from bson import ObjectId
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
+
+def _default(obj: Any):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Tipo não serializável: {type(obj).__name__}")
+
+
+if orjson is not None:
+    # OPT_UTC_Z: datetimes UTC saem com "Z", como o Pydantic faz
+    _OPTS = orjson.OPT_UTC_Z
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_default, option=_OPTS)
+else:
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class JSONBytesResponse(Response):
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        content: Any,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        background: Optional[BackgroundTask] = None,
+    ):
+        super().__init__(content, status_code, headers, self.media_type, background)
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,161 @@
+# app/db/indexes.py
+"""
+Registro declarativo dos índices de todas as coleções.
+
+Cada consulta dos routers deve ter um índice aqui. Os índices são criados
+uma vez no startup (ensure_indexes) e podem ser comparados com os do banco
+pela linha de comando:
+
+    python -m app.db.indexes            # mostra a diferença (declarado x banco)
+    python -m app.db.indexes --apply    # cria os que faltam
+"""
+import argparse
+import asyncio
+import logging
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# ordenação por recência usada pela paginação por cursor (app/core/pagination.py)
+_RECENT = [("createdAt", DESCENDING), ("_id", DESCENDING)]
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("cpf", ASCENDING)], unique=True),
+    ],
+    "listings": [
+        # busca do feed: sem acento, stemming pt, peso maior no título
+        IndexModel(
+            [("title", TEXT), ("description", TEXT)],
+            name="listings_text",
+            default_language="portuguese",
+            weights={"title": 10, "description": 2},
+        ),
+        # feed sem filtro e feed por categoria
+        IndexModel(_RECENT),
+        IndexModel([("categoryId", ASCENDING), *_RECENT]),
+        # anúncios de um vendedor (propagação do sellerName, "meus anúncios")
+        IndexModel([("sellerId", ASCENDING), *_RECENT]),
+        # anúncios que usam uma imagem (imageVariants preenchido no fim das miniaturas)
+        IndexModel([("images", ASCENDING)]),
+    ],
+    "orders": [
+        IndexModel([("userId", ASCENDING), *_RECENT]),
+        IndexModel([("userId", ASCENDING), ("status", ASCENDING), *_RECENT]),
+    ],
+    "favorites": [
+        # um favorito por (usuário, anúncio)
+        IndexModel([("userId", ASCENDING), ("listingId", ASCENDING)], unique=True),
+        IndexModel([("userId", ASCENDING), *_RECENT]),
+        # GET /favorites?live=true: só favoritos de anúncios ativos
+        IndexModel([("userId", ASCENDING), ("listingActive", ASCENDING), *_RECENT]),
+        # listingActive quando o status do anúncio muda; reaper
+        IndexModel([("listingId", ASCENDING)]),
+    ],
+    "carts": [
+        # um carrinho por usuário
+        IndexModel([("userId", ASCENDING)], unique=True),
+    ],
+    # painel do vendedor: seller_stats é lido pelo _id; ranking de anúncios por vendedor
+    "listing_stats": [
+        IndexModel([("sellerId", ASCENDING), ("unitsSold", DESCENDING), ("_id", ASCENDING)]),
+    ],
+    "idempotency_keys": [
+        # o Mongo apaga a chave quando expiresAt passa (IDEMPOTENCY_TTL_SECONDS)
+        IndexModel([("expiresAt", ASCENDING)], expireAfterSeconds=0),
+    ],
+}
+
+# opções comparadas no diff (além da chave)
+_COMPARED_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression", "weights", "default_language")
+
+
+def _declared(model: IndexModel) -> dict:
+    return dict(model.document)
+
+
+def _key_of(info: dict) -> list:
+    # índices de texto aparecem no banco como [("_fts", "text"), ("_ftsx", 1)]
+    key = list(info["key"].items()) if hasattr(info["key"], "items") else list(info["key"])
+    return [(k, v) for k, v in key if k not in ("_fts", "_ftsx")]
+
+
+def _differs(declared: dict, live: dict) -> List[str]:
+    problems = []
+    if any(v == TEXT for _, v in _key_of(declared)):
+        pass  # a chave do texto é comparada pelos weights
+    elif _key_of(declared) != _key_of(live):
+        problems.append(f"key {_key_of(live)} != {_key_of(declared)}")
+    for opt in _COMPARED_OPTIONS:
+        if opt in declared and declared[opt] != live.get(opt):
+            problems.append(f"{opt} {live.get(opt)!r} != {declared[opt]!r}")
+    return problems
+
+
+async def diff_indexes(db) -> Dict[str, Dict[str, list]]:
+    """
+    Compara o registro com o banco. Para cada coleção devolve:
+    missing (declarado e ausente), extra (no banco e não declarado)
+    e changed (mesmo nome, definição diferente).
+    """
+    report: Dict[str, Dict[str, list]] = {}
+    for col_name, models in INDEXES.items():
+        live = await db[col_name].index_information()
+        live.pop("_id_", None)
+        declared = {m.document["name"]: _declared(m) for m in models}
+
+        missing = [name for name in declared if name not in live]
+        extra = [name for name in live if name not in declared]
+        changed = [
+            (name, problems)
+            for name in declared
+            if name in live and (problems := _differs(declared[name], live[name]))
+        ]
+        report[col_name] = {"missing": missing, "extra": extra, "changed": changed}
+    return report
+
+
+async def ensure_indexes(db) -> None:
+    """
+    Cria todos os índices declarados. Índices já existentes não custam nada.
+    Uma falha (ex.: duplicados impedindo um índice unique) é logada e não
+    derruba o startup.
+    """
+    for col_name, models in INDEXES.items():
+        try:
+            await db[col_name].create_indexes(models)
+        except OperationFailure as e:
+            logger.error("falha ao criar índices de %s: %s", col_name, e)
+
+
+async def _main(apply: bool) -> int:
+    from app.db.mongo import get_db
+
+    db = await get_db()
+    if apply:
+        await ensure_indexes(db)
+
+    report = await diff_indexes(db)
+    dirty = False
+    for col_name, r in report.items():
+        for name in r["missing"]:
+            print(f"[faltando] {col_name}.{name}")
+        for name in r["extra"]:
+            print(f"[extra]    {col_name}.{name}")
+        for name, problems in r["changed"]:
+            print(f"[diferente] {col_name}.{name}: {'; '.join(problems)}")
+        dirty = dirty or bool(r["missing"] or r["changed"])
+    if not dirty:
+        print("índices em dia")
+    return 1 if dirty else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara/cria os índices declarados em app/db/indexes.py")
+    parser.add_argument("--apply", action="store_true", help="cria os índices que faltam antes de comparar")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_main(args.apply)))
@@ -1,14 +1,269 @@
+import threading
+from typing import Optional
+
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+from pymongo.errors import OperationFailure
+from pymongo.read_preferences import read_pref_mode_from_name, make_read_preference
 from app.core.config import settings
+from app.core.metrics import mongo_failures, mongo_latency
+from app.db.profiler import slow_queries
 
 client: AsyncIOMotorClient | None = None
+# resultado da detecção de transações (transactions_enabled)
+_transactions: Optional[bool] = None
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Métricas do pool de conexões (espera no checkout, conexões em uso).
+    Os eventos chegam de threads do driver, por isso o lock.
+    """
+
+    # limites (ms) do histograma de espera no checkout
+    BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.checkout_timeouts = 0
+        self.wait_ms_sum = 0.0
+        self.wait_ms_max = 0.0
+        self.wait_buckets = [0] * (len(self.BUCKETS_MS) + 1)
+        self.in_use = 0
+        self.open_connections = 0
+
+    def _observe_wait(self, seconds: Optional[float]):
+        if seconds is None:
+            return
+        ms = seconds * 1000
+        self.wait_ms_sum += ms
+        self.wait_ms_max = max(self.wait_ms_max, ms)
+        for i, limit in enumerate(self.BUCKETS_MS):
+            if ms <= limit:
+                self.wait_buckets[i] += 1
+                break
+        else:
+            self.wait_buckets[-1] += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self._observe_wait(getattr(event, "duration", None))
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+            if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+                self.checkout_timeouts += 1
+            self._observe_wait(getattr(event, "duration", None))
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    # eventos sem métrica associada
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_check_out_started(self, event): pass
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+                "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+                "openConnections": self.open_connections,
+                "inUse": self.in_use,
+                "checkouts": self.checkouts,
+                "checkoutFailures": self.checkout_failures,
+                "checkoutTimeouts": self.checkout_timeouts,
+                "waitMsAvg": round(self.wait_ms_sum / self.checkouts, 3) if self.checkouts else 0.0,
+                "waitMsMax": round(self.wait_ms_max, 3),
+                "waitMsBuckets": {
+                    **{f"le_{b}": n for b, n in zip(self.BUCKETS_MS, self.wait_buckets)},
+                    "inf": self.wait_buckets[-1],
+                },
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """
+    Duração de cada comando do Mongo por coleção e operação (GET /metrics).
+    A coleção só vem no evento started; fica guardada pelo request_id até
+    o succeeded/failed, que traz a duração medida pelo driver.
+    """
+
+    def __init__(self):
+        self._collections: dict = {}
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        self._collections[event.request_id] = target if isinstance(target, str) else ""
+
+    def _labels(self, event) -> tuple:
+        return self._collections.pop(event.request_id, ""), event.command_name
+
+    def succeeded(self, event):
+        mongo_latency.observe(self._labels(event), event.duration_micros / 1e6)
+
+    def failed(self, event):
+        labels = self._labels(event)
+        mongo_latency.observe(labels, event.duration_micros / 1e6)
+        mongo_failures.inc(labels)
+
+
+command_metrics = CommandMetrics()
+
+
+def client_options() -> dict:
+    opts = {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "waitQueueTimeoutMS": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "event_listeners": [pool_metrics],
+    }
+    if settings.METRICS_ENABLED:
+        opts["event_listeners"].append(command_metrics)
+    if slow_queries.enabled:
+        opts["event_listeners"].append(slow_queries)
+    if settings.MONGO_COMPRESSORS:
+        opts["compressors"] = settings.MONGO_COMPRESSORS
+    return opts
 
 async def get_client() -> AsyncIOMotorClient:
     global client
     if client is None:
-        client = AsyncIOMotorClient(settings.MONGODB_URI)
+        client = AsyncIOMotorClient(settings.MONGODB_URI, **client_options())
     return client
 
+async def open_client() -> AsyncIOMotorClient:
+    """Cria o cliente e faz um ping (falha cedo no startup se o Mongo não responde)."""
+    check_read_routes()  # erro de digitação em MONGO_READ_* aparece aqui, não em cada leitura
+    cli = await get_client()
+    await cli.admin.command("ping")
+    await transactions_enabled()  # decide o modo do checkout já no startup
+    return cli
+
+def close_client() -> None:
+    global client, _transactions
+    if client is not None:
+        client.close()
+        client = None
+    _transactions = None
+
 async def get_db():
     cli = await get_client()
     return cli[settings.MONGO_DB_NAME]
+
+# ===== roteamento de leituras =====
+# Cada rota só de leitura tem um perfil; o modo vem de MONGO_READ_ROUTES
+# (ex.: "feed=secondaryPreferred,orders=primaryPreferred") ou, se o perfil
+# não estiver lá, de MONGO_READ_PREFERENCE. Caminhos que leem logo após
+# escrever (re-fetch do update_listing, get_order após o checkout) usam
+# get_db e ficam sempre no primário.
+READ_ROUTES = ("feed", "favorites", "orders", "users", "sellers")
+
+_read_dbs: dict = {}
+
+
+def _parse_routes(raw: str) -> dict:
+    routes = {}
+    for pair in (raw or "").split(","):
+        if "=" in pair:
+            name, mode = pair.split("=", 1)
+            routes[name.strip()] = mode.strip()
+    return routes
+
+
+def read_preference_for(route: str):
+    mode_name = _parse_routes(settings.MONGO_READ_ROUTES).get(route, settings.MONGO_READ_PREFERENCE)
+    mode = read_pref_mode_from_name(mode_name)
+    # maxStalenessSeconds não vale para primary (e o Mongo exige >= 90s)
+    staleness = settings.MONGO_MAX_STALENESS_SECONDS
+    if mode_name == "primary" or staleness <= 0:
+        staleness = -1
+    return make_read_preference(mode, None, staleness)
+
+
+def check_read_routes() -> None:
+    """Valida MONGO_READ_ROUTES/MONGO_READ_PREFERENCE para todos os perfis (chamado no startup)."""
+    unknown = set(_parse_routes(settings.MONGO_READ_ROUTES)) - set(READ_ROUTES)
+    if unknown:
+        raise ValueError(
+            f"MONGO_READ_ROUTES: rota desconhecida {', '.join(sorted(unknown))} "
+            f"(disponíveis: {', '.join(READ_ROUTES)})"
+        )
+    for route in READ_ROUTES:
+        try:
+            read_preference_for(route)
+        except (ValueError, KeyError) as e:
+            raise ValueError(f"read preference inválida para a rota {route!r}: {e}") from e
+
+
+def read_db(route: str):
+    """
+    Dependency com o banco configurado para a rota `route`.
+    Uso: db = Depends(read_db("feed")).
+    """
+    if route not in READ_ROUTES:
+        raise ValueError(f"rota de leitura desconhecida: {route}")
+
+    async def dependency():
+        cli = await get_client()
+        cached = _read_dbs.get(route)
+        if cached is None or cached.client is not cli:
+            cached = cli.get_database(settings.MONGO_DB_NAME, read_preference=read_preference_for(route))
+            _read_dbs[route] = cached
+        return cached
+
+    return dependency
+
+async def transactions_enabled() -> bool:
+    """
+    MONGO_TRANSACTIONS, ou, se não configurado, se o servidor aceita transações:
+    replica set (setName no hello) ou mongos. Um mongod standalone (o setup de
+    desenvolvimento) cai no modo com compensação em vez de falhar toda escrita.
+    """
+    global _transactions
+    if settings.MONGO_TRANSACTIONS is not None:
+        return settings.MONGO_TRANSACTIONS
+    if _transactions is None:
+        cli = await get_client()
+        try:
+            hello = await cli.admin.command("hello")
+        except (OperationFailure, NotImplementedError):  # servidor antigo / mongomock
+            hello = {}
+        _transactions = bool(hello.get("setName")) or hello.get("msg") == "isdbgrid"
+    return _transactions
+
+async def run_in_transaction(fn):
+    """
+    Executa fn(session) numa transação, com os retries de TransientTransactionError
+    feitos pelo driver. Sem transações (transactions_enabled) chama fn(None).
+    """
+    if not await transactions_enabled():
+        return await fn(None)
+    cli = await get_client()
+    async with await cli.start_session() as session:
+        return await session.with_transaction(fn)
@@ -0,0 +1,232 @@
+# app/db/profiler.py
+"""
+Profiler opcional de consultas lentas (PROFILE_SLOW_MS > 0 liga).
+
+Um CommandListener do PyMongo olha find/aggregate/count/distinct/
+findAndModify. Quando a duração passa de PROFILE_SLOW_MS, a consulta entra
+no registro agrupada pelo "formato": o comando com todos os literais
+trocados por "?" (campos, operadores e estágios do pipeline ficam), então
+o feed com q=tênis e q=bolsa é uma entrada só, e nenhum dado do usuário
+vai para o log.
+
+Na primeira vez que um formato aparece, uma task no event loop roda
+explain (executionStats) do comando original e guarda o resumo: estágios
+do plano (COLLSCAN, IXSCAN...), índice usado, documentos e chaves
+examinados x devolvidos. Cada formato novo gera uma linha de log JSON
+("slow_query"); o registro completo sai em GET /api/admin/slow-queries.
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from pymongo import monitoring
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILED_COMMANDS = frozenset({"find", "aggregate", "count", "distinct", "findAndModify"})
+
+# campos do comando que não fazem parte da consulta (sessão, cluster, leitura)
+_SESSION_FIELDS = frozenset({
+    "lsid", "$db", "$clusterTime", "txnNumber", "autocommit", "startTransaction",
+    "$readPreference", "readConcern", "writeConcern", "maxTimeMS", "comment",
+})
+
+
+def redact(value: Any) -> Any:
+    """Mantém chaves e a estrutura; troca todo literal por "?" (listas de literais viram ["?"])."""
+    if isinstance(value, dict):
+        return {k: redact(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        items = [redact(v) for v in value]
+        if all(i == "?" for i in items):
+            return ["?"] if items else []
+        return items
+    return "?"
+
+
+def query_shape(command_name: str, command: dict) -> dict:
+    shape = {}
+    for key, value in command.items():
+        if key in _SESSION_FIELDS or key == command_name:
+            continue
+        # pipeline e filtros: redigidos; opções escalares (limit, batchSize...) também
+        shape[key] = redact(value)
+    return shape
+
+
+def _plan_stages(plan: Optional[dict]) -> List[str]:
+    """Estágios do plano vencedor, do topo para as folhas."""
+    stages: List[str] = []
+    while isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"] + (f"({plan['indexName']})" if "indexName" in plan else ""))
+        if "inputStage" in plan:
+            plan = plan["inputStage"]
+        elif plan.get("inputStages"):
+            for child in plan["inputStages"]:
+                stages.extend(_plan_stages(child))
+            break
+        elif "queryPlan" in plan:  # formato do SBE
+            plan = plan["queryPlan"]
+        else:
+            break
+    return stages
+
+
+def summarize_explain(explain: dict) -> dict:
+    """COLLSCAN?, índices e docs examinados x devolvidos (find e aggregate)."""
+    planner = explain.get("queryPlanner")
+    stats = explain.get("executionStats")
+    if planner is None and explain.get("stages"):
+        # aggregate: o acesso à coleção fica no primeiro estágio ($cursor)
+        cursor = explain["stages"][0].get("$cursor", {})
+        planner, stats = cursor.get("queryPlanner"), cursor.get("executionStats")
+    stages = _plan_stages((planner or {}).get("winningPlan"))
+    stats = stats or {}
+    return {
+        "stages": stages,
+        "collscan": any(s.startswith("COLLSCAN") for s in stages),
+        "docsExamined": stats.get("totalDocsExamined"),
+        "keysExamined": stats.get("totalKeysExamined"),
+        "returned": stats.get("nReturned"),
+        "executionMs": stats.get("executionTimeMillis"),
+    }
+
+
+class SlowQueryProfiler(monitoring.CommandListener):
+    def __init__(self, threshold_ms: float, max_shapes: int, explain: bool):
+        self.threshold_ms = threshold_ms
+        self.max_shapes = max_shapes
+        self.explain = explain
+        self._started: Dict[int, tuple] = {}
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms > 0
+
+    def start(self, client) -> None:
+        """Guarda o loop e o cliente usados pelo explain (chamado no lifespan)."""
+        self._loop = asyncio.get_running_loop()
+        self._client = client
+
+    def stop(self) -> None:
+        self._loop = None
+        self._client = None
+
+    # ----- eventos do driver (threads do Motor) -----
+    def started(self, event):
+        if event.command_name in PROFILED_COMMANDS:
+            self._started[event.request_id] = (event.database_name, event.command)
+
+    def succeeded(self, event):
+        started = self._started.pop(event.request_id, None)
+        if started is None:
+            return
+        ms = event.duration_micros / 1000
+        if ms >= self.threshold_ms:
+            self._record(event.command_name, started[0], started[1], ms)
+
+    def failed(self, event):
+        self._started.pop(event.request_id, None)
+
+    def _record(self, command_name: str, db_name: str, command: dict, ms: float) -> None:
+        collection = command.get(command_name)
+        shape = query_shape(command_name, command)
+        key = json.dumps([db_name, command_name, collection, shape], sort_keys=True, default=str)
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            entry = self._entries.get(key)
+            is_new = entry is None
+            if is_new:
+                entry = self._entries[key] = {
+                    "database": db_name,
+                    "collection": collection,
+                    "command": command_name,
+                    "shape": shape,
+                    "count": 0,
+                    "totalMs": 0.0,
+                    "maxMs": 0.0,
+                    "firstSeen": now,
+                    "explain": None,
+                }
+                while len(self._entries) > self.max_shapes:
+                    self._entries.popitem(last=False)
+            self._entries.move_to_end(key)
+            entry["count"] += 1
+            entry["totalMs"] += ms
+            entry["maxMs"] = max(entry["maxMs"], ms)
+            entry["lastMs"] = ms
+            entry["lastSeen"] = now
+
+        if not is_new:
+            return
+        # cópias locais: stop() pode zerar self._loop/self._client antes do callback rodar
+        loop, client = self._loop, self._client
+        if self.explain and loop is not None:
+            # o explain é assíncrono: agenda no loop a partir da thread do driver
+            payload = {k: v for k, v in command.items() if k not in _SESSION_FIELDS}
+            coro = self._explain(client, key, db_name, payload, ms)
+            try:
+                loop.call_soon_threadsafe(loop.create_task, coro)
+            except RuntimeError:
+                # loop já fechado (desligamento): fica sem explain
+                coro.close()
+                self._log(entry, ms)
+        else:
+            self._log(entry, ms)
+
+    async def _explain(self, client, key: str, db_name: str, command: dict, ms: float) -> None:
+        summary: Dict[str, Any]
+        try:
+            explain = await client[db_name].command(
+                {"explain": command, "verbosity": "executionStats"}
+            )
+            summary = summarize_explain(explain)
+        except Exception as e:
+            summary = {"error": str(e)}
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry["explain"] = summary
+        self._log(entry, ms)
+
+    def _log(self, entry: dict, ms: float) -> None:
+        logger.warning(json.dumps({
+            "event": "slow_query",
+            "database": entry["database"],
+            "collection": entry["collection"],
+            "command": entry["command"],
+            "ms": round(ms, 3),
+            "shape": entry["shape"],
+            "explain": entry["explain"],
+        }, default=str, ensure_ascii=False))
+
+    # ----- leitura (endpoint de admin) -----
+    def snapshot(self) -> List[dict]:
+        """Formatos registrados, do mais lento (maxMs) para o mais rápido."""
+        with self._lock:
+            entries = [
+                {**e, "avgMs": round(e["totalMs"] / e["count"], 3), "totalMs": round(e["totalMs"], 3)}
+                for e in self._entries.values()
+            ]
+        return sorted(entries, key=lambda e: e["maxMs"], reverse=True)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+slow_queries = SlowQueryProfiler(
+    settings.PROFILE_SLOW_MS, settings.PROFILE_MAX_SHAPES, settings.PROFILE_EXPLAIN
+)
@@ -1,13 +1,28 @@
-from fastapi import FastAPI, APIRouter
+import os
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, APIRouter, Depends
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 
+from app.core import metrics
 from app.core.config import settings
-from app.routers import auth, users
+from app.core.deps import require_admin
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.security import shutdown_hash_executor
+from app.routers import admin, auth, users, sellers
 from app.routers.anuncios import listings
-from app.routers import favorites
+from app.routers import favorite as favorites
 from app.routers import orders
-from app.db.mongo import get_db
+from app.routers import cart
+from app.db.mongo import close_client, open_client, pool_metrics
+from app.db.indexes import ensure_indexes
+from app.db.profiler import slow_queries
+from app.services.cache import feed_cache
+from app.services.favorites import favorite_reaper
+from app.services.idempotency import REPLAYED_HEADER
+from app.services.images import shutdown_executor
+from app.services.media import ContentAddressedStaticFiles, UploadSizeLimit
 
 # --- helpers ---
 def norm_prefix(p: str) -> str:
@@ -22,11 +37,29 @@ def norm_prefix(p: str) -> str:
     return p
 
 API_PREFIX = norm_prefix(settings.API_PREFIX)
-MEDIA_DIR = getattr(settings, "MEDIA_DIR", "media")
+MEDIA_DIR = settings.MEDIA_DIR
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # abre o pool e confere a conexão antes de aceitar requisições
+    cli = await open_client()
+    slow_queries.start(cli)
+    await ensure_indexes(cli[settings.MONGO_DB_NAME])
+    os.makedirs(MEDIA_DIR, exist_ok=True)
+    favorite_reaper.start(cli[settings.MONGO_DB_NAME])
+    try:
+        yield
+    finally:
+        await favorite_reaper.stop()
+        slow_queries.stop()
+        shutdown_executor()
+        shutdown_hash_executor()
+        close_client()
 
 app = FastAPI(
     title="APP API",
     openapi_url=f"{API_PREFIX}/openapi.json" if API_PREFIX else "/openapi.json",
+    lifespan=lifespan,
 )
 
 # CORS (ajuste em produção)
@@ -36,36 +69,60 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, REPLAYED_HEADER],
 )
+# corta uploads grandes antes do parser multipart gravar o corpo em disco
+app.add_middleware(UploadSizeLimit, path=f"{API_PREFIX}/listings/upload")
+# mais externo: mede também o tempo do CORS e das respostas de erro
+app.add_middleware(metrics.MetricsMiddleware, prefix=API_PREFIX)
 
-@app.on_event("startup")
-async def on_startup():
-    # índices e pasta de mídia
-    db = await get_db()
-    await db["users"].create_index("email", unique=True)
-
-    import os
-    os.makedirs(MEDIA_DIR, exist_ok=True)
-
-# --- servir /media ---
-app.mount("/media", StaticFiles(directory=MEDIA_DIR), name="media")
+# --- servir /media --- (pasta criada no lifespan)
+app.mount("/media", ContentAddressedStaticFiles(directory=MEDIA_DIR, check_dir=False), name="media")
 
 # --- rotas com prefixo ---
 api = APIRouter(prefix=API_PREFIX)  # ex: "/api" ou ""
 api.include_router(auth.router)     
 api.include_router(users.router)    
 api.include_router(listings.router) 
+api.include_router(sellers.router)
+api.include_router(admin.router)
 app.include_router(favorites.router)
 app.include_router(orders.router)
+app.include_router(cart.router)
 
 # health simples
 @api.get("/health")
 async def health():
     return {"ok": True}
 
+# contadores do cache do feed; só admin
+@api.get("/cache/stats", dependencies=[Depends(require_admin)])
+async def cache_stats():
+    return feed_cache.stats()
+
+# pool de conexões do Mongo (espera no checkout, conexões em uso); só admin
+@api.get("/db/pool", dependencies=[Depends(require_admin)])
+async def db_pool():
+    return pool_metrics.snapshot()
+
 # registra o grupo /api
 app.include_router(api)
 
+# métricas no formato do Prometheus (sem prefixo, onde o scraper procura)
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    pool = pool_metrics.snapshot()
+    cache = feed_cache.stats()
+    extra = [
+        *metrics.single("mongo_pool_open_connections", "Conexões abertas no pool.", pool["openConnections"]),
+        *metrics.single("mongo_pool_in_use", "Conexões do pool em uso.", pool["inUse"]),
+        *metrics.single("mongo_pool_checkout_timeouts_total", "Checkouts que estouraram o waitQueueTimeoutMS.",
+                        pool["checkoutTimeouts"], "counter"),
+        *metrics.single("feed_cache_hits_total", "Acertos do cache do feed.", cache["hits"], "counter"),
+        *metrics.single("feed_cache_misses_total", "Faltas do cache do feed.", cache["misses"], "counter"),
+    ]
+    return Response(metrics.render(extra), media_type=metrics.CONTENT_TYPE)
+
 # raiz sem prefixo (opcional)
 @app.get("/")
 async def root():
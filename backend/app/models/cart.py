@@ -0,0 +1,60 @@
+# app/models/cart.py
+from typing import List, Optional
+from datetime import datetime
+from pydantic import BaseModel, Field, ConfigDict
+
+
+class CartItemIn(BaseModel):
+    """
+    Adicionar ao carrinho. Se o anúncio já estiver lá, soma a quantidade.
+    """
+    model_config = ConfigDict(extra="forbid")
+
+    listingId: str = Field(..., description="ID do anúncio (ObjectId em string)")
+    quantity: int = Field(1, ge=1, le=999)
+
+
+class CartItemUpdate(BaseModel):
+    """
+    Nova quantidade de um item (para remover use DELETE).
+    """
+    model_config = ConfigDict(extra="forbid")
+
+    quantity: int = Field(..., ge=1, le=999)
+
+
+class CartCheckoutIn(BaseModel):
+    """
+    Dados de entrega do pedido gerado pelo carrinho.
+    """
+    model_config = ConfigDict(extra="forbid")
+
+    shippingAddress: Optional[str] = Field(None, max_length=300)
+    notes: Optional[str] = Field(None, max_length=300)
+
+
+class CartItemOut(BaseModel):
+    """
+    Item com o snapshot do anúncio (preço/estoque da última validação).
+    """
+    listingId: str
+    title: str
+    unitPrice: float
+    quantity: int
+    lineTotal: float
+    stock: int
+    available: bool = Field(..., description="Anúncio ativo e com estoque para a quantidade")
+    thumbnail: Optional[str] = None
+
+
+class CartOut(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    items: List[CartItemOut] = Field(default_factory=list)
+    subtotal: float = 0.0
+    itemCount: int = 0
+    updatedAt: Optional[datetime] = None
+    changed: List[str] = Field(
+        default_factory=list,
+        description="Anúncios que mudaram desde o snapshot e foram atualizados nesta leitura",
+    )
@@ -59,9 +59,17 @@ class ListingOut(BaseModel):
     stock: int
     categoryId: str
     images: List[str] = Field(default_factory=list)
+    thumbnail: Optional[str] = None  # miniatura WebP da capa (cai para images[0])
     status: Status
-    sellerName: Optional[str] = None  # preenchido no GET /listings via $lookup
+    sellerName: Optional[str] = None  # snapshot do vendedor gravado no anúncio
+    isFavorite: bool = False  # o usuário da requisição favoritou este anúncio
     
+# POST /listings/batch
+class ListingBatchIn(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    ids: List[str] = Field(..., min_length=1, max_length=100, description="IDs dos anúncios (ObjectId em string)")
+
 # PATCH
 class ListingUpdate(BaseModel):
     model_config = ConfigDict(extra="forbid")
@@ -75,3 +75,16 @@ class OrderOut(BaseModel):
     notes: Optional[str] = None
     createdAt: datetime
     updatedAt: datetime
+
+
+class OrderSummaryOut(BaseModel):
+    """
+    Linha do histórico de pedidos (GET /orders?summary=true):
+    sem a lista de itens, só a contagem e a miniatura do primeiro.
+    """
+    id: str
+    status: OrderStatus
+    total: float
+    itemCount: int
+    thumbnail: Optional[str] = None
+    createdAt: datetime
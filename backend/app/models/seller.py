@@ -0,0 +1,24 @@
+# app/models/seller.py
+from typing import Optional
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class SellerStatsOut(BaseModel):
+    """
+    Painel do vendedor (contadores materializados em seller_stats).
+    Pedidos cancelados não contam.
+    """
+    sellerId: str
+    unitsSold: int
+    revenue: float
+    orders: int
+    activeListings: int
+    lowStockCount: int
+    updatedAt: Optional[datetime] = None
+
+
+class ListingStatsOut(BaseModel):
+    listingId: str
+    unitsSold: int
+    revenue: float
@@ -0,0 +1,33 @@
+# app/routers/admin.py
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, status
+
+from app.core.config import settings
+from app.core.deps import require_admin
+from app.core.serialization import JSONBytesResponse
+from app.db.profiler import slow_queries
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+# ===== GET /admin/slow-queries =====
+@router.get("/slow-queries")
+async def list_slow_queries(
+    admin_id: Annotated[str, Depends(require_admin)],
+):
+    """Formatos de consulta acima de PROFILE_SLOW_MS, com o resumo do explain."""
+    return JSONBytesResponse({
+        "enabled": slow_queries.enabled,
+        "thresholdMs": settings.PROFILE_SLOW_MS,
+        "queries": slow_queries.snapshot(),
+    })
+
+
+# ===== DELETE /admin/slow-queries =====
+@router.delete("/slow-queries", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_slow_queries(
+    admin_id: Annotated[str, Depends(require_admin)],
+):
+    slow_queries.reset()
+    return None
@@ -2,19 +2,49 @@
 from typing import Annotated, List, Optional
 from fastapi import (
     APIRouter, Depends, HTTPException, status, Query, Path,
-    UploadFile, File, Request
+    UploadFile, File, Request, BackgroundTasks
 )
 from bson import ObjectId
+from pymongo import ReturnDocument
+from starlette.concurrency import run_in_threadpool
 from datetime import datetime, timezone
-import os, shutil
-from uuid import uuid4
 
-from app.models.listing import ListingIn, ListingOut, ListingUpdate
-from app.db.mongo import get_db
+from app.models.listing import ListingBatchIn, ListingIn, ListingOut, ListingUpdate
+from app.db.mongo import get_db, read_db
 from app.core.deps import get_current_user_id
+from app.core.fields import FIELDS_QUERY
+from app.core.pagination import KEYSET_SORT, NEXT_CURSOR_HEADER, encode_cursor, keyset_match
+from app.core.serialization import JSONBytesResponse
+from app.services.cache import feed_cache
+from app.services.favorites import favorite_ids, favorites_wanted, mark_favorites, set_listing_active
+from app.services.idempotency import IdempotencyKey, idempotent
+from app.services.images import fill_missing_variants, generate_variants, image_variants, pending_variants
+from app.services.loaders import ListingLoader, listing_loader
+from app.services.media import ensure_media_dir, save_uploads
+from app.services.seller_stats import record_listing_change
+from app.services.sellers import get_seller_name
+from app.services.serializers import LISTING_FIELDS, listing_out
 
 router = APIRouter(prefix="/listings", tags=["Listings"])
 
+# campos lidos pelo feed
+FEED_PROJECTION = {
+    "_id": 1,
+    "title": 1,
+    "description": 1,
+    "price": 1,
+    "stock": 1,
+    "categoryId": 1,
+    "images": 1,
+    "imageVariants": 1,
+    "status": 1,
+    "sellerName": 1,
+    "createdAt": 1,
+}
+
+# anúncios lidos a mais nas páginas com cursor (os do próprio usuário saem depois do cache)
+FEED_OVERFETCH = 10
+
 # ===== utils =====
 
 def now_utc():
@@ -43,50 +73,77 @@ def base_url(req: Request) -> str:
     # Ex.: http://192.168.1.21:8000
     return str(req.base_url).rstrip("/")
 
-def ensure_media_dir() -> str:
-    media_dir = os.path.abspath("media")
-    os.makedirs(media_dir, exist_ok=True)
-    return media_dir
+def build_text_search(q: Optional[str]) -> Optional[str]:
+    """
+    Normaliza o termo de busca para o operador $text.
+    Acentos/maiúsculas já são ignorados pelo índice (versão 3, idioma portuguese),
+    então aqui só limpamos espaços e caracteres de controle do $search (aspas e "-").
+    """
+    if not q:
+        return None
+    terms = [t.strip('"-') for t in q.split()]
+    terms = [t for t in terms if t]
+    return " ".join(terms) or None
+
+async def attach_variants(db, urls: List[str], origin: str) -> None:
+    """Grava imageVariants que ficaram prontos depois do anúncio e tira as páginas velhas do cache."""
+    updated = await fill_missing_variants(db["listings"], urls, origin)
+    if updated:
+        await feed_cache.invalidate_listings(str(i) for i in updated)
+
+
+async def _variants_after_upload(db, media_dir: str, names: List[str], urls: List[str], origin: str) -> None:
+    await generate_variants(media_dir, names)
+    # anúncios criados enquanto as miniaturas eram geradas ficaram sem imageVariants
+    await attach_variants(db, urls, origin)
+
 
 # ===== UPLOAD (novo) =====
 @router.post("/upload", response_model=List[str], status_code=status.HTTP_201_CREATED)
 async def upload_images(
     request: Request,
+    background: BackgroundTasks,
     files: List[UploadFile] = File(...),
     user_id: Annotated[str, Depends(get_current_user_id)] = None,  # se quiser exigir login
+    db = Depends(get_db),
 ):
     """
     Recebe imagens via multipart e devolve URLs públicas em /media.
+    Cópia para o disco em pedaços, fora do event loop, com limites de tamanho.
+    As miniaturas WebP são geradas depois da resposta (app/services/images.py)
+    e gravadas nos anúncios que já usam essas imagens.
     """
-    media_dir = ensure_media_dir()
-    urls: List[str] = []
     base = base_url(request)
-
-    for f in files:
-        # nome seguro
-        _, ext = os.path.splitext(f.filename or "")
-        ext = (ext or ".jpg").lower()
-        name = f"{uuid4().hex}{ext}"
-        dest = os.path.join(media_dir, name)
-        with open(dest, "wb") as out:
-            shutil.copyfileobj(f.file, out)
-        urls.append(f"{base}/media/{name}")
-
+    names = await save_uploads(files)
+    urls = [f"{base}/media/{name}" for name in names]
+    background.add_task(
+        _variants_after_upload, db, ensure_media_dir(), names, urls, request.base_url.netloc
+    )
     return urls
 
 # ===== CREATE =====
 @router.post("", response_model=ListingOut, status_code=status.HTTP_201_CREATED)
 async def create_listing(
+    request: Request,
     payload: ListingIn,
     user_id: Annotated[str, Depends(get_current_user_id)],
     db = Depends(get_db),
+    idempotency_key: IdempotencyKey = None,
 ):
+    # repetição com a mesma Idempotency-Key devolve o anúncio já criado
+    return await idempotent(
+        db, idempotency_key, f"{user_id}:POST /listings", payload,
+        lambda: _create_listing(payload, user_id, db, request.base_url.netloc),
+    )
+
+async def _create_listing(payload: ListingIn, user_id: str, db, origin: str = "") -> JSONBytesResponse:
     listings = db["listings"]
 
     # sellerId como ObjectId se válido; senão string
     seller_id = ObjectId(user_id) if ObjectId.is_valid(user_id) else user_id
 
     category_oid = to_object_id_or_400(payload.categoryId, "categoryId")
+    images = normalize_image_urls(payload.images)  # filtra apenas http/https
 
     doc = {
         "title": payload.title.strip(),
@@ -94,9 +151,12 @@ async def create_listing(
         "price": float(payload.price),
         "stock": int(payload.stock),
         "categoryId": category_oid,
-        "images": normalize_image_urls(payload.images),  # filtra apenas http/https
+        "images": images,
+        "imageVariants": await run_in_threadpool(image_variants, images, origin),
         "status": payload.status,
         "sellerId": seller_id,
+        # snapshot do vendedor; mantido em dia por propagate_seller_name
+        "sellerName": await get_seller_name(db, user_id),
         "createdAt": now_utc(),
         "updatedAt": now_utc(),
     }
@@ -106,121 +166,172 @@ async def create_listing(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao inserir anúncio: {e}")
 
-    return ListingOut(
-        id=str(result.inserted_id),
-        title=doc["title"],
-        description=doc["description"],
-        price=doc["price"],
-        stock=doc["stock"],
-        categoryId=str(doc["categoryId"]),
-        images=doc["images"],
-        status=doc["status"],
-    )
+    # o anúncio novo pode entrar no feed geral e no da categoria
+    await feed_cache.invalidate_categories([str(category_oid)])
+    await record_listing_change(db, seller_id, None, doc)
+
+    doc["_id"] = result.inserted_id
+    # miniaturas terminadas entre a checagem acima e o insert: o fim da geração não viu o anúncio
+    pending = pending_variants(images, doc["imageVariants"], origin)
+    if pending:
+        await attach_variants(db, pending, origin)
+    return JSONBytesResponse(listing_out(doc), status_code=status.HTTP_201_CREATED)
 
 # ===== LIST =====
 @router.get("", response_model=List[ListingOut])
 async def list_listings(
     user_id: Annotated[str, Depends(get_current_user_id)],
-    db = Depends(get_db),
-    q: Optional[str] = Query(None, description="Busca por título/descrição (case-insensitive)"),
+    db = Depends(read_db("feed")),
+    q: Optional[str] = Query(None, description="Busca por título/descrição (ignora acentos e maiúsculas, ordena por relevância)"),
     categoryId: Optional[str] = Query(None, description="ObjectId da categoria"),
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor opaco do header X-Next-Cursor (substitui page)"),
+    fields: Optional[str] = FIELDS_QUERY,
 ):
     listings = db["listings"]
 
-    # Excluir anúncios do usuário atual (cobre sellerId salvo como string e/ou ObjectId)
-    exclude_vals = [user_id]
-    if ObjectId.is_valid(user_id):
-        exclude_vals.append(ObjectId(user_id))
-
-    pipeline = [
-        {"$match": {"sellerId": {"$nin": exclude_vals}}},
-    ]
-
-    # Busca por texto em title/description
-    if q:
-        pipeline.append({
-            "$match": {
-                "$or": [
-                    {"title": {"$regex": q, "$options": "i"}},
-                    {"description": {"$regex": q, "$options": "i"}},
-                ]
-            }
-        })
+    search = build_text_search(q)
+    selected = LISTING_FIELDS.parse(fields)
+
+    # a chave é só a consulta: a página é a mesma para todos os usuários e os
+    # anúncios de quem pede saem depois da leitura (own_listings_removed)
+    cache_key = feed_cache.make_key(
+        q=search.lower() if search else None,
+        categoryId=categoryId,
+        page=None if cursor else page,
+        limit=limit,
+        cursor=cursor,
+        fields=",".join(sorted(selected)) if selected else None,
+    )
+    # isFavorite não vai para o cache: é marcado a cada requisição pelo conjunto de favoritos
+    mark = favorites_wanted(selected)
+    favs = await favorite_ids.get(db["favorites"], user_id) if mark else frozenset()
+
+    page_doc = await feed_cache.get(cache_key)
+    if page_doc is None:
+        page_doc = await _feed_page(listings, search, categoryId, cursor, page, limit, selected)
+        await feed_cache.set(cache_key, page_doc, listing_ids=page_doc["ids"], category=categoryId)
+
+    items, ids, headers = own_listings_removed(page_doc, user_id, limit, keyset=not search)
+    return JSONBytesResponse(mark_favorites(items, ids, favs, mark), headers=headers)
+
+
+async def _feed_page(listings, search, categoryId, cursor, page, limit, selected) -> dict:
+    """
+    Página do feed igual para todos os usuários (vai para o cache).
+
+    Com cursor lê FEED_OVERFETCH anúncios a mais, para a página continuar
+    com `limit` itens depois de tirar os do próprio usuário; com page= a
+    janela é exata (sobras repetiriam itens na página seguinte), então um
+    vendedor pode ver uma página com menos itens.
+    """
+    match: dict = {}
+
+    # Busca textual em title/description via índice de texto (listings_text)
+    if search:
+        match["$text"] = {"$search": search}
 
     # Filtro por categoria
     if categoryId:
-        match_cat = ObjectId(categoryId) if ObjectId.is_valid(categoryId) else categoryId
-        pipeline.append({"$match": {"categoryId": match_cat}})
-
-    # Lookup nos usuários para obter o nome do vendedor (full_name)
-    pipeline += [
-        {
-            "$lookup": {
-                "from": "users",
-                "let": {"sid": "$sellerId"},
-                "pipeline": [
-                    {"$match": {"$expr": {
-                        "$or": [
-                            {"$eq": ["$_id", "$$sid"]},   # quando sellerId é ObjectId
-                            {"$eq": ["$id", "$$sid"]},    # quando users.id (string) = sellerId (string)
-                        ]
-                    }}},
-                    {"$project": {"_id": 0, "full_name": 1}}
-                ],
-                "as": "seller"
-            }
-        },
-        {
-            "$addFields": {
-                "sellerName": {
-                    "$ifNull": [
-                        {"$arrayElemAt": ["$seller.full_name", 0]},
-                        None
-                    ]
-                }
-            }
-        },
-        {
-            "$project": {
-                "_id": 1,
-                "title": 1,
-                "description": 1,
-                "price": 1,
-                "stock": 1,
-                "categoryId": 1,
-                "images": 1,
-                "status": 1,
-                "sellerName": 1,
-                "createdAt": 1
-            }
-        },
-        {"$sort": {"createdAt": -1}},
-        {"$skip": (page - 1) * limit},
-        {"$limit": limit},
-    ]
-
-    docs = await listings.aggregate(pipeline).to_list(length=limit)
-
-    return [
-        ListingOut(
-            id=str(d["_id"]),
-            title=d.get("title", ""),
-            description=d.get("description", ""),
-            price=float(d.get("price", 0)),
-            stock=int(d.get("stock", 0)),
-            categoryId=str(d.get("categoryId")) if d.get("categoryId") is not None else "",
-            images=[str(u) for u in (d.get("images") or [])],
-            status=d.get("status", "active"),
-            sellerName=d.get("sellerName"),
-        )
-        for d in docs
-    ]
+        match["categoryId"] = ObjectId(categoryId) if ObjectId.is_valid(categoryId) else categoryId
+
+    if cursor:
+        if search:
+            raise HTTPException(status_code=400, detail="cursor não é suportado junto com q; use page")
+        match.update(keyset_match(cursor))
+
+    # sellerName já vem gravado no anúncio (snapshot do vendedor), sem $lookup em users
+    projection = dict(LISTING_FIELDS.projection(selected, FEED_PROJECTION))
+    projection["sellerId"] = 1  # para tirar os anúncios de quem pede
+    if search:
+        projection["score"] = {"$meta": "textScore"}
+        # com busca: mais relevantes primeiro; empate -> mais recentes
+        sort = [("score", {"$meta": "textScore"}), ("createdAt", -1)]
+    else:
+        sort = KEYSET_SORT
+
+    fetch = limit + (FEED_OVERFETCH if cursor else 0)
+    docs = await (
+        listings
+        .find(match, projection)
+        .sort(sort)
+        .skip(0 if cursor else (page - 1) * limit)
+        .limit(fetch)
+    ).to_list(length=fetch)
+    return {
+        "items": LISTING_FIELDS.pick([listing_out(d) for d in docs], selected),
+        "ids": [str(d["_id"]) for d in docs],
+        "sellers": [str(d.get("sellerId")) for d in docs],
+        # cursor "depois deste anúncio", para o X-Next-Cursor de cada usuário
+        "cursors": [
+            encode_cursor(d["createdAt"], d["_id"]) if d.get("createdAt") else None for d in docs
+        ],
+        "fetched": fetch,
+    }
+
+
+def own_listings_removed(page_doc: dict, user_id: str, limit: int, keyset: bool):
+    """Itens, ids e headers da página sem os anúncios do próprio usuário."""
+    keep = [i for i, seller in enumerate(page_doc["sellers"]) if seller != str(user_id)]
+    cursors = page_doc["cursors"]
+    next_cursor = None
+    if len(keep) > limit:
+        keep = keep[:limit]
+        next_cursor = cursors[keep[-1]]
+    elif len(cursors) == page_doc["fetched"]:
+        # janela cheia: a próxima página começa depois do último lido (mesmo se era do usuário)
+        next_cursor = cursors[-1]
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if keyset and next_cursor else {}
+    items = [page_doc["items"][i] for i in keep]
+    ids = [page_doc["ids"][i] for i in keep]
+    return items, ids, headers
+
+# ===== GET por id =====
+@router.get("/{listing_id}", response_model=ListingOut)
+async def get_listing(
+    listing_id: Annotated[str, Path(..., description="ID do anúncio (ObjectId)")],
+    user_id: Annotated[str, Depends(get_current_user_id)],
+    db = Depends(read_db("feed")),
+    loader: ListingLoader = Depends(listing_loader("feed")),
+    fields: Optional[str] = FIELDS_QUERY,
+):
+    """Página do produto: preço e estoque atuais de um anúncio."""
+    selected = LISTING_FIELDS.parse(fields)
+    doc = await loader.load(to_object_id_or_400(listing_id, "listing_id"))
+    if not doc:
+        raise HTTPException(status_code=404, detail="Anúncio não encontrado")
+    mark = favorites_wanted(selected)
+    favs = await favorite_ids.get(db["favorites"], user_id) if mark else frozenset()
+    items = mark_favorites(LISTING_FIELDS.pick([listing_out(doc)], selected), [str(doc["_id"])], favs, mark)
+    return JSONBytesResponse(items[0])
+
+# ===== BATCH =====
+@router.post("/batch", response_model=List[ListingOut])
+async def get_listings_batch(
+    payload: ListingBatchIn,
+    user_id: Annotated[str, Depends(get_current_user_id)],
+    db = Depends(read_db("feed")),
+    loader: ListingLoader = Depends(listing_loader("feed")),
+    fields: Optional[str] = FIELDS_QUERY,
+):
+    """
+    Vários anúncios numa consulta só ($in no _id, com projeção), na ordem pedida.
+    IDs repetidos são ignorados; os que não existem ficam de fora da resposta.
+    O carrinho costuma pedir só fields=id,price,stock,status.
+    """
+    selected = LISTING_FIELDS.parse(fields)
+    oids = list(dict.fromkeys(to_object_id_or_400(i, "ids") for i in payload.ids))
+    docs = [d for d in await loader.load_many(oids) if d]
+    mark = favorites_wanted(selected)
+    favs = await favorite_ids.get(db["favorites"], user_id) if mark else frozenset()
+    items = LISTING_FIELDS.pick([listing_out(d) for d in docs], selected)
+    return JSONBytesResponse(mark_favorites(items, [str(d["_id"]) for d in docs], favs, mark))
 
 # ===== PATCH =====
 @router.patch("/{listing_id}", response_model=ListingOut)
 async def update_listing(
+    request: Request,
     listing_id: Annotated[str, Path(..., description="ID do anúncio (ObjectId)")],
     payload: ListingUpdate,
     user_id: Annotated[str, Depends(get_current_user_id)],
@@ -258,24 +369,42 @@ async def update_listing(
         to_set["stock"] = int(payload.stock)
     if payload.images is not None:
         to_set["images"] = normalize_image_urls(payload.images)
+        to_set["imageVariants"] = await run_in_threadpool(
+            image_variants, to_set["images"], request.base_url.netloc
+        )
     if payload.status is not None:
         to_set["status"] = payload.status
     if payload.categoryId is not None:
         to_set["categoryId"] = to_object_id_or_400(payload.categoryId, "categoryId")
 
+    # o documento de antes vem da própria escrita (não do find_one acima): um checkout
+    # entre os dois mudaria o estoque e o painel do vendedor contaria a diferença duas vezes
     try:
-        await listings.update_one({"_id": _id}, {"$set": to_set})
+        before = await listings.find_one_and_update(
+            {"_id": _id, "sellerId": doc["sellerId"]},
+            {"$set": to_set},
+            projection={"sellerId": 1, "stock": 1, "status": 1, "categoryId": 1},
+            return_document=ReturnDocument.BEFORE,
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao atualizar: {e}")
+    if before is None:
+        raise HTTPException(status_code=404, detail="Anúncio não encontrado")
+
+    await feed_cache.invalidate_listings([listing_id])
+    if "imageVariants" in to_set:
+        # mesma corrida do create: miniaturas prontas depois da checagem
+        pending = pending_variants(to_set["images"], to_set["imageVariants"], request.base_url.netloc)
+        if pending:
+            await attach_variants(db, pending, request.base_url.netloc)
+    if "status" in to_set or "stock" in to_set:
+        await record_listing_change(db, before["sellerId"], before, {**before, **to_set})
+    if "status" in to_set and to_set["status"] != before.get("status"):
+        await set_listing_active(db["favorites"], [_id], to_set["status"] == "active")
+    # categoria/texto mudaram: o anúncio pode entrar em páginas onde ainda não estava
+    if any(k in to_set for k in ("categoryId", "title", "description")):
+        cats = {before.get("categoryId"), to_set.get("categoryId")} - {None}
+        await feed_cache.invalidate_categories(str(c) for c in cats)
 
     updated = await listings.find_one({"_id": _id})
-    return ListingOut(
-        id=str(updated["_id"]),
-        title=updated.get("title", ""),
-        description=updated.get("description", ""),
-        price=float(updated.get("price", 0)),
-        stock=int(updated.get("stock", 0)),
-        categoryId=str(updated.get("categoryId")) if updated.get("categoryId") is not None else "",
-        images=[str(u) for u in (updated.get("images") or [])],
-        status=updated.get("status", "active"),
-    )
\ No newline at end of file
+    return JSONBytesResponse(listing_out(updated))
\ No newline at end of file
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from app.schemas.user import UserCreate, UserPublic, LoginRequest
 from app.schemas.auth import Token
-from app.core.security import hash_password, verify_password, create_access_token
+from app.core.security import hash_password_async, verify_and_update_password, create_access_token
 from app.core.deps import get_db_dep
 from datetime import datetime
+from pymongo.errors import DuplicateKeyError
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -11,10 +12,6 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 async def register_user(payload: UserCreate, db = Depends(get_db_dep)):
     col = db["users"]
 
-    # garanta índices únicos
-    await col.create_index("email", unique=True)
-    await col.create_index("cpf", unique=True)
-
     # conflitos comuns
     existing_email = await col.find_one({"email": payload.email})
     if existing_email:
@@ -29,11 +26,15 @@ async def register_user(payload: UserCreate, db = Depends(get_db_dep)):
         "full_name": payload.full_name.strip(),
         "cpf": payload.cpf,           # já validado/normalizado (apenas dígitos)
         "phone": payload.phone,       # já normalizado (apenas dígitos)
-        "hashed_password": hash_password(payload.password),
+        "hashed_password": await hash_password_async(payload.password),
         "is_active": True,
         "created_at": datetime.utcnow(),
     }
-    res = await col.insert_one(doc)
+    try:
+        res = await col.insert_one(doc)
+    except DuplicateKeyError:
+        # corrida entre dois cadastros iguais (índices unique em app/db/indexes.py)
+        raise HTTPException(status_code=409, detail="Email ou CPF já registrado")
 
     return UserPublic(
         id=str(res.inserted_id),
@@ -48,10 +49,16 @@ async def register_user(payload: UserCreate, db = Depends(get_db_dep)):
 async def login(payload: LoginRequest, db = Depends(get_db_dep)):
     col = db["users"]
     user = await col.find_one({"email": payload.email})
-    if not user or not verify_password(payload.password, user["hashed_password"]):
+    ok, new_hash = (False, None)
+    if user:
+        ok, new_hash = await verify_and_update_password(payload.password, user["hashed_password"])
+    if not ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Credenciais inválidas"
         )
+    if new_hash:
+        # custo do hash mudou (PASSWORD_HASH_ROUNDS): regrava com os parâmetros atuais
+        await col.update_one({"_id": user["_id"]}, {"$set": {"hashed_password": new_hash}})
     token = create_access_token(str(user["_id"]))
     return Token(access_token=token)
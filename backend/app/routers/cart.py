@@ -0,0 +1,273 @@
+# app/routers/cart.py
+from typing import Annotated
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, status, Path
+from bson import ObjectId
+
+from app.db.mongo import get_db, run_in_transaction
+from app.core.deps import get_current_user_id
+from app.core.serialization import JSONBytesResponse
+from app.models.cart import CartCheckoutIn, CartItemIn, CartItemUpdate, CartOut
+from app.models.order import OrderOut
+from app.services.cache import feed_cache
+from app.services.carts import (
+    MAX_CART_ITEMS, CartConflict, changed_listings, find_item, line_total,
+    mutate_cart, refresh_update, reserve_guards, snapshot,
+)
+from app.services.idempotency import IdempotencyKey, idempotent
+from app.services.loaders import ListingLoader, listing_loader
+from app.services.orders import order_item, place_order
+from app.services.serializers import cart_out, order_out
+from app.services.stock import InsufficientStock
+
+router = APIRouter(prefix="/cart", tags=["Cart"])
+
+
+# ===== utils =====
+def now_utc():
+    return datetime.now(timezone.utc)
+
+
+def to_object_id_or_400(value: str, field_name: str = "id") -> ObjectId:
+    if not ObjectId.is_valid(value):
+        raise HTTPException(status_code=400, detail=f"{field_name} inválido")
+    return ObjectId(value)
+
+
+def check_available(listing: dict, quantity: int) -> None:
+    if listing.get("status", "active") != "active":
+        raise HTTPException(status_code=400, detail="Anúncio indisponível")
+    if quantity > int(listing.get("stock", 0)):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Estoque insuficiente para o anúncio '{listing.get('title', '')}'"
+        )
+
+
+async def save(carts, user_id: str, build):
+    try:
+        return await mutate_cart(carts, str(user_id), build)
+    except CartConflict:
+        raise HTTPException(status_code=409, detail="Carrinho alterado por outra requisição, tente de novo")
+
+
+# ===== GET /cart =====
+@router.get("", response_model=CartOut)
+async def get_cart(
+    user_id: Annotated[str, Depends(get_current_user_id)],
+    db = Depends(get_db),
+):
+    """
+    Carrinho com os snapshots revalidados: só os anúncios alterados desde
+    o snapshot são relidos; os que mudaram aparecem em `changed`.
+    """
+    carts = db["carts"]
+
+    cart = await carts.find_one({"userId": str(user_id)})
+    if not cart or not cart.get("items"):
+        return JSONBytesResponse(cart_out(cart))
+
+    changed = await changed_listings(db["listings"], cart["items"])
+    if changed:
+        cart = await save(carts, user_id, lambda c: c and refresh_update(c, changed))
+    return JSONBytesResponse(cart_out(cart, changed))
+
+
+# ===== POST /cart/items =====
+@router.post("/items", response_model=CartOut)
+async def add_cart_item(
+    payload: CartItemIn,
+    user_id: Annotated[str, Depends(get_current_user_id)],
+    db = Depends(get_db),
+    loader: ListingLoader = Depends(listing_loader()),
+):
+    listing_oid = to_object_id_or_400(payload.listingId, "listingId")
+
+    listing = await loader.load(listing_oid)
+    if not listing:
+        raise HTTPException(status_code=404, detail="Anúncio não encontrado")
+
+    def build(cart):
+        idx, item = find_item(cart, listing_oid)
+        quantity = payload.quantity + (item["quantity"] if item else 0)
+        check_available(listing, quantity)
+
+        fresh = snapshot(listing, quantity, item["addedAt"] if item else None)
+        if item is None:
+            if len((cart or {}).get("items", [])) >= MAX_CART_ITEMS:
+                raise HTTPException(status_code=400, detail=f"O carrinho aceita até {MAX_CART_ITEMS} anúncios")
+            return {
+                "$push": {"items": fresh},
+                "$inc": {"subtotal": line_total(fresh), "itemCount": payload.quantity},
+            }
+        # já estava no carrinho: soma a quantidade e aproveita para atualizar o snapshot
+        return {
+            "$set": {f"items.{idx}": fresh},
+            "$inc": {"subtotal": line_total(fresh) - line_total(item), "itemCount": payload.quantity},
+        }
+
+    cart = await save(db["carts"], user_id, build)
+    return JSONBytesResponse(cart_out(cart))
+
+
+# ===== PATCH /cart/items/{listing_id} =====
+@router.patch("/items/{listing_id}", response_model=CartOut)
+async def update_cart_item(
+    listing_id: Annotated[str, Path(..., description="ID do anúncio no carrinho (ObjectId).")],
+    payload: CartItemUpdate,
+    user_id: Annotated[str, Depends(get_current_user_id)],
+    db = Depends(get_db),
+    loader: ListingLoader = Depends(listing_loader()),
+):
+    listing_oid = to_object_id_or_400(listing_id, "listing_id")
+    carts = db["carts"]
+
+    _, item = find_item(await carts.find_one({"userId": str(user_id)}), listing_oid)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Item não está no carrinho")
+
+    # o snapshot basta enquanto a quantidade cabe no estoque dele; acima disso relê o anúncio
+    listing = None
+    if payload.quantity > item["stock"]:
+        listing = await loader.load(listing_oid)
+        if not listing:
+            raise HTTPException(status_code=404, detail="Anúncio não encontrado")
+        check_available(listing, payload.quantity)
+
+    def build(cart):
+        idx, item = find_item(cart, listing_oid)
+        if item is None:
+            raise HTTPException(status_code=404, detail="Item não está no carrinho")
+        if listing is not None:
+            fresh = snapshot(listing, payload.quantity, item.get("addedAt"))
+            to_set = {f"items.{idx}": fresh}
+        else:
+            fresh = {**item, "quantity": payload.quantity}
+            to_set = {f"items.{idx}.quantity": payload.quantity}
+        return {
+            "$set": to_set,
+            "$inc": {
+                "subtotal": line_total(fresh) - line_total(item),
+                "itemCount": payload.quantity - item["quantity"],
+            },
+        }
+
+    cart = await save(carts, user_id, build)
+    return JSONBytesResponse(cart_out(cart))
+
+
+# ===== DELETE /cart/items/{listing_id} =====
+@router.delete("/items/{listing_id}", response_model=CartOut)
+async def remove_cart_item(
+    listing_id: Annotated[str, Path(..., description="ID do anúncio no carrinho (ObjectId).")],
+    user_id: Annotated[str, Depends(get_current_user_id)],
+    db = Depends(get_db),
+):
+    listing_oid = to_object_id_or_400(listing_id, "listing_id")
+
+    def build(cart):
+        _, item = find_item(cart, listing_oid)
+        if item is None:
+            raise HTTPException(status_code=404, detail="Item não está no carrinho")
+        update = {"$pull": {"items": {"listingId": listing_oid}}}
+        if len(cart["items"]) == 1:
+            # último item: zera em vez de subtrair (evita resíduo de ponto flutuante)
+            update["$set"] = {"subtotal": 0.0, "itemCount": 0}
+        else:
+            update["$inc"] = {"subtotal": -line_total(item), "itemCount": -item["quantity"]}
+        return update
+
+    cart = await save(db["carts"], user_id, build)
+    return JSONBytesResponse(cart_out(cart))
+
+
+# ===== DELETE /cart =====
+@router.delete("", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_cart(
+    user_id: Annotated[str, Depends(get_current_user_id)],
+    db = Depends(get_db),
+):
+    await db["carts"].delete_one({"userId": str(user_id)})
+    return None
+
+
+# ===== POST /cart/checkout =====
+@router.post("/checkout", response_model=OrderOut, status_code=status.HTTP_201_CREATED)
+async def checkout_cart(
+    payload: CartCheckoutIn,
+    user_id: Annotated[str, Depends(get_current_user_id)],
+    db = Depends(get_db),
+    idempotency_key: IdempotencyKey = None,
+):
+    """
+    Gera o pedido a partir dos snapshots, sem reler os anúncios: o abatimento
+    de estoque só casa se preço e status ainda forem os do snapshot. Se algo
+    mudou, o carrinho é revalidado e a resposta é 409 para o cliente revisar.
+    """
+    return await idempotent(
+        db, idempotency_key, f"{user_id}:POST /cart/checkout", payload,
+        lambda: _checkout_cart(payload, user_id, db),
+    )
+
+
+async def _checkout_cart(payload: CartCheckoutIn, user_id: str, db) -> JSONBytesResponse:
+    carts = db["carts"]
+
+    cart = await carts.find_one({"userId": str(user_id)})
+    if not cart or not cart.get("items"):
+        raise HTTPException(status_code=400, detail="Carrinho vazio")
+
+    items = cart["items"]
+    quantities = {i["listingId"]: i["quantity"] for i in items}
+    order_items = [
+        order_item(i["listingId"], i["title"], i["unitPrice"], i["quantity"], i.get("thumbnail"), i.get("sellerId"))
+        for i in items
+    ]
+
+    async def place(session):
+        # 1) reivindica o carrinho antes de abater o estoque: esvazia só se ainda
+        # for o que foi lido, então um segundo checkout concorrente recebe 409
+        version = cart.get("version", 0)
+        claimed = await carts.update_one(
+            {"_id": cart["_id"], "version": version},
+            {"$set": {"items": [], "subtotal": 0.0, "itemCount": 0, "updatedAt": now_utc()},
+             "$inc": {"version": 1}},
+            session=session,
+        )
+        if claimed.matched_count == 0:
+            raise HTTPException(status_code=409, detail="Carrinho alterado durante o checkout, tente de novo")
+
+        # 2) estoque + pedido
+        try:
+            return await place_order(
+                db, user_id, order_items, quantities,
+                shipping_address=payload.shippingAddress, notes=payload.notes,
+                session=session, guards=reserve_guards(items),
+            )
+        except BaseException:
+            if session is None:
+                # sem transação nada desfaz o passo 1: devolve os itens (se ninguém mexeu depois)
+                await carts.update_one(
+                    {"_id": cart["_id"], "version": version + 1},
+                    {"$set": {"items": items, "subtotal": cart.get("subtotal", 0.0),
+                              "itemCount": cart.get("itemCount", 0), "updatedAt": now_utc()},
+                     "$inc": {"version": 1}},
+                )
+            raise
+
+    try:
+        doc = await run_in_transaction(place)
+    except InsufficientStock:
+        # preço/status/estoque mudou: atualiza os snapshots para o cliente revisar
+        changed = await changed_listings(db["listings"], items)
+        if changed:
+            await save(carts, user_id, lambda c: c and refresh_update(c, changed))
+        raise HTTPException(
+            status_code=409,
+            detail="Alguns itens do carrinho mudaram (preço, estoque ou disponibilidade); revise o carrinho",
+        )
+
+    await feed_cache.invalidate_listings(str(oid) for oid in quantities)
+
+    return JSONBytesResponse(order_out(doc), status_code=status.HTTP_201_CREATED)
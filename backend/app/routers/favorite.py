@@ -1,13 +1,22 @@
 # app/routers/favorites.py
-from typing import Annotated, List
+from typing import Annotated, List, Optional
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, Depends, HTTPException, status, Path, Query
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 
-from app.db.mongo import get_db
+from app.db.mongo import get_db, read_db
 from app.core.deps import get_current_user_id
+from app.core.fields import FIELDS_QUERY
+from app.core.pagination import KEYSET_SORT, cursor_headers, keyset_match
+from app.core.serialization import JSONBytesResponse
 from app.models.favorite import FavoriteIn, FavoriteOut
+from app.services.favorites import favorite_ids, set_listing_active
+from app.services.images import THUMB_WIDTH, pick_thumbnail
+from app.services.loaders import ListingLoader, listing_loader
+from app.services.serializers import FAVORITE_FIELDS, favorite_out
 
 router = APIRouter(prefix="/favorites", tags=["Favorites"])
 
@@ -31,12 +40,11 @@ async def add_favorite(
     db = Depends(get_db),
 ):
     favorites = db["favorites"]
-    listings = db["listings"]
 
     listing_oid = to_object_id_or_400(payload.listingId, "listingId")
 
-    # 1) checar se o anúncio existe
-    listing_doc = await listings.find_one({"_id": listing_oid})
+    # 1) checar se o anúncio existe (só o status, pela chave primária)
+    listing_doc = await db["listings"].find_one({"_id": listing_oid}, {"status": 1})
     if not listing_doc:
         raise HTTPException(status_code=404, detail="Anúncio não encontrado")
 
@@ -44,93 +52,81 @@ async def add_favorite(
     # mas aqui vamos manter string para simplificar
     user_key = str(user_id)
 
-    # 2) evitar duplicado
-    existing = await favorites.find_one({
-        "userId": user_key,
-        "listingId": listing_oid,
-    })
-    if existing:
-        # podemos devolver o já existente
-        return FavoriteOut(
-            id=str(existing["_id"]),
-            listingId=str(existing["listingId"]),
-            userId=existing["userId"],
-            createdAt=existing["createdAt"],
-        )
-
-    doc = {
-        "userId": user_key,
-        "listingId": listing_oid,
-        "createdAt": now_utc(),
+    # 2) upsert único no índice (userId, listingId): cria ou devolve o já existente.
+    # listingActive vem do status lido acima (e é regravado se o favorito já existia);
+    # só uma corrida com o PATCH do anúncio deixa o flag errado até a leitura com live=true.
+    query = {"userId": user_key, "listingId": listing_oid}
+    update = {
+        "$setOnInsert": {"createdAt": now_utc()},
+        "$set": {"listingActive": listing_doc.get("status", "active") == "active"},
     }
+    try:
+        doc = await favorites.find_one_and_update(
+            query, update, upsert=True, return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # dois upserts simultâneos do mesmo par: o segundo acha o documento do primeiro
+        doc = await favorites.find_one_and_update(query, update, return_document=ReturnDocument.AFTER)
 
-    result = await favorites.insert_one(doc)
-
-    return FavoriteOut(
-        id=str(result.inserted_id),
-        listingId=str(doc["listingId"]),
-        userId=doc["userId"],
-        createdAt=doc["createdAt"],
-    )
+    await favorite_ids.added(user_key, listing_oid)
+    return JSONBytesResponse(favorite_out(doc), status_code=status.HTTP_201_CREATED)
 
 
 # ===== GET /favorites =====
 @router.get("", response_model=List[FavoriteOut])
 async def list_favorites(
     user_id: Annotated[str, Depends(get_current_user_id)],
-    db = Depends(get_db),
+    db = Depends(read_db("favorites")),
+    loader: ListingLoader = Depends(listing_loader("favorites")),
     page: int = Query(1, ge=1),
     limit: int = Query(30, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor opaco do header X-Next-Cursor (substitui page)"),
+    fields: Optional[str] = FIELDS_QUERY,
+    live: bool = Query(False, description="Só favoritos de anúncios ativos"),
 ):
     favorites = db["favorites"]
-
-    # Vamos fazer um aggregate para já trazer dados do listing
-    pipeline = [
-        {"$match": {"userId": str(user_id)}},
-        {"$sort": {"createdAt": -1}},
-        {"$skip": (page - 1) * limit},
-        {"$limit": limit},
-        {
-            "$lookup": {
-                "from": "listings",
-                "localField": "listingId",
-                "foreignField": "_id",
-                "as": "listing",
-            }
-        },
-        {
-            "$addFields": {
-                "listing": {"$arrayElemAt": ["$listing", 0]}
-            }
-        },
-        {
-            "$project": {
-                "_id": 1,
-                "userId": 1,
-                "listingId": 1,
-                "createdAt": 1,
-                # campos do listing
-                "title": "$listing.title",
-                "price": "$listing.price",
-                "thumbnail": {"$arrayElemAt": ["$listing.images", 0]},
-            }
-        },
-    ]
-
-    docs = await favorites.aggregate(pipeline).to_list(length=limit)
-
-    return [
-        FavoriteOut(
-            id=str(d["_id"]),
-            listingId=str(d["listingId"]),
-            userId=d["userId"],
-            createdAt=d["createdAt"],
-            title=d.get("title"),
-            price=float(d["price"]) if d.get("price") is not None else None,
-            thumbnail=d.get("thumbnail"),
-        )
-        for d in docs
-    ]
+    selected = FAVORITE_FIELDS.parse(fields)
+
+    match = {"userId": str(user_id)}
+    if live:
+        # índice (userId, listingActive, createdAt, _id): a página custa `limit` chaves
+        match["listingActive"] = True
+    if cursor:
+        match.update(keyset_match(cursor))
+
+    docs = await (
+        favorites
+        .find(match, FAVORITE_FIELDS.projection(selected))
+        .sort(KEYSET_SORT)
+        .skip(0 if cursor else (page - 1) * limit)
+        .limit(limit)
+    ).to_list(length=limit)
+
+    # o cursor vem da página lida, mesmo que live=true descarte algum favorito dela
+    headers = cursor_headers(docs, limit)
+    rows = docs
+
+    # dados do anúncio numa consulta $in só (dataloader), em vez de $lookup por favorito;
+    # pulada se fields= não pediu nenhum campo do anúncio (live=true sempre confere o status)
+    if live or FAVORITE_FIELDS.needs(selected, "title", "price", "thumbnail"):
+        listings = await loader.load_many(d["listingId"] for d in docs)
+        for d, listing in zip(docs, listings):
+            if listing:
+                d["title"] = listing.get("title")
+                d["price"] = listing.get("price")
+                # miniatura WebP da capa; anúncios antigos caem para a original
+                d["thumbnail"] = pick_thumbnail(listing, THUMB_WIDTH)
+
+        if live:
+            # listingActive ficou para trás (corrida com PATCH do anúncio ou anúncio apagado):
+            # some da resposta e o flag é corrigido aqui; o reaper apaga os órfãos depois
+            stale = [d["listingId"] for d, l in zip(docs, listings) if not l or l.get("status") != "active"]
+            if stale:
+                await set_listing_active(favorites, stale, False)  # escrita vai ao primário
+                rows = [d for d, l in zip(docs, listings) if l and l.get("status") == "active"]
+
+    items = FAVORITE_FIELDS.pick([favorite_out(d) for d in rows], selected)
+    return JSONBytesResponse(items, headers=headers)
 
 
 # ===== DELETE /favorites/{favorite_id} =====
@@ -152,6 +148,7 @@ async def delete_favorite(
         raise HTTPException(status_code=403, detail="Você não pode remover o favorito de outro usuário")
 
     await favorites.delete_one({"_id": fav_oid})
+    await favorite_ids.removed(user_id, doc["listingId"])
     return None
 
 
@@ -173,4 +170,5 @@ async def delete_favorite_by_listing(
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Favorito não encontrado")
 
+    await favorite_ids.removed(user_id, listing_oid)
     return None
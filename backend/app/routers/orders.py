@@ -1,14 +1,25 @@
 # app/routers/orders.py
-from typing import Annotated, List, Optional
+from typing import Annotated, List, Optional, Union
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, Depends, HTTPException, status, Path, Query
 from bson import ObjectId
 
-from app.db.mongo import get_db
+from app.db.mongo import get_db, read_db, run_in_transaction
 from app.core.deps import get_current_user_id
+from app.core.fields import FIELDS_QUERY, FieldSet
+from app.core.pagination import KEYSET_SORT, cursor_headers, keyset_match
+from app.core.serialization import JSONBytesResponse
+from app.services.cache import feed_cache
+from app.services.idempotency import IdempotencyKey, idempotent
+from app.services.images import THUMB_WIDTH, pick_thumbnail
+from app.services.orders import order_item, place_order, transition_order
+from app.services.serializers import (
+    ORDER_FIELDS, ORDER_SUMMARY_FIELDS, order_out, order_summary_out, order_summary_projection,
+)
+from app.services.stock import InsufficientStock, merge_quantities
 from app.models.order import (
-    OrderIn, OrderOut, OrderItemOut, OrderStatus
+    OrderIn, OrderOut, OrderStatus, OrderSummaryOut
 )
 
 router = APIRouter(prefix="/orders", tags=["Orders"])
@@ -30,127 +41,116 @@ async def create_order(
     payload: OrderIn,
     user_id: Annotated[str, Depends(get_current_user_id)],
     db = Depends(get_db),
+    idempotency_key: IdempotencyKey = None,
 ):
+    # repetição com a mesma Idempotency-Key devolve o pedido já criado
+    return await idempotent(
+        db, idempotency_key, f"{user_id}:POST /orders", payload,
+        lambda: _create_order(payload, user_id, db),
+    )
+
+
+async def _create_order(payload: OrderIn, user_id: str, db) -> JSONBytesResponse:
     listings_col = db["listings"]
-    orders_col = db["orders"]
 
     if not payload.items:
         raise HTTPException(status_code=400, detail="Envie ao menos 1 item")
 
-    # 1) buscar todos os listings envolvidos
-    listing_ids = [to_object_id_or_400(i.listingId, "listingId") for i in payload.items]
-    listings_docs = await listings_col.find({"_id": {"$in": listing_ids}}).to_list(length=len(listing_ids))
-    listings_map = {d["_id"]: d for d in listings_docs}
-
-    order_items: List[OrderItemOut] = []
-    total = 0.0
-
-    # 2) montar snapshot e validar estoque
     for item_in in payload.items:
-        listing_oid = ObjectId(item_in.listingId)
-        listing = listings_map.get(listing_oid)
-        if not listing:
-            raise HTTPException(status_code=404, detail=f"Anúncio {item_in.listingId} não encontrado")
-
-        # checar estoque
-        stock = int(listing.get("stock", 0))
-        if item_in.quantity > stock:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Estoque insuficiente para o anúncio '{listing.get('title', '')}'"
+        to_object_id_or_400(item_in.listingId, "listingId")
+    quantities = merge_quantities(payload.items)
+
+    async def place(session):
+        # 1) buscar todos os listings envolvidos
+        listings_docs = await listings_col.find(
+            {"_id": {"$in": list(quantities)}}, session=session
+        ).to_list(length=len(quantities))
+        listings_map = {d["_id"]: d for d in listings_docs}
+
+        order_items: List[dict] = []  # snapshot no formato de OrderItemOut
+
+        # 2) montar snapshot e validar estoque (falha rápida com mensagem amigável)
+        for item_in in payload.items:
+            listing_oid = ObjectId(item_in.listingId)
+            listing = listings_map.get(listing_oid)
+            if not listing:
+                raise HTTPException(status_code=404, detail=f"Anúncio {item_in.listingId} não encontrado")
+
+            if quantities[listing_oid] > int(listing.get("stock", 0)):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Estoque insuficiente para o anúncio '{listing.get('title', '')}'"
+                )
+
+            order_items.append(order_item(
+                listing["_id"],
+                listing.get("title", ""),
+                float(listing.get("price", 0)),
+                item_in.quantity,
+                pick_thumbnail(listing, THUMB_WIDTH),
+                listing.get("sellerId"),
+            ))
+
+        # 3) abater estoque (escritas condicionais, tudo ou nada) e criar o pedido
+        try:
+            return await place_order(
+                db, user_id, order_items, quantities,
+                shipping_address=payload.shippingAddress, notes=payload.notes, session=session,
             )
+        except InsufficientStock:
+            # outro checkout levou o estoque entre a leitura e a escrita
+            raise HTTPException(status_code=409, detail="Estoque insuficiente para um ou mais itens")
 
-        unit_price = float(listing.get("price", 0))
-        line_total = unit_price * item_in.quantity
-        total += line_total
-
-        order_items.append(
-            OrderItemOut(
-                listingId=str(listing["_id"]),
-                title=listing.get("title", ""),
-                unitPrice=unit_price,
-                quantity=item_in.quantity,
-                lineTotal=line_total,
-                thumbnail=(listing.get("images") or [None])[0],
-            )
-        )
+    doc = await run_in_transaction(place)
 
-    # 3) opcional: abater estoque
-    for item_in in payload.items:
-        listing_oid = ObjectId(item_in.listingId)
-        await listings_col.update_one(
-            {"_id": listing_oid},
-            {"$inc": {"stock": -item_in.quantity}}
-        )
+    # estoque mudou: páginas do feed com esses anúncios ficaram velhas
+    await feed_cache.invalidate_listings(str(oid) for oid in quantities)
 
-    # 4) criar pedido
-    now = now_utc()
-    doc = {
-        "userId": str(user_id),
-        "status": "pending",
-        "items": [i.model_dump() for i in order_items],
-        "total": total,
-        "shippingAddress": payload.shippingAddress,
-        "notes": payload.notes,
-        "createdAt": now,
-        "updatedAt": now,
-    }
-
-    result = await orders_col.insert_one(doc)
-
-    return OrderOut(
-        id=str(result.inserted_id),
-        userId=doc["userId"],
-        status=doc["status"],
-        items=order_items,
-        total=total,
-        shippingAddress=doc["shippingAddress"],
-        notes=doc["notes"],
-        createdAt=doc["createdAt"],
-        updatedAt=doc["updatedAt"],
-    )
+    return JSONBytesResponse(order_out(doc), status_code=status.HTTP_201_CREATED)
 
 
 # ===== GET /orders =====
-@router.get("", response_model=List[OrderOut])
+@router.get("", response_model=List[Union[OrderOut, OrderSummaryOut]])
 async def list_my_orders(
     user_id: Annotated[str, Depends(get_current_user_id)],
-    db = Depends(get_db),
+    db = Depends(read_db("orders")),
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
     status_filter: Optional[OrderStatus] = Query(None, description="Filtrar por status"),
+    cursor: Optional[str] = Query(None, description="Cursor opaco do header X-Next-Cursor (substitui page)"),
+    summary: bool = Query(False, description="Só id, status, total, itemCount, thumbnail e createdAt (sem items)"),
+    fields: Optional[str] = FIELDS_QUERY,
 ):
     orders_col = db["orders"]
+    selected = (ORDER_SUMMARY_FIELDS if summary else ORDER_FIELDS).parse(fields)
 
     query = {"userId": str(user_id)}
     if status_filter:
         query["status"] = status_filter
-
-    cursor = (
-        orders_col
-        .find(query)
-        .sort("createdAt", -1)
-        .skip((page - 1) * limit)
-        .limit(limit)
-    )
-    docs = await cursor.to_list(length=limit)
-
-    out: List[OrderOut] = []
-    for d in docs:
-        out.append(
-            OrderOut(
-                id=str(d["_id"]),
-                userId=d["userId"],
-                status=d["status"],
-                items=[OrderItemOut(**item) for item in d.get("items", [])],
-                total=float(d.get("total", 0)),
-                shippingAddress=d.get("shippingAddress"),
-                notes=d.get("notes"),
-                createdAt=d["createdAt"],
-                updatedAt=d["updatedAt"],
-            )
-        )
-    return out
+    if cursor:
+        query.update(keyset_match(cursor))
+
+    if summary:
+        # contagem e miniatura calculadas no banco; items não sai do servidor
+        docs = await orders_col.aggregate([
+            {"$match": query},
+            {"$sort": dict(KEYSET_SORT)},
+            {"$skip": 0 if cursor else (page - 1) * limit},
+            {"$limit": limit},
+            {"$project": order_summary_projection(selected)},
+        ]).to_list(length=limit)
+        items = [order_summary_out(d) for d in docs]
+    else:
+        docs = await (
+            orders_col
+            .find(query, ORDER_FIELDS.projection(selected))
+            .sort(KEYSET_SORT)
+            .skip(0 if cursor else (page - 1) * limit)
+            .limit(limit)
+        ).to_list(length=limit)
+        items = [order_out(d) for d in docs]
+
+    return JSONBytesResponse(FieldSet.pick(items, selected), headers=cursor_headers(docs, limit))
 
 
 # ===== GET /orders/{order_id} =====
@@ -170,21 +170,14 @@ async def get_order(
     if str(doc["userId"]) != str(user_id):
         raise HTTPException(status_code=403, detail="Você não pode ver o pedido de outro usuário")
 
-    return OrderOut(
-        id=str(doc["_id"]),
-        userId=doc["userId"],
-        status=doc["status"],
-        items=[OrderItemOut(**item) for item in doc.get("items", [])],
-        total=float(doc.get("total", 0)),
-        shippingAddress=doc.get("shippingAddress"),
-        notes=doc.get("notes"),
-        createdAt=doc["createdAt"],
-        updatedAt=doc["updatedAt"],
-    )
+    return JSONBytesResponse(order_out(doc))
 
 
 # ===== PATCH /orders/{order_id}/status =====
-# simples: só deixa o próprio usuário cancelar o pedido
+# o comprador só pode cancelar; as outras transições de TRANSITIONS ficam para o fluxo do vendedor
+BUYER_STATUSES = {"cancelled"}
+
+
 @router.patch("/{order_id}/status", response_model=OrderOut)
 async def update_order_status(
     order_id: Annotated[str, Path(..., description="ID do pedido (ObjectId).")],
@@ -192,34 +185,30 @@ async def update_order_status(
     user_id: Annotated[str, Depends(get_current_user_id)],
     db = Depends(get_db),
 ):
-    orders_col = db["orders"]
     oid = to_object_id_or_400(order_id, "order_id")
 
-    doc = await orders_col.find_one({"_id": oid})
-    if not doc:
-        raise HTTPException(status_code=404, detail="Pedido não encontrado")
-
-    # regra simples: o cliente só pode cancelar o próprio pedido
-    if str(doc["userId"]) != str(user_id):
-        raise HTTPException(status_code=403, detail="Você não pode alterar pedido de outro usuário")
-
-    if new_status != "cancelled":
+    if new_status not in BUYER_STATUSES:
         raise HTTPException(status_code=400, detail="No momento só é permitido cancelar o pedido")
 
-    await orders_col.update_one(
-        {"_id": oid},
-        {"$set": {"status": new_status, "updatedAt": now_utc()}}
+    # uma escrita condicionada ao status atual + devolução do estoque, na mesma transação
+    updated = await run_in_transaction(
+        lambda session: transition_order(db, oid, user_id, new_status, session=session)
     )
 
-    updated = await orders_col.find_one({"_id": oid})
-    return OrderOut(
-        id=str(updated["_id"]),
-        userId=updated["userId"],
-        status=updated["status"],
-        items=[OrderItemOut(**item) for item in updated.get("items", [])],
-        total=float(updated.get("total", 0)),
-        shippingAddress=updated.get("shippingAddress"),
-        notes=updated.get("notes"),
-        createdAt=updated["createdAt"],
-        updatedAt=updated["updatedAt"],
-    )
+    if updated is None:
+        # só no caminho de erro: descobre o motivo para a mensagem
+        doc = await db["orders"].find_one({"_id": oid}, {"userId": 1, "status": 1})
+        if not doc:
+            raise HTTPException(status_code=404, detail="Pedido não encontrado")
+        if str(doc["userId"]) != str(user_id):
+            raise HTTPException(status_code=403, detail="Você não pode alterar pedido de outro usuário")
+        raise HTTPException(
+            status_code=409,
+            detail=f"Transição inválida: {doc['status']} -> {new_status}",
+        )
+
+    if new_status == "cancelled":
+        # estoque voltou: páginas do feed com esses anúncios ficaram velhas
+        await feed_cache.invalidate_listings(i["listingId"] for i in updated.get("items", []))
+
+    return JSONBytesResponse(order_out(updated))
@@ -0,0 +1,40 @@
+# app/routers/sellers.py
+from typing import Annotated, List
+
+from fastapi import APIRouter, Depends, Query
+
+from app.db.mongo import read_db
+from app.core.deps import get_current_user_id
+from app.core.serialization import JSONBytesResponse
+from app.models.seller import ListingStatsOut, SellerStatsOut
+from app.services.seller_stats import get_seller_stats
+from app.services.serializers import listing_stats_out, seller_stats_out
+
+router = APIRouter(prefix="/sellers", tags=["Sellers"])
+
+
+# ===== GET /sellers/me/stats =====
+@router.get("/me/stats", response_model=SellerStatsOut)
+async def my_seller_stats(
+    user_id: Annotated[str, Depends(get_current_user_id)],
+    db = Depends(read_db("sellers")),
+):
+    """Vendas, receita, anúncios ativos e com estoque baixo (um documento, sem agregação)."""
+    return JSONBytesResponse(seller_stats_out(await get_seller_stats(db, user_id)))
+
+
+# ===== GET /sellers/me/stats/listings =====
+@router.get("/me/stats/listings", response_model=List[ListingStatsOut])
+async def my_listing_stats(
+    user_id: Annotated[str, Depends(get_current_user_id)],
+    db = Depends(read_db("sellers")),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """Anúncios mais vendidos do vendedor."""
+    docs = await (
+        db["listing_stats"]
+        .find({"sellerId": str(user_id)}, {"unitsSold": 1, "revenue": 1})
+        .sort([("unitsSold", -1), ("_id", 1)])
+        .limit(limit)
+    ).to_list(length=limit)
+    return JSONBytesResponse([listing_stats_out(d) for d in docs])
@@ -1,14 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from bson import ObjectId
+from pymongo import ReturnDocument
 from app.core.deps import get_db_dep, get_current_user_id
-from app.schemas.user import UserPublic
+from app.db.mongo import read_db
+from app.schemas.user import UserPublic, UserUpdate
+from app.services.cache import feed_cache
+from app.services.sellers import propagate_seller_name
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 # Lista com paginação por cursor (ObjectId)
 @router.get("", response_model=list[UserPublic])
 async def list_users(
-    db=Depends(get_db_dep),
+    db=Depends(read_db("users")),
     _=Depends(get_current_user_id),  # rota protegida
     limit: int = Query(20, ge=1, le=100),
     after_id: str | None = None
@@ -28,3 +32,33 @@ async def me(db=Depends(get_db_dep), user_id: str = Depends(get_current_user_id)
     if not doc:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
     return UserPublic(id=str(doc["_id"]), email=doc["email"], is_active=doc.get("is_active", True))
+
+@router.patch("/me", response_model=UserPublic)
+async def update_me(payload: UserUpdate, db=Depends(get_db_dep), user_id: str = Depends(get_current_user_id)):
+    col = db["users"]
+    to_set = payload.model_dump(exclude_none=True)
+    if not to_set:
+        raise HTTPException(status_code=400, detail="Envie pelo menos um campo para atualizar")
+
+    doc = await col.find_one_and_update(
+        {"_id": ObjectId(user_id)},
+        {"$set": to_set},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not doc:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+
+    # nome do vendedor é denormalizado nos anúncios
+    if "full_name" in to_set:
+        if await propagate_seller_name(db, user_id, doc["full_name"]):
+            # raro: mais simples limpar o cache do feed do que achar as páginas afetadas
+            await feed_cache.clear()
+
+    return UserPublic(
+        id=str(doc["_id"]),
+        email=doc["email"],
+        full_name=doc["full_name"],
+        cpf=doc["cpf"],
+        phone=doc["phone"],
+        is_active=doc.get("is_active", True),
+    )
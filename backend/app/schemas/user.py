@@ -94,6 +94,25 @@ class UserPublic(BaseModel):
     phone: str
     is_active: bool
 
+class UserUpdate(BaseModel):
+    full_name: str | None = None
+    phone: str | None = None
+
+    @field_validator("full_name")
+    @classmethod
+    def nome_ok(cls, v: str | None):
+        if v is None:
+            return v
+        v = v.strip()
+        if len(v) < 3:
+            raise ValueError("Nome muito curto.")
+        return v
+
+    @field_validator("phone")
+    @classmethod
+    def phone_ok(cls, v: str | None):
+        return normalize_phone_br(v) if v is not None else v
+
 # Schema só para login
 class LoginRequest(BaseModel):
     email: EmailStr
@@ -0,0 +1,179 @@
+# app/services/cache.py
+"""
+Cache de respostas do feed público (GET /listings).
+
+Duas implementações de backend com a mesma interface:
+  - MemoryBackend: LRU com TTL, no próprio processo (padrão);
+  - RedisBackend: qualquer cliente compatível com redis.asyncio
+    (get/set/delete/sadd/smembers/expire), o que permite trocar por um
+    substituto local nos testes.
+
+Cada entrada recebe "tags" e a invalidação é feita por tag:
+  - listing:<id>  -> páginas que contêm o anúncio (preço/estoque mudou);
+  - cat:<id>|cat:* -> páginas do feed daquela categoria / sem categoria
+    (um anúncio novo pode entrar nelas).
+"""
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Set
+
+from app.core.config import settings
+
+ALL_CATEGORIES = "*"
+
+
+class MemoryBackend:
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        # key -> (expira_em, valor, tags)
+        self._data: "OrderedDict[str, tuple[float, Any, tuple]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+
+    def _drop(self, key: str) -> bool:
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return False
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        return True
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            self._drop(key)
+            return None
+        self._data.move_to_end(key)
+        return entry[1]
+
+    async def set(self, key: str, value: Any, ttl: int, tags: Iterable[str]) -> None:
+        self._drop(key)
+        tags = tuple(tags)
+        self._data[key] = (time.monotonic() + ttl, value, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._data) > self.max_entries:
+            self._drop(next(iter(self._data)))
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        removed = 0
+        for tag in tags:
+            for key in list(self._tags.get(tag, ())):
+                removed += self._drop(key)
+        return removed
+
+    async def clear(self) -> None:
+        self._data.clear()
+        self._tags.clear()
+
+
+class RedisBackend:
+    def __init__(self, client, prefix: str = "reuse:feed:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: int, tags: Iterable[str]) -> None:
+        await self.client.set(self.prefix + key, json.dumps(value, default=str), ex=ttl)
+        for tag in tags:
+            tag_key = self.prefix + "tag:" + tag
+            await self.client.sadd(tag_key, key)
+            await self.client.expire(tag_key, ttl)
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        removed = 0
+        for tag in tags:
+            tag_key = self.prefix + "tag:" + tag
+            members = await self.client.smembers(tag_key)
+            keys = [self.prefix + (m.decode() if isinstance(m, bytes) else m) for m in members]
+            if keys:
+                removed += await self.client.delete(*keys)
+            await self.client.delete(tag_key)
+        return removed
+
+    async def clear(self) -> None:
+        async for key in self.client.scan_iter(match=self.prefix + "*"):
+            await self.client.delete(key)
+
+
+class ResponseCache:
+    def __init__(self, backend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(**params) -> str:
+        """Chave estável a partir dos parâmetros já normalizados (None é ignorado)."""
+        norm = {k: v for k, v in sorted(params.items()) if v is not None}
+        return hashlib.sha1(json.dumps(norm, sort_keys=True, default=str).encode()).hexdigest()
+
+    async def get(self, key: str) -> Optional[Any]:
+        if self.backend is None:
+            return None
+        value = await self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any, listing_ids: Iterable[str], category: Optional[str]) -> None:
+        if self.backend is None:
+            return
+        tags = [f"listing:{i}" for i in listing_ids]
+        tags.append(f"cat:{category or ALL_CATEGORIES}")
+        await self.backend.set(key, value, self.ttl, tags)
+
+    async def invalidate_listings(self, listing_ids: Iterable[str]) -> None:
+        """Preço/estoque/dados de anúncios que já aparecem em páginas cacheadas."""
+        if self.backend is None:
+            return
+        self.invalidations += await self.backend.invalidate_tags(f"listing:{i}" for i in listing_ids)
+
+    async def invalidate_categories(self, categories: Iterable[Optional[str]]) -> None:
+        """Páginas em que um anúncio pode ter entrado (novo, ou mudou de categoria/texto)."""
+        if self.backend is None:
+            return
+        tags = {f"cat:{ALL_CATEGORIES}"} | {f"cat:{c}" for c in categories if c}
+        self.invalidations += await self.backend.invalidate_tags(tags)
+
+    async def clear(self) -> None:
+        if self.backend is not None:
+            await self.backend.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__ if self.backend else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": round(self.hits / total, 4) if total else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+def build_backend():
+    kind = settings.CACHE_BACKEND.lower()
+    if kind == "off":
+        return None
+    if kind == "redis":
+        import redis.asyncio as redis  # dependência opcional
+
+        return RedisBackend(redis.from_url(settings.REDIS_URL))
+    return MemoryBackend(settings.CACHE_MAX_ENTRIES)
+
+
+feed_cache = ResponseCache(build_backend(), settings.CACHE_TTL_SECONDS)
@@ -0,0 +1,138 @@
+# app/services/carts.py
+"""
+Carrinho persistido: um documento por usuário na coleção carts.
+
+    {userId, items: [snapshot...], subtotal, itemCount, version, updatedAt}
+
+Cada item guarda um snapshot do anúncio (preço, estoque, status, título,
+miniatura e o updatedAt do anúncio na hora do snapshot). subtotal e
+itemCount são mantidos por $inc a cada alteração, nunca recalculados
+somando os itens. version faz o controle otimista: toda escrita filtra
+pela versão lida e a incrementa; se outra requisição escreveu antes, a
+operação é refeita sobre o documento novo.
+
+Revalidação: só os anúncios com updatedAt maior que o do snapshot voltam
+do banco (um find com $or por item); os outros não são relidos.
+"""
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.services.images import THUMB_WIDTH, pick_thumbnail
+
+# linhas diferentes no carrinho
+MAX_CART_ITEMS = 50
+
+# tentativas do controle otimista antes de desistir (409)
+_MAX_ATTEMPTS = 5
+
+# campos do anúncio usados pelo snapshot
+SNAPSHOT_PROJECTION = {
+    "_id": 1, "title": 1, "price": 1, "stock": 1, "status": 1,
+    "images": 1, "imageVariants": 1, "sellerId": 1, "updatedAt": 1,
+}
+
+
+class CartConflict(Exception):
+    """O carrinho mudou em todas as tentativas (requisições concorrentes demais)."""
+
+
+def now_utc():
+    return datetime.now(timezone.utc)
+
+
+def snapshot(listing: dict, quantity: int, added_at: Optional[datetime] = None) -> dict:
+    """Item do carrinho a partir do documento do anúncio."""
+    return {
+        "listingId": listing["_id"],
+        "title": listing.get("title", ""),
+        "unitPrice": float(listing.get("price", 0)),
+        "stock": int(listing.get("stock", 0)),
+        "status": listing.get("status", "active"),
+        "thumbnail": pick_thumbnail(listing, THUMB_WIDTH),
+        "sellerId": listing.get("sellerId"),
+        "listingUpdatedAt": listing.get("updatedAt"),
+        "quantity": quantity,
+        "addedAt": added_at or now_utc(),
+    }
+
+
+def line_total(item: dict) -> float:
+    return item["unitPrice"] * item["quantity"]
+
+
+def find_item(cart: Optional[dict], listing_oid: ObjectId) -> Tuple[int, Optional[dict]]:
+    for idx, item in enumerate((cart or {}).get("items", [])):
+        if item["listingId"] == listing_oid:
+            return idx, item
+    return -1, None
+
+
+def reserve_guards(items: List[dict]) -> Dict[ObjectId, dict]:
+    """Condições do checkout: o anúncio ainda tem o preço do snapshot e está ativo."""
+    return {i["listingId"]: {"price": i["unitPrice"], "status": "active"} for i in items}
+
+
+async def changed_listings(listings_col, items: List[dict], session=None) -> Dict[ObjectId, dict]:
+    """Anúncios do carrinho alterados depois do snapshot (uma consulta só)."""
+    if not items:
+        return {}
+    clauses = []
+    for i in items:
+        if i.get("listingUpdatedAt") is None:
+            clauses.append({"_id": i["listingId"]})  # snapshot sem data: sempre revalida
+        else:
+            clauses.append({"_id": i["listingId"], "updatedAt": {"$gt": i["listingUpdatedAt"]}})
+    docs = await listings_col.find(
+        {"$or": clauses}, SNAPSHOT_PROJECTION, session=session
+    ).to_list(length=len(clauses))
+    return {d["_id"]: d for d in docs}
+
+
+async def mutate_cart(carts_col, user_key: str, build: Callable[[Optional[dict]], Optional[dict]]) -> Optional[dict]:
+    """
+    Lê o carrinho, pede a build(cart) o update e grava com controle otimista.
+
+    build devolve o documento de update ($set/$push/$pull/$inc...) ou None
+    quando não há nada a gravar; pode levantar HTTPException. O controle de
+    versão e o updatedAt são acrescentados aqui. Devolve o carrinho gravado.
+    """
+    for _ in range(_MAX_ATTEMPTS):
+        cart = await carts_col.find_one({"userId": user_key})
+        update = build(cart)
+        if update is None:
+            return cart
+
+        update.setdefault("$set", {})["updatedAt"] = now_utc()
+        update.setdefault("$inc", {})["version"] = 1
+        try:
+            saved = await carts_col.find_one_and_update(
+                {"userId": user_key, "version": (cart or {}).get("version", 0)},
+                update,
+                upsert=cart is None,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            continue  # outra requisição criou o carrinho primeiro
+        if saved is not None:
+            return saved
+    raise CartConflict()
+
+
+def refresh_update(cart: dict, changed: Dict[ObjectId, dict]) -> Optional[dict]:
+    """Update que troca os snapshots dos anúncios alterados e corrige o subtotal."""
+    to_set: dict = {}
+    delta = 0.0
+    for idx, item in enumerate(cart.get("items", [])):
+        listing = changed.get(item["listingId"])
+        if listing is None:
+            continue
+        fresh = snapshot(listing, item["quantity"], item.get("addedAt"))
+        to_set[f"items.{idx}"] = fresh
+        delta += line_total(fresh) - line_total(item)
+    if not to_set:
+        return None
+    return {"$set": to_set, "$inc": {"subtotal": delta}}
@@ -0,0 +1,186 @@
+# app/services/favorites.py
+"""
+Conjunto de IDs favoritados por usuário, para o coração dos cards.
+
+O feed marca isFavorite em cada anúncio sem consulta por linha: na
+primeira vez lê todos os listingId do usuário numa consulta coberta pelo
+índice único (userId, listingId) e guarda o conjunto em memória (LRU com
+TTL, MemoryBackend do cache do feed). Favoritar/desfavoritar atualiza o
+conjunto em cache deste processo; nos outros workers ele expira em
+FAVORITE_SET_TTL_SECONDS.
+
+Favoritos "vivos": cada favorito guarda listingActive (o anúncio está
+ativo?), mantido quando o status do anúncio muda, para GET /favorites?live=true
+paginar só pelo índice (userId, listingActive, createdAt, _id). O
+FavoriteReaper roda em segundo plano: apaga em lote os favoritos de
+anúncios que não existem mais e corrige listingActive que ficou para trás
+(inclusive em favoritos antigos, criados antes do campo existir).
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+
+from app.core.config import settings
+from app.services.cache import MemoryBackend
+
+logger = logging.getLogger(__name__)
+
+
+class FavoriteIdCache:
+    """
+    Uma carga que começou antes de um favoritar/desfavoritar pode terminar
+    depois dele; gravar o conjunto dela desfaria a mudança até o TTL. Cada
+    mudança anota em _changed o número de sequência dela, e a carga só vai
+    para o cache se nenhuma mudança do usuário aconteceu desde que começou.
+    """
+
+    def __init__(self, max_users: int, ttl: int):
+        self.ttl = ttl
+        self.max_users = max_users
+        self._backend = MemoryBackend(max_users) if ttl > 0 else None
+        self._seq = 0
+        # usuário -> sequência da última mudança (LRU; uma carga dura bem menos que max_users mudanças)
+        self._changed: "OrderedDict[str, int]" = OrderedDict()
+
+    async def _load(self, favorites_col, user_key: str) -> FrozenSet[str]:
+        started = self._seq
+        ids = frozenset([
+            str(d["listingId"])
+            async for d in favorites_col.find({"userId": user_key}, {"_id": 0, "listingId": 1})
+        ])
+        if self._backend is not None and self._changed.get(user_key, 0) <= started:
+            await self._backend.set(user_key, ids, self.ttl, ())
+        return ids
+
+    async def get(self, favorites_col, user_id: str) -> FrozenSet[str]:
+        user_key = str(user_id)
+        if self._backend is not None:
+            cached = await self._backend.get(user_key)
+            if cached is not None:
+                return cached
+        return await self._load(favorites_col, user_key)
+
+    async def _update(self, user_id: str, listing_id: str, add: bool) -> None:
+        if self._backend is None:
+            return
+        self._seq += 1
+        self._changed[str(user_id)] = self._seq
+        self._changed.move_to_end(str(user_id))
+        while len(self._changed) > self.max_users:
+            self._changed.popitem(last=False)
+        cached = await self._backend.get(str(user_id))
+        if cached is None:
+            return  # não está em cache: a próxima leitura carrega do banco
+        updated = cached | {str(listing_id)} if add else cached - {str(listing_id)}
+        await self._backend.set(str(user_id), updated, self.ttl, ())
+
+    async def added(self, user_id: str, listing_id) -> None:
+        await self._update(user_id, listing_id, add=True)
+
+    async def removed(self, user_id: str, listing_id) -> None:
+        await self._update(user_id, listing_id, add=False)
+
+
+favorite_ids = FavoriteIdCache(settings.FAVORITE_SET_MAX_USERS, settings.FAVORITE_SET_TTL_SECONDS)
+
+
+def mark_favorites(items: List[dict], ids: Iterable[str], favs: FrozenSet[str], include: bool = True) -> List[dict]:
+    """Cópia dos itens com isFavorite (ids em paralelo a items, já que fields= pode omitir o id)."""
+    if not include:
+        return items
+    return [{**item, "isFavorite": i in favs} for item, i in zip(items, ids)]
+
+
+def favorites_wanted(selected: Optional[FrozenSet[str]]) -> bool:
+    return selected is None or "isFavorite" in selected
+
+
+# ===== favoritos vivos =====
+async def set_listing_active(favorites_col, listing_ids: Iterable[ObjectId], active: bool) -> int:
+    """Atualiza listingActive de todos os favoritos desses anúncios (um update_many)."""
+    ids = list(listing_ids)
+    if not ids:
+        return 0
+    result = await favorites_col.update_many(
+        {"listingId": {"$in": ids}, "listingActive": {"$ne": active}},
+        {"$set": {"listingActive": active}},
+    )
+    return result.modified_count
+
+
+async def reap_favorites(db, after: Optional[ObjectId] = None, batch: int = 1000) -> Tuple[Optional[ObjectId], Dict[str, int]]:
+    """
+    Uma rodada do reaper: lê `batch` favoritos em ordem de _id a partir de
+    `after`, busca os anúncios deles numa consulta $in e, em lote, apaga os
+    favoritos de anúncios inexistentes e acerta listingActive.
+
+    Devolve o _id onde a próxima rodada continua (None = recomeça do início)
+    e os contadores da rodada.
+    """
+    favorites = db["favorites"]
+    match = {"_id": {"$gt": after}} if after is not None else {}
+    docs = await (
+        favorites.find(match, {"listingId": 1}).sort("_id", 1).limit(batch)
+    ).to_list(length=batch)
+    if not docs:
+        return None, {"scanned": 0, "deleted": 0, "updated": 0}
+
+    listing_ids = list({d["listingId"] for d in docs})
+    status_by_id = {
+        d["_id"]: d.get("status")
+        async for d in db["listings"].find({"_id": {"$in": listing_ids}}, {"status": 1})
+    }
+    missing = [i for i in listing_ids if i not in status_by_id]
+    active = [i for i, st in status_by_id.items() if st == "active"]
+    inactive = [i for i, st in status_by_id.items() if st != "active"]
+
+    deleted = 0
+    if missing:
+        # todos os favoritos desses anúncios, não só os desta rodada
+        deleted = (await favorites.delete_many({"listingId": {"$in": missing}})).deleted_count
+    updated = await set_listing_active(favorites, active, True)
+    updated += await set_listing_active(favorites, inactive, False)
+
+    next_after = docs[-1]["_id"] if len(docs) == batch else None
+    return next_after, {"scanned": len(docs), "deleted": deleted, "updated": updated}
+
+
+class FavoriteReaper:
+    """Tarefa de fundo que chama reap_favorites a cada `interval` segundos."""
+
+    def __init__(self, interval: float, batch: int):
+        self.interval = interval
+        self.batch = batch
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, db) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self, db) -> None:
+        after = None
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                after, counts = await reap_favorites(db, after, self.batch)
+            except Exception:
+                logger.exception("reaper de favoritos falhou; tenta de novo na próxima rodada")
+                continue
+            if counts["deleted"] or counts["updated"]:
+                logger.info("reaper de favoritos: %s", counts)
+
+
+favorite_reaper = FavoriteReaper(settings.FAVORITE_REAPER_INTERVAL_SECONDS, settings.FAVORITE_REAPER_BATCH)
@@ -0,0 +1,163 @@
+# app/services/idempotency.py
+"""
+Idempotency-Key para os POST que criam coisas (pedido, anúncio, checkout).
+
+O app mobile repete o POST quando a rede cai; com o mesmo Idempotency-Key
+a segunda chamada devolve a resposta da primeira em vez de criar de novo
+(e abater estoque de novo).
+
+As chaves ficam na coleção idempotency_keys (índice TTL em expiresAt),
+então valem entre workers e réplicas da API:
+
+    {_id: "<userId>:<rota>:<chave>", fingerprint, state: "pending"|"done",
+     lockedUntil, statusCode, mediaType, body, createdAt, expiresAt}
+
+Quem consegue inserir a chave executa a rota. Repetições que chegam antes
+de ela terminar esperam (evento local se for o mesmo processo, consulta
+periódica se não for) e depois reproduzem a resposta guardada. Só
+respostas 2xx são guardadas; em erro a chave é liberada para nova tentativa.
+"""
+import asyncio
+import hashlib
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Annotated, Awaitable, Callable, Dict, Optional
+
+from fastapi import Header, HTTPException
+from pydantic import BaseModel
+from pymongo.errors import DuplicateKeyError
+from starlette.responses import Response
+
+from app.core.config import settings
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# parâmetro de rota: idempotency_key: IdempotencyKey = None
+IdempotencyKey = Annotated[Optional[str], Header(
+    alias=IDEMPOTENCY_HEADER,
+    min_length=1,
+    max_length=255,
+    description="Chave gerada pelo cliente; repetir o POST com a mesma chave devolve a resposta original",
+)]
+
+# intervalo de consulta quando a 1ª execução está em outro processo
+_POLL_SECONDS = 0.05
+
+# chaves sendo executadas neste processo -> evento disparado ao terminar
+_inflight: Dict[str, asyncio.Event] = {}
+
+
+def now_utc():
+    return datetime.now(timezone.utc)
+
+
+def _aware(dt: datetime) -> datetime:
+    # o Motor devolve datetimes "naive" em UTC
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def fingerprint(payload: BaseModel) -> str:
+    return hashlib.sha256(payload.model_dump_json().encode()).hexdigest()
+
+
+def replay(doc: dict) -> Response:
+    return Response(
+        content=doc["body"],
+        status_code=doc["statusCode"],
+        media_type=doc.get("mediaType"),
+        headers={REPLAYED_HEADER: "true"},
+    )
+
+
+async def _claim(col, key_id: str, fp: str) -> bool:
+    now = now_utc()
+    try:
+        await col.insert_one({
+            "_id": key_id,
+            "fingerprint": fp,
+            "state": "pending",
+            "lockedUntil": now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS),
+            "createdAt": now,
+            "expiresAt": now + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS),
+        })
+        return True
+    except DuplicateKeyError:
+        return False
+
+
+async def _take_over(col, doc: dict) -> bool:
+    """Assume uma chave cuja 1ª execução passou do prazo (processo caiu no meio)."""
+    taken = await col.find_one_and_update(
+        {"_id": doc["_id"], "state": "pending", "lockedUntil": doc["lockedUntil"]},
+        {"$set": {"lockedUntil": now_utc() + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS)}},
+    )
+    return taken is not None
+
+
+async def _wait(key_id: str, remaining: float) -> None:
+    event = _inflight.get(key_id)
+    if event is None:
+        await asyncio.sleep(min(_POLL_SECONDS, remaining))
+        return
+    try:
+        await asyncio.wait_for(event.wait(), timeout=remaining)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def idempotent(
+    db,
+    key: Optional[str],
+    scope: str,
+    payload: BaseModel,
+    handler: Callable[[], Awaitable[Response]],
+) -> Response:
+    """
+    Executa handler() uma vez por (scope, key); sem key, só executa.
+    scope identifica usuário e rota (ex.: f"{user_id}:POST /orders").
+    """
+    if not key:
+        return await handler()
+
+    col = db["idempotency_keys"]
+    key_id = f"{scope}:{key}"
+    fp = fingerprint(payload)
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+
+    while not await _claim(col, key_id, fp):
+        doc = await col.find_one({"_id": key_id})
+        if doc is None:
+            continue  # a 1ª execução falhou e liberou a chave: tenta de novo
+        if doc["fingerprint"] != fp:
+            raise HTTPException(status_code=422, detail=f"{IDEMPOTENCY_HEADER} já usada com outro corpo")
+        if doc["state"] == "done":
+            return replay(doc)
+        if _aware(doc["lockedUntil"]) < now_utc() and await _take_over(col, doc):
+            break
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise HTTPException(status_code=409, detail="Requisição com esta Idempotency-Key ainda em andamento")
+        await _wait(key_id, remaining)
+
+    event = _inflight[key_id] = asyncio.Event()
+    try:
+        try:
+            response = await handler()
+        except BaseException:
+            await col.delete_one({"_id": key_id, "state": "pending"})
+            raise
+
+        if 200 <= response.status_code < 300:
+            await col.update_one({"_id": key_id}, {"$set": {
+                "state": "done",
+                "statusCode": response.status_code,
+                "mediaType": response.media_type,
+                "body": bytes(response.body),
+            }})
+        else:
+            await col.delete_one({"_id": key_id, "state": "pending"})
+        return response
+    finally:
+        _inflight.pop(key_id, None)
+        event.set()
@@ -0,0 +1,199 @@
+# app/services/images.py
+"""
+Derivados das imagens enviadas: miniaturas WebP em larguras fixas.
+
+Depois do /listings/upload, cada imagem gera <nome>_w160.webp, _w480 e
+_w1080 em MEDIA_DIR. O redimensionamento roda num ProcessPoolExecutor
+para não ocupar a CPU dos workers da API. Só imagens deste servidor
+(mesma origem, nome endereçado por conteúdo) têm variantes; imagens
+externas, nomes antigos (uuid) ou miniaturas que falharam ficam sem e o
+anúncio serve a original.
+
+As miniaturas ficam prontas depois da resposta do upload, normalmente
+depois do create_listing também. Por isso imageVariants é preenchido nos
+dois lados (fill_missing_variants): no fim da geração, nos anúncios que já
+usam a imagem, e logo depois do insert/update, se os arquivos ficaram
+prontos nesse meio tempo. Um dos dois sempre vê o anúncio e os arquivos.
+
+Pillow é dependência opcional: sem ela, nada é gerado e os anúncios
+continuam servindo a imagem original.
+"""
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.services.media import CONTENT_NAME
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (160, 480, 1080)
+# formatos que o Pillow abre sem plugins
+_PROCESSABLE = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
+
+# tamanhos usados pelas telas
+CARD_WIDTH = 480    # cards do feed (ListingOut.thumbnail)
+THUMB_WIDTH = 160   # listas compactas (favoritos, itens do pedido)
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def variant_key(width: int) -> str:
+    return f"w{width}"
+
+
+def variant_name(name: str, width: int) -> str:
+    stem, _ = os.path.splitext(name)
+    return f"{stem}_{variant_key(width)}.webp"
+
+
+def _resize_to_webp(src: str, widths: tuple) -> List[str]:
+    # roda no processo filho
+    from PIL import Image, ImageOps
+
+    out = []
+    with Image.open(src) as im:
+        im = ImageOps.exif_transpose(im)
+        if im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA" if "transparency" in im.info else "RGB")
+        for width in widths:
+            dest = os.path.join(os.path.dirname(src), variant_name(os.path.basename(src), width))
+            if os.path.exists(dest):
+                continue  # imagem repetida (mesmo hash): derivados já existem
+            copy = im.copy()
+            copy.thumbnail((width, width * 4))  # limita pela largura; não amplia
+            copy.save(dest + ".part", "WEBP", quality=80, method=4)
+            os.replace(dest + ".part", dest)
+            out.append(dest)
+    return out
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def pillow_available() -> bool:
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+async def generate_variants(media_dir: str, names: List[str]) -> None:
+    """Gera as miniaturas de todas as imagens (chamado como background task)."""
+    if not pillow_available():
+        return
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    jobs = [
+        loop.run_in_executor(executor, _resize_to_webp, os.path.join(media_dir, name), VARIANT_WIDTHS)
+        for name in names
+        if os.path.splitext(name)[1].lower() in _PROCESSABLE
+    ]
+    for result in await asyncio.gather(*jobs, return_exceptions=True):
+        if isinstance(result, BaseException):
+            logger.warning("falha ao gerar miniaturas: %s", result)
+
+
+def media_name(url: str, origin: str = "") -> Optional[str]:
+    """Nome do arquivo em MEDIA_DIR se a URL é um original enviado a este servidor."""
+    parts = urlsplit(url)
+    if parts.netloc and parts.netloc != origin:
+        return None  # imagem externa (CDN etc.)
+    if not parts.path.startswith("/media/"):
+        return None
+    name = parts.path[len("/media/"):]
+    match = CONTENT_NAME.match(name)
+    # só originais endereçados por conteúdo (nem derivados _wNNN, nem nomes uuid antigos)
+    if match is None or "_w" in match.group(1) or os.path.splitext(name)[1] not in _PROCESSABLE:
+        return None
+    return name
+
+
+def variant_urls(url: str, origin: str = "") -> Optional[Dict[str, str]]:
+    """
+    URLs das miniaturas de uma imagem enviada a este servidor; None se não houver.
+    `origin` é o host:porta do servidor (netloc); URLs de outro host nunca têm variantes.
+    Faz E/S de disco (confere se os derivados existem): chamar no threadpool.
+    """
+    name = media_name(url, origin)
+    if name is None:
+        return None
+    media_dir = os.path.abspath(settings.MEDIA_DIR)
+    names = {w: variant_name(name, w) for w in VARIANT_WIDTHS}
+    if not all(os.path.isfile(os.path.join(media_dir, n)) for n in names.values()):
+        return None  # geração falhou ou ainda não terminou: fica a original
+    base = url[: url.rindex("/") + 1]
+    return {variant_key(w): base + n for w, n in names.items()}
+
+
+def image_variants(images: List[str], origin: str = "") -> List[Optional[Dict[str, str]]]:
+    """Lista paralela a images, gravada no anúncio como imageVariants."""
+    return [variant_urls(u, origin) for u in images]
+
+
+def pending_variants(images: List[str], variants: List[Optional[dict]], origin: str = "") -> List[str]:
+    """Imagens deste servidor que ainda estão sem variantes (miniaturas em geração)."""
+    return [u for u, v in zip(images, variants) if v is None and media_name(u, origin)]
+
+
+async def fill_missing_variants(listings_col, urls: Iterable[str], origin: str = "") -> List[ObjectId]:
+    """
+    Completa imageVariants dos anúncios que usam alguma das URLs e ainda
+    estão sem variantes para ela. Devolve os _id atualizados.
+
+    A escrita é condicionada a images não ter mudado desde a leitura: um
+    PATCH no meio do caminho já gravou imageVariants da lista nova.
+    """
+    wanted = set(urls)
+    if not wanted:
+        return []
+    docs = await listings_col.find(
+        {"images": {"$in": list(wanted)}}, {"images": 1, "imageVariants": 1}
+    ).to_list(length=None)
+
+    found: Dict[str, Optional[Dict[str, str]]] = {}
+    ops, ids = [], []
+    for d in docs:
+        images = d.get("images") or []
+        variants = (list(d.get("imageVariants") or []) + [None] * len(images))[: len(images)]
+        changed = False
+        for i, url in enumerate(images):
+            if variants[i] is None and url in wanted:
+                if url not in found:
+                    found[url] = await run_in_threadpool(variant_urls, url, origin)
+                variants[i] = found[url]
+                changed = changed or variants[i] is not None
+        if changed:
+            ops.append(UpdateOne({"_id": d["_id"], "images": images}, {"$set": {"imageVariants": variants}}))
+            ids.append(d["_id"])
+    if ops:
+        await listings_col.bulk_write(ops, ordered=False)
+    return ids
+
+
+def pick_thumbnail(doc: dict, width: int) -> Optional[str]:
+    """Menor derivado adequado da capa do anúncio; cai para a original."""
+    images = doc.get("images") or []
+    if not images:
+        return None
+    variants = (doc.get("imageVariants") or [None])[0] or {}
+    return variants.get(variant_key(width)) or str(images[0])
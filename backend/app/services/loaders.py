@@ -0,0 +1,110 @@
+# app/services/loaders.py
+"""
+Dataloader de anúncios por requisição.
+
+Qualquer código que precise de anúncios pelo _id (rotas de listings,
+favoritos, pedidos) pede ao ListingLoader da requisição em vez de chamar
+find_one. As chamadas feitas no mesmo "tick" do event loop são juntadas
+numa única consulta {"_id": {"$in": [...]}} com projeção, e cada _id é
+buscado no máximo uma vez por requisição.
+
+O loader vive em request.state, então dependências e rotas diferentes da
+mesma requisição compartilham o mesmo cache. Não use dentro de transação:
+a consulta não leva session.
+"""
+import asyncio
+from typing import Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from fastapi import Depends, Request
+
+from app.db.mongo import get_db, read_db
+
+# campos de ListingOut + o que o carrinho/checkout comparam
+LISTING_PROJECTION = {
+    "_id": 1,
+    "title": 1,
+    "description": 1,
+    "price": 1,
+    "stock": 1,
+    "categoryId": 1,
+    "images": 1,
+    "imageVariants": 1,
+    "status": 1,
+    "sellerId": 1,
+    "sellerName": 1,
+    "updatedAt": 1,
+}
+
+# limite de _ids por consulta $in
+MAX_BATCH = 500
+
+
+class ListingLoader:
+    def __init__(self, collection, projection: Optional[dict] = None):
+        self._col = collection
+        self._projection = projection or LISTING_PROJECTION
+        self._futures: Dict[ObjectId, asyncio.Future] = {}
+        self._queue: List[ObjectId] = []
+        self.queries = 0  # quantas consultas foram ao banco (diagnóstico)
+
+    async def load(self, oid: ObjectId) -> Optional[dict]:
+        """Um anúncio, ou None se não existir."""
+        return (await self.load_many([oid]))[0]
+
+    async def load_many(self, oids: Iterable[ObjectId]) -> List[Optional[dict]]:
+        """Anúncios na mesma ordem de oids (None para os que não existem)."""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for oid in oids:
+            fut = self._futures.get(oid)
+            if fut is None:
+                fut = self._futures[oid] = loop.create_future()
+                if not self._queue:
+                    # primeira chave do tick: despacha depois que os outros pedidos entrarem
+                    loop.call_soon(self._dispatch)
+                self._queue.append(oid)
+            futures.append(fut)
+        return list(await asyncio.gather(*futures))
+
+    def _dispatch(self) -> None:
+        batch, self._queue = self._queue, []
+        for i in range(0, len(batch), MAX_BATCH):
+            asyncio.ensure_future(self._fetch(batch[i:i + MAX_BATCH]))
+
+    async def _fetch(self, batch: List[ObjectId]) -> None:
+        self.queries += 1
+        try:
+            docs = await self._col.find(
+                {"_id": {"$in": batch}}, self._projection
+            ).to_list(length=len(batch))
+        except Exception as e:
+            for oid in batch:
+                fut = self._futures.pop(oid, None)
+                if fut is not None and not fut.done():
+                    fut.set_exception(e)
+            return
+        found = {d["_id"]: d for d in docs}
+        for oid in batch:
+            fut = self._futures.get(oid)
+            if fut is not None and not fut.done():
+                fut.set_result(found.get(oid))
+
+
+def listing_loader(route: Optional[str] = None):
+    """
+    Dependency com o ListingLoader da requisição.
+    Uso: loader = Depends(listing_loader()) (primário) ou listing_loader("feed").
+    """
+    db_dependency = read_db(route) if route else get_db
+
+    async def dependency(request: Request, db=Depends(db_dependency)) -> ListingLoader:
+        loaders = getattr(request.state, "listing_loaders", None)
+        if loaders is None:
+            loaders = request.state.listing_loaders = {}
+        loader = loaders.get(route)
+        if loader is None:
+            loader = loaders[route] = ListingLoader(db["listings"])
+        return loader
+
+    return dependency
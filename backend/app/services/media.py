@@ -0,0 +1,221 @@
+# app/services/media.py
+"""
+Armazenamento de imagens enviadas em /listings/upload.
+
+O arquivo é copiado em pedaços (CHUNK_SIZE) e toda E/S de disco roda no
+threadpool, para um upload grande não travar o event loop. O tipo é
+validado pelos bytes iniciais (magic bytes), não pela extensão do nome.
+
+Os arquivos são endereçados pelo conteúdo: o nome é o sha256 dos bytes,
+então a mesma foto enviada de novo não ocupa disco outra vez e pode ser
+servida com cache imutável (ContentAddressedStaticFiles).
+"""
+import asyncio
+import hashlib
+import os
+import re
+from typing import List, Optional
+from uuid import uuid4
+
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from app.core.config import settings
+
+CHUNK_SIZE = 256 * 1024
+MB = 1024 * 1024
+# folga para os cabeçalhos e delimitadores do multipart além dos bytes das imagens
+MULTIPART_OVERHEAD = 64 * 1024
+
+# <sha256>.<ext> e derivados <sha256>_w160.webp
+CONTENT_NAME = re.compile(r"^([0-9a-f]{64}(?:_w\d+)?)\.[a-z0-9]+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def sniff_image_ext(head: bytes) -> Optional[str]:
+    """Extensão a partir da assinatura do arquivo; None se não for imagem aceita."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return ".jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return ".png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return ".gif"
+    if head[4:8] == b"ftyp" and head[8:12] in (b"heic", b"heix", b"mif1", b"msf1"):
+        return ".heic"
+    return None
+
+
+class UploadBudget:
+    """Limite de bytes somados de todos os arquivos de uma requisição."""
+
+    def __init__(self, max_bytes: int):
+        self.remaining = max_bytes
+
+    def take(self, n: int) -> None:
+        self.remaining -= n
+        if self.remaining < 0:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Upload excede {settings.UPLOAD_MAX_REQUEST_MB} MB no total",
+            )
+
+
+class UploadSizeLimit:
+    """
+    Middleware ASGI que limita o corpo do POST de upload antes do parser
+    multipart: o FastAPI lê o formulário inteiro (arquivos em
+    SpooledTemporaryFile, que passa para o disco) antes da rota e das
+    dependências, então UploadBudget sozinho só recusa depois do spool.
+
+    Content-Length acima do limite -> 413 sem ler o corpo. Sem
+    Content-Length (chunked), os bytes são contados no receive e a leitura
+    é interrompida com 413 ao passar do limite.
+    """
+
+    def __init__(self, app, path: str):
+        self.app = app
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] != self.path:
+            await self.app(scope, receive, send)
+            return
+
+        max_bytes = settings.UPLOAD_MAX_REQUEST_MB * MB + MULTIPART_OVERHEAD
+        too_large = HTTPException(
+            status_code=413,
+            detail=f"Upload excede {settings.UPLOAD_MAX_REQUEST_MB} MB no total",
+        )
+        length = Headers(scope=scope).get("content-length")
+        if length is not None and length.isdigit() and int(length) > max_bytes:
+            # erro levantado na primeira leitura do corpo, dentro da rota,
+            # para sair pelo handler de HTTPException como os outros 413
+            async def reject():
+                raise too_large
+
+            await self.app(scope, reject, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    raise too_large
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def ensure_media_dir() -> str:
+    media_dir = os.path.abspath(settings.MEDIA_DIR)
+    os.makedirs(media_dir, exist_ok=True)
+    return media_dir
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _write_chunk(out, hasher, chunk: bytes) -> None:
+    hasher.update(chunk)
+    out.write(chunk)
+
+
+def _commit(tmp: str, dest: str) -> bool:
+    """Move o temporário para o nome final; devolve False se já existia (duplicado)."""
+    if os.path.exists(dest):
+        os.remove(tmp)
+        return False
+    os.replace(tmp, dest)
+    return True
+
+
+async def save_upload(f: UploadFile, media_dir: str, budget: UploadBudget) -> str:
+    """Grava um arquivo em media_dir e devolve o nome (sha256 do conteúdo + extensão)."""
+    max_file = settings.UPLOAD_MAX_FILE_MB * MB
+
+    head = await f.read(CHUNK_SIZE)
+    ext = sniff_image_ext(head)
+    if ext is None:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Arquivo '{f.filename}' não é uma imagem suportada (jpg, png, webp, gif, heic)",
+        )
+
+    tmp = os.path.join(media_dir, f".{uuid4().hex}.part")
+    hasher = hashlib.sha256()
+
+    out = await run_in_threadpool(open, tmp, "wb")
+    size = 0
+    try:
+        chunk = head
+        while chunk:
+            size += len(chunk)
+            if size > max_file:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Arquivo '{f.filename}' excede {settings.UPLOAD_MAX_FILE_MB} MB",
+                )
+            budget.take(len(chunk))
+            await run_in_threadpool(_write_chunk, out, hasher, chunk)
+            chunk = await f.read(CHUNK_SIZE)
+        await run_in_threadpool(out.close)
+        name = f"{hasher.hexdigest()}{ext}"
+        await run_in_threadpool(_commit, tmp, os.path.join(media_dir, name))
+    except BaseException:
+        await run_in_threadpool(out.close)
+        await run_in_threadpool(_remove_quietly, tmp)
+        raise
+    return name
+
+
+async def save_uploads(files: List[UploadFile]) -> List[str]:
+    """Grava todos os arquivos em paralelo (duplicados não são regravados)."""
+    if len(files) > settings.UPLOAD_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"Envie no máximo {settings.UPLOAD_MAX_FILES} imagens")
+
+    media_dir = await run_in_threadpool(ensure_media_dir)
+    budget = UploadBudget(settings.UPLOAD_MAX_REQUEST_MB * MB)
+
+    results = await asyncio.gather(
+        *(save_upload(f, media_dir, budget) for f in files), return_exceptions=True
+    )
+    errors = [r for r in results if isinstance(r, BaseException)]
+    if errors:
+        # arquivos endereçados por conteúdo podem ser compartilhados com outros
+        # anúncios, então só o temporário do que falhou é apagado
+        raise errors[0]
+    return results
+
+
+class ContentAddressedStaticFiles(StaticFiles):
+    """
+    StaticFiles para /media: arquivos com nome de hash nunca mudam, então
+    recebem ETag forte (o próprio hash) e Cache-Control immutable.
+    GET condicional (If-None-Match/If-Modified-Since -> 304) vem do
+    StaticFiles e Range/If-Range do FileResponse.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        match = CONTENT_NAME.match(os.path.basename(full_path))
+        if match:
+            response.headers["etag"] = f'"{match.group(1)}"'
+            response.headers["cache-control"] = IMMUTABLE
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,143 @@
+# app/services/orders.py
+"""
+Escrita de pedidos: criação (POST /orders e checkout do carrinho) e
+mudança de status.
+
+Quem chama monta os itens (snapshot no formato de OrderItemOut) e as
+quantidades por anúncio; place_order abate o estoque e grava o pedido.
+transition_order muda o status seguindo TRANSITIONS e, no cancelamento,
+devolve o estoque. Ambos devem rodar dentro de run_in_transaction
+(session pode ser None).
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, FrozenSet, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from app.services.seller_stats import record_order
+from app.services.stock import release_stock, reserve_stock
+
+logger = logging.getLogger(__name__)
+
+# máquina de estados do pedido: status atual -> próximos permitidos
+TRANSITIONS: Dict[str, FrozenSet[str]] = {
+    "pending": frozenset({"paid", "cancelled"}),
+    "paid": frozenset({"shipped", "cancelled"}),
+    "shipped": frozenset({"delivered"}),
+    "delivered": frozenset(),
+    "cancelled": frozenset(),
+}
+
+
+def can_transition(current: str, new: str) -> bool:
+    return new in TRANSITIONS.get(current, frozenset())
+
+
+def sources_of(new: str) -> List[str]:
+    """Status a partir dos quais se pode ir para `new`."""
+    return [s for s, nxt in TRANSITIONS.items() if new in nxt]
+
+
+def order_item(
+    listing_id, title: str, unit_price: float, quantity: int, thumbnail: Optional[str], seller_id=None
+) -> dict:
+    """Snapshot de um item no formato de OrderItemOut (+ sellerId, para o painel do vendedor)."""
+    return {
+        "listingId": str(listing_id),
+        "sellerId": str(seller_id) if seller_id is not None else None,
+        "title": title,
+        "unitPrice": unit_price,
+        "quantity": quantity,
+        "lineTotal": unit_price * quantity,
+        "thumbnail": thumbnail,
+    }
+
+
+async def place_order(
+    db,
+    user_id: str,
+    items: List[dict],
+    quantities: Dict[ObjectId, int],
+    *,
+    shipping_address: Optional[str] = None,
+    notes: Optional[str] = None,
+    session=None,
+    guards: Optional[Dict[ObjectId, dict]] = None,
+) -> dict:
+    """
+    Abate o estoque (escritas condicionais, tudo ou nada), insere o pedido
+    e soma a venda no painel dos vendedores.
+    Levanta InsufficientStock se algum anúncio não tinha estoque ou não passou nos guards.
+    """
+    stock_after = await reserve_stock(db["listings"], quantities, session=session, guards=guards)
+
+    now = datetime.now(timezone.utc)
+    doc = {
+        "userId": str(user_id),
+        "status": "pending",
+        "items": items,
+        "total": sum(i["lineTotal"] for i in items),
+        "shippingAddress": shipping_address,
+        "notes": notes,
+        "createdAt": now,
+        "updatedAt": now,
+    }
+    try:
+        result = await db["orders"].insert_one(doc, session=session)
+    except BaseException:
+        # sem transação o abatimento já está gravado: devolve antes de propagar
+        if session is None:
+            await release_stock(db["listings"], quantities)
+        raise
+    doc["_id"] = result.inserted_id
+
+    try:
+        await record_order(
+            db, doc, +1, session=session,
+            stock_delta={oid: -qty for oid, qty in quantities.items()}, stock_after=stock_after,
+        )
+    except Exception:
+        if session is not None:
+            raise
+        # sem transação pedido e estoque já estão certos; só o painel fica para trás
+        # (scripts/rebuild_seller_stats.py corrige) em vez de um 500 com o pedido criado
+        logger.exception("falha ao somar o pedido %s no painel dos vendedores", doc["_id"])
+    return doc
+
+
+def item_quantities(order: dict) -> Dict[ObjectId, int]:
+    quantities: Dict[ObjectId, int] = defaultdict(int)
+    for item in order.get("items", []):
+        quantities[ObjectId(item["listingId"])] += item["quantity"]
+    return dict(quantities)
+
+
+async def transition_order(db, order_oid: ObjectId, user_id: str, new_status: str, session=None) -> Optional[dict]:
+    """
+    Muda o status numa única escrita condicionada ao status atual
+    (find_one_and_update), então duas requisições concorrentes nunca fazem
+    a mesma transição. No cancelamento devolve o estoque (um $inc por anúncio) e
+    desconta a venda do painel, na mesma session.
+
+    Devolve o pedido atualizado, ou None se não existe, não é do usuário
+    ou o status atual não permite a transição (quem chama descobre qual).
+    """
+    now = datetime.now(timezone.utc)
+    before = await db["orders"].find_one_and_update(
+        {"_id": order_oid, "userId": str(user_id), "status": {"$in": sources_of(new_status)}},
+        {"$set": {"status": new_status, "updatedAt": now}},
+        return_document=ReturnDocument.BEFORE,
+        session=session,
+    )
+    if before is None:
+        return None
+
+    if new_status == "cancelled":
+        quantities = item_quantities(before)
+        stock_after = await release_stock(db["listings"], quantities, session=session)
+        await record_order(db, before, -1, session=session, stock_delta=quantities, stock_after=stock_after)
+
+    return {**before, "status": new_status, "updatedAt": now}
@@ -0,0 +1,35 @@
+# app/services/sellers.py
+"""
+Snapshot do vendedor gravado em cada anúncio (sellerName).
+
+O feed lê o nome direto do documento do anúncio, sem $lookup em users.
+Quando o full_name do usuário muda, propagate_seller_name atualiza todos
+os anúncios dele numa única update_many.
+"""
+from typing import Optional
+
+from bson import ObjectId
+
+
+def seller_id_values(user_id: str) -> list:
+    """sellerId pode estar salvo como string e/ou ObjectId."""
+    vals: list = [str(user_id)]
+    if ObjectId.is_valid(user_id):
+        vals.append(ObjectId(user_id))
+    return vals
+
+
+async def get_seller_name(db, user_id: str) -> Optional[str]:
+    users = db["users"]
+    filt = {"_id": ObjectId(user_id)} if ObjectId.is_valid(user_id) else {"id": user_id}
+    doc = await users.find_one(filt, {"full_name": 1})
+    return (doc or {}).get("full_name")
+
+
+async def propagate_seller_name(db, user_id: str, full_name: Optional[str]) -> int:
+    """Atualiza o sellerName de todos os anúncios do usuário. Retorna quantos mudaram."""
+    result = await db["listings"].update_many(
+        {"sellerId": {"$in": seller_id_values(user_id)}, "sellerName": {"$ne": full_name}},
+        {"$set": {"sellerName": full_name}},
+    )
+    return result.modified_count
@@ -0,0 +1,208 @@
+# app/services/serializers.py
+"""
+Documento do Mongo -> dict no formato dos modelos de saída.
+
+Cada função espelha um modelo de app/models (ListingOut, OrderOut,
+OrderItemOut, FavoriteOut, CartOut...) campo a campo; se um modelo mudar, a função
+correspondente muda junto. O resultado vai direto para JSONBytesResponse.
+
+Os FieldSet (?fields=) ficam aqui também: dizem de quais campos do
+documento cada campo da resposta depende.
+"""
+from typing import FrozenSet, Optional
+
+from app.core.fields import FieldSet
+from app.services.images import CARD_WIDTH, pick_thumbnail
+
+
+def _float_or_none(v) -> Optional[float]:
+    return float(v) if v is not None else None
+
+
+def listing_out(d: dict) -> dict:
+    """ListingOut"""
+    return {
+        "id": str(d["_id"]),
+        "title": d.get("title", ""),
+        "description": d.get("description", ""),
+        "price": float(d.get("price", 0)),
+        "stock": int(d.get("stock", 0)),
+        "categoryId": str(d["categoryId"]) if d.get("categoryId") is not None else "",
+        "images": [str(u) for u in (d.get("images") or [])],
+        "thumbnail": pick_thumbnail(d, CARD_WIDTH),
+        "status": d.get("status", "active"),
+        "sellerName": d.get("sellerName"),
+        "isFavorite": False,  # preenchido pela rota (app/services/favorites.py)
+    }
+
+
+LISTING_FIELDS = FieldSet({
+    "id": ("_id",),
+    "title": ("title",),
+    "description": ("description",),
+    "price": ("price",),
+    "stock": ("stock",),
+    "categoryId": ("categoryId",),
+    "images": ("images",),
+    "thumbnail": ("images", "imageVariants"),
+    "status": ("status",),
+    "sellerName": ("sellerName",),
+    "isFavorite": (),
+}, always=("_id", "createdAt"))
+
+
+def order_item_out(i: dict) -> dict:
+    """OrderItemOut"""
+    return {
+        "listingId": str(i["listingId"]),
+        "title": i.get("title", ""),
+        "unitPrice": float(i.get("unitPrice", 0)),
+        "quantity": int(i.get("quantity", 0)),
+        "lineTotal": float(i.get("lineTotal", 0)),
+        "thumbnail": i.get("thumbnail"),
+    }
+
+
+def order_out(d: dict) -> dict:
+    """OrderOut"""
+    return {
+        "id": str(d["_id"]),
+        "userId": str(d["userId"]),
+        "status": d["status"],
+        "items": [order_item_out(i) for i in d.get("items", [])],
+        "total": float(d.get("total", 0)),
+        "shippingAddress": d.get("shippingAddress"),
+        "notes": d.get("notes"),
+        "createdAt": d["createdAt"],
+        "updatedAt": d["updatedAt"],
+    }
+
+
+ORDER_FIELDS = FieldSet({
+    "id": ("_id",),
+    "userId": ("userId",),
+    "status": ("status",),
+    "items": ("items",),
+    "total": ("total",),
+    "shippingAddress": ("shippingAddress",),
+    "notes": ("notes",),
+    "createdAt": ("createdAt",),
+    "updatedAt": ("updatedAt",),
+}, always=("_id", "userId", "status", "createdAt", "updatedAt"))
+
+
+# projeção do modo resumo: nada de items inteiro, só contagem e a 1ª miniatura
+ORDER_SUMMARY_PROJECTION = {
+    "_id": 1,
+    "status": 1,
+    "total": 1,
+    "createdAt": 1,
+    "itemCount": {"$sum": "$items.quantity"},
+    "thumbnail": {"$arrayElemAt": ["$items.thumbnail", 0]},
+}
+
+
+def order_summary_out(d: dict) -> dict:
+    """OrderSummaryOut"""
+    return {
+        "id": str(d["_id"]),
+        "status": d["status"],
+        "total": float(d.get("total", 0)),
+        "itemCount": int(d.get("itemCount", 0)),
+        "thumbnail": d.get("thumbnail"),
+        "createdAt": d["createdAt"],
+    }
+
+
+# fontes são chaves de ORDER_SUMMARY_PROJECTION (itemCount/thumbnail são expressões sobre items)
+ORDER_SUMMARY_FIELDS = FieldSet({
+    "id": ("_id",),
+    "status": ("status",),
+    "total": ("total",),
+    "itemCount": ("itemCount",),
+    "thumbnail": ("thumbnail",),
+    "createdAt": ("createdAt",),
+}, always=("_id", "status", "createdAt"))
+
+
+def order_summary_projection(selected: Optional[FrozenSet[str]]) -> dict:
+    """$project do modo resumo só com os campos pedidos (sem fields= é a projeção inteira)."""
+    keys = ORDER_SUMMARY_FIELDS.projection(selected, ORDER_SUMMARY_PROJECTION)
+    return {k: ORDER_SUMMARY_PROJECTION[k] for k in keys}
+
+
+def favorite_out(d: dict) -> dict:
+    """FavoriteOut"""
+    return {
+        "id": str(d["_id"]),
+        "listingId": str(d["listingId"]),
+        "userId": str(d["userId"]),
+        "createdAt": d["createdAt"],
+        "title": d.get("title"),
+        "price": _float_or_none(d.get("price")),
+        "thumbnail": d.get("thumbnail"),
+    }
+
+
+FAVORITE_FIELDS = FieldSet({
+    "id": ("_id",),
+    "listingId": ("listingId",),
+    "userId": ("userId",),
+    "createdAt": ("createdAt",),
+    # vêm do anúncio (dataloader), não do documento do favorito
+    "title": (),
+    "price": (),
+    "thumbnail": (),
+}, always=("_id", "listingId", "userId", "createdAt"))
+
+
+def cart_item_out(i: dict) -> dict:
+    """CartItemOut"""
+    quantity = int(i.get("quantity", 0))
+    unit_price = float(i.get("unitPrice", 0))
+    stock = int(i.get("stock", 0))
+    return {
+        "listingId": str(i["listingId"]),
+        "title": i.get("title", ""),
+        "unitPrice": unit_price,
+        "quantity": quantity,
+        "lineTotal": unit_price * quantity,
+        "stock": stock,
+        "available": i.get("status", "active") == "active" and stock >= quantity,
+        "thumbnail": i.get("thumbnail"),
+    }
+
+
+def cart_out(d: Optional[dict], changed=()) -> dict:
+    """CartOut (carrinho ainda não criado = vazio)"""
+    d = d or {}
+    return {
+        "items": [cart_item_out(i) for i in d.get("items", [])],
+        # subtotal é mantido por $inc; arredonda o resíduo de ponto flutuante
+        "subtotal": round(float(d.get("subtotal", 0)), 2),
+        "itemCount": int(d.get("itemCount", 0)),
+        "updatedAt": d.get("updatedAt"),
+        "changed": [str(c) for c in changed],
+    }
+
+
+def seller_stats_out(d: dict) -> dict:
+    """SellerStatsOut"""
+    return {
+        "sellerId": str(d["_id"]),
+        "unitsSold": int(d.get("unitsSold", 0)),
+        "revenue": round(float(d.get("revenue", 0)), 2),
+        "orders": int(d.get("orders", 0)),
+        "activeListings": int(d.get("activeListings", 0)),
+        "lowStockCount": int(d.get("lowStockCount", 0)),
+        "updatedAt": d.get("updatedAt"),
+    }
+
+
+def listing_stats_out(d: dict) -> dict:
+    """ListingStatsOut"""
+    return {
+        "listingId": str(d["_id"]),
+        "unitsSold": int(d.get("unitsSold", 0)),
+        "revenue": round(float(d.get("revenue", 0)), 2),
+    }
@@ -0,0 +1,106 @@
+# app/services/stock.py
+"""
+Reserva/devolução de estoque em lote.
+
+Cada anúncio é abatido com um find_one_and_update condicional (stock >= qty),
+então o estoque nunca fica negativo, mesmo com checkouts concorrentes. A
+escrita devolve o anúncio como ficou logo depois dela: quem chama sabe o
+estoque exato que essa escrita produziu (o painel do vendedor conta o
+cruzamento do limite de estoque baixo por ele, não por uma leitura
+posterior, que outro pedido pode já ter mudado).
+"""
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+# campos devolvidos por reserva/devolução (usados pelo painel do vendedor)
+STOCK_PROJECTION = {"sellerId": 1, "stock": 1, "status": 1}
+
+
+class InsufficientStock(Exception):
+    """Algum anúncio não tinha estoque para a quantidade pedida."""
+
+
+def merge_quantities(items: Iterable) -> Dict[ObjectId, int]:
+    """Soma quantidades de itens repetidos (mesmo listingId) do carrinho."""
+    quantities: Dict[ObjectId, int] = {}
+    for item in items:
+        oid = ObjectId(item.listingId)
+        quantities[oid] = quantities.get(oid, 0) + item.quantity
+    return quantities
+
+
+async def _inc_stock(listings_col, filt: dict, qty: int, now: datetime, session=None) -> Optional[dict]:
+    return await listings_col.find_one_and_update(
+        filt,
+        {"$inc": {"stock": qty}, "$set": {"updatedAt": now}},
+        projection=STOCK_PROJECTION,
+        return_document=ReturnDocument.AFTER,
+        session=session,
+    )
+
+
+async def reserve_stock(
+    listings_col,
+    quantities: Dict[ObjectId, int],
+    session=None,
+    guards: Optional[Dict[ObjectId, dict]] = None,
+) -> Dict[ObjectId, dict]:
+    """
+    Abate o estoque de todos os anúncios (tudo ou nada) e devolve cada
+    anúncio como ficou depois da própria escrita ({_id: {sellerId, stock, status}}).
+
+    Dentro de uma transação as escritas vão em sequência (uma session não
+    aceita operações simultâneas) e basta abortar se alguma não casou.
+    Sem transação (session=None) vão em paralelo, e os anúncios abatidos
+    são devolvidos se algum faltar.
+
+    guards: condições extras por anúncio (ex.: {"price": 10.0, "status": "active"}
+    do snapshot do carrinho); se alguma não casar, a reserva falha igual.
+    updatedAt é atualizado para quem guarda snapshot (carrinho) perceber a mudança.
+    """
+    if not quantities:
+        return {}
+    guards = guards or {}
+    now = datetime.now(timezone.utc)
+
+    def cond(oid, qty):
+        return {**guards.get(oid, {}), "_id": oid, "stock": {"$gte": qty}}
+
+    if session is not None:
+        after: Dict[ObjectId, dict] = {}
+        for oid, qty in quantities.items():
+            doc = await _inc_stock(listings_col, cond(oid, qty), -qty, now, session)
+            if doc is None:
+                raise InsufficientStock()
+            after[oid] = doc
+        return after
+
+    docs = await asyncio.gather(*(
+        _inc_stock(listings_col, cond(oid, qty), -qty, now) for oid, qty in quantities.items()
+    ))
+    after = {oid: doc for oid, doc in zip(quantities, docs) if doc is not None}
+    if len(after) == len(quantities):
+        return after
+
+    # desfaz só os que foram abatidos (cada escrita diz se casou)
+    await release_stock(listings_col, {oid: quantities[oid] for oid in after})
+    raise InsufficientStock()
+
+
+async def release_stock(listings_col, quantities: Dict[ObjectId, int], session=None) -> Dict[ObjectId, dict]:
+    """Devolve o estoque de um pedido cancelado; mesmo retorno de reserve_stock."""
+    if not quantities:
+        return {}
+    now = datetime.now(timezone.utc)
+    if session is not None:
+        docs = [await _inc_stock(listings_col, {"_id": oid}, qty, now, session) for oid, qty in quantities.items()]
+    else:
+        docs = await asyncio.gather(*(
+            _inc_stock(listings_col, {"_id": oid}, qty, now) for oid, qty in quantities.items()
+        ))
+    # anúncio apagado não volta nada
+    return {oid: doc for oid, doc in zip(quantities, docs) if doc is not None}
@@ -0,0 +1,54 @@
+# scripts/backfill_seller_name.py
+"""
+Migração única: grava sellerName nos anúncios antigos (criados antes do snapshot).
+
+Agrupa os anúncios sem sellerName por vendedor e faz uma update_many por
+vendedor num único bulk_write. É idempotente: pode rodar de novo sem efeito.
+
+Uso (a partir de backend/):
+    python -m scripts.backfill_seller_name [--dry-run]
+"""
+import argparse
+import asyncio
+
+from bson import ObjectId
+from pymongo import UpdateMany
+
+from app.db.mongo import get_db
+
+
+async def main(dry_run: bool):
+    db = await get_db()
+    listings = db["listings"]
+    users = db["users"]
+
+    seller_ids = await listings.distinct("sellerId", {"sellerName": {"$exists": False}})
+    if not seller_ids:
+        print("nada a fazer")
+        return
+
+    oids = [s if isinstance(s, ObjectId) else ObjectId(s) for s in seller_ids if ObjectId.is_valid(str(s))]
+    names = {}
+    async for u in users.find({"_id": {"$in": oids}}, {"full_name": 1}):
+        names[str(u["_id"])] = u.get("full_name")
+
+    ops = [
+        UpdateMany(
+            {"sellerId": sid, "sellerName": {"$exists": False}},
+            {"$set": {"sellerName": names.get(str(sid))}},
+        )
+        for sid in seller_ids
+    ]
+    print(f"{len(ops)} vendedores, {sum(1 for s in seller_ids if str(s) in names)} encontrados em users")
+    if dry_run:
+        return
+
+    result = await listings.bulk_write(ops, ordered=False)
+    print(f"{result.modified_count} anúncios atualizados")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.dry_run))
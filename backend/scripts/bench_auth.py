@@ -0,0 +1,69 @@
+# scripts/bench_auth.py
+"""
+Microbenchmark do custo de autenticação por requisição (get_current_user_id).
+
+Compara, para o mesmo token repetido (como o app mobile faz numa sessão):
+  - decode completo a cada chamada (cache desligado);
+  - cache de tokens verificados;
+para cada backend de JWT disponível (python-jose e, se instalado, PyJWT).
+
+Uso (a partir de backend/):
+    python -m scripts.bench_auth --calls 50000
+"""
+import argparse
+import timeit
+
+
+def make_request(token: str):
+    from starlette.requests import Request
+
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(b"authorization", f"Bearer {token}".encode())],
+    })
+
+
+def run_sync(coro):
+    """Roda uma corrotina que não suspende (a dependência não faz E/S) sem event loop."""
+    try:
+        coro.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError("a dependência suspendeu; use um event loop")
+
+
+def main(calls: int):
+    from app.core import deps
+    from app.core.security import create_access_token
+
+    token = create_access_token("6650f0c2a1b2c3d4e5f60718")
+    request = make_request(token)
+
+    backends = ["jose"]
+    try:
+        import jwt  # noqa: F401
+        backends.append("pyjwt")
+    except ImportError:
+        pass
+
+    print(f"{'backend':>8} {'cache':>6} {'µs/req':>9}")
+    baseline = None
+    for backend in backends:
+        deps.decode_token = deps._pyjwt_decoder() if backend == "pyjwt" else deps._decode_jose
+        for cached in (False, True):
+            deps.token_cache.clear()
+            deps.token_cache.max_size = 10_000 if cached else 0
+            run_sync(deps.get_current_user_id(request))  # aquece
+            total = timeit.timeit(lambda: run_sync(deps.get_current_user_id(request)), number=calls)
+            us = total / calls * 1e6
+            baseline = baseline or us
+            print(f"{backend:>8} {'sim' if cached else 'não':>6} {us:>9.2f}   ({baseline / us:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=50_000)
+    args = parser.parse_args()
+    main(args.calls)
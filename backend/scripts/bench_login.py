@@ -0,0 +1,87 @@
+# scripts/bench_login.py
+"""
+Benchmark de login sob carga: logins/s x latência de uma rota não relacionada.
+
+Cria um usuário num banco descartável, dispara logins concorrentes contra
+o app real (httpx + ASGITransport) e, ao mesmo tempo, mede a latência de
+GET /api/health. Com o hash no event loop o p99 do health sobe junto com
+a carga; com o pool de hashing ele deve ficar estável.
+
+Uso (a partir de backend/):
+    python -m scripts.bench_login --concurrency 1 8 32 --seconds 5
+    PASSWORD_HASH_ROUNDS=100000 python -m scripts.bench_login
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+
+def pct(samples, p):
+    samples = sorted(samples)
+    return samples[max(0, int(len(samples) * p) - 1)] if samples else float("nan")
+
+
+async def run_level(http, concurrency: int, seconds: float, email: str, password: str):
+    stop = time.perf_counter() + seconds
+    logins = 0
+    errors = 0
+    health = []
+
+    async def login_worker():
+        nonlocal logins, errors
+        while time.perf_counter() < stop:
+            r = await http.post("/api/auth/login", json={"email": email, "password": password})
+            if r.status_code == 200:
+                logins += 1
+            else:
+                errors += 1
+
+    async def health_probe():
+        while time.perf_counter() < stop:
+            t0 = time.perf_counter()
+            await http.get("/api/health")
+            health.append((time.perf_counter() - t0) * 1000)
+            await asyncio.sleep(0.01)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(health_probe(), *(login_worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    return logins / elapsed, errors, statistics.median(health), pct(health, 0.99)
+
+
+async def main(levels, seconds: float):
+    import httpx
+
+    from app.core.config import settings
+    from app.core.security import hash_password
+    from app.db.mongo import get_db
+    from app.main import app
+
+    db = await get_db()
+    email, password = "bench-login@example.com", "senha-bench-123"
+    await db["users"].delete_many({"email": email})
+    await db["users"].insert_one({
+        "email": email, "full_name": "Bench", "cpf": "00000000000", "phone": "11999999999",
+        "hashed_password": hash_password(password), "is_active": True,
+    })
+
+    print(f"rounds={settings.PASSWORD_HASH_ROUNDS} workers={settings.PASSWORD_HASH_WORKERS}")
+    print(f"{'concorrência':>12} {'logins/s':>10} {'erros':>6} {'health p50':>11} {'health p99':>11}")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as http:
+        for c in levels:
+            rate, errors, p50, p99 = await run_level(http, c, seconds, email, password)
+            print(f"{c:>12} {rate:>10.1f} {errors:>6} {p50:>9.2f}ms {p99:>9.2f}ms")
+
+    await db["users"].delete_many({"email": email})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+    os.environ.setdefault("MONGO_DB_NAME", "appdb_bench")
+    asyncio.run(main(args.concurrency, args.seconds))
@@ -0,0 +1,113 @@
+# scripts/bench_search.py
+"""
+Benchmark da busca do feed: $regex (antigo) x índice de texto (atual).
+
+Popula um banco descartável com N anúncios sintéticos e mede a latência
+das duas estratégias para alguns termos, em tamanhos crescentes de catálogo.
+
+Uso (a partir de backend/, com MONGODB_URI apontando para um Mongo local):
+    python -m scripts.bench_search --sizes 1000 10000 50000 --runs 20
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import TEXT
+
+from app.core.config import settings
+
+MATERIAIS = [
+    "vidro moído", "vidro verde", "papelão reciclado", "latas de alumínio prensadas",
+    "PET flakes transparente", "garrafas PET", "sucata de cobre", "óleo de cozinha usado",
+    "composto orgânico", "paletes de madeira", "tecido de algodão", "borracha triturada",
+]
+ADJETIVOS = ["limpo", "prensado", "em fardos", "separado por cor", "lavado", "seco", "a granel"]
+QUERIES = ["vidro moido", "aluminio", "papelao reciclado", "cobre", "inexistente"]
+
+
+def fake_listing(seller_id: ObjectId) -> dict:
+    mat = random.choice(MATERIAIS)
+    now = datetime.now(timezone.utc)
+    return {
+        "title": f"{mat.capitalize()} {random.choice(ADJETIVOS)}",
+        "description": f"Lote de {mat} {random.choice(ADJETIVOS)}, retirada no local. " * 3,
+        "price": round(random.uniform(1, 500), 2),
+        "stock": random.randint(0, 100),
+        "categoryId": ObjectId(),
+        "images": [],
+        "status": "active",
+        "sellerId": seller_id,
+        "createdAt": now,
+        "updatedAt": now,
+    }
+
+
+async def timed(coro_factory, runs: int) -> tuple[float, float]:
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        await coro_factory()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+async def main(sizes: list[int], runs: int, db_name: str):
+    client = AsyncIOMotorClient(settings.MONGODB_URI)
+    await client.drop_database(db_name)
+    col = client[db_name]["listings"]
+    await col.create_index(
+        [("title", TEXT), ("description", TEXT)],
+        name="listings_text",
+        default_language="portuguese",
+        weights={"title": 10, "description": 2},
+    )
+
+    sellers = [ObjectId() for _ in range(50)]
+    me = ObjectId()
+    inserted = 0
+
+    print(f"{'anúncios':>10} {'termo':>20} {'regex p50':>10} {'regex p95':>10} {'text p50':>10} {'text p95':>10} {'hits':>6}")
+    for size in sorted(sizes):
+        batch = [fake_listing(random.choice(sellers)) for _ in range(size - inserted)]
+        if batch:
+            await col.insert_many(batch)
+        inserted = size
+
+        for q in QUERIES:
+            async def regex():
+                return await col.find({
+                    "sellerId": {"$nin": [me]},
+                    "$or": [
+                        {"title": {"$regex": q, "$options": "i"}},
+                        {"description": {"$regex": q, "$options": "i"}},
+                    ],
+                }).sort("createdAt", -1).limit(20).to_list(length=20)
+
+            async def text():
+                return await col.find(
+                    {"sellerId": {"$nin": [me]}, "$text": {"$search": q}},
+                    {"score": {"$meta": "textScore"}},
+                ).sort([("score", {"$meta": "textScore"}), ("createdAt", -1)]).limit(20).to_list(length=20)
+
+            r50, r95 = await timed(regex, runs)
+            t50, t95 = await timed(text, runs)
+            hits = len(await text())
+            print(f"{size:>10} {q:>20} {r50:>9.2f}ms {r95:>9.2f}ms {t50:>9.2f}ms {t95:>9.2f}ms {hits:>6}")
+
+    await client.drop_database(db_name)
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--db", default=f"{settings.MONGO_DB_NAME}_bench_search")
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.runs, args.db))
@@ -0,0 +1,102 @@
+# scripts/bench_serialization.py
+"""
+Microbenchmark da serialização das respostas de lista, por endpoint.
+
+Para cada formato (GET /api/listings, GET /orders, GET /favorites) compara:
+  - caminho antigo: dict -> modelo Pydantic -> validação do response_model
+    -> JSONResponse (o que o FastAPI fazia ao devolver List[Model]);
+  - caminho novo: app.services.serializers + JSONBytesResponse (orjson,
+    se instalado).
+Também confere que os dois produzem o mesmo JSON.
+
+Uso (a partir de backend/):
+    python -m scripts.bench_serialization --items 50 --calls 2000
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timezone
+
+from bson import ObjectId
+
+
+def sample_listing(i: int) -> dict:
+    base = f"http://localhost:8000/media/{i:064x}"
+    return {
+        "_id": ObjectId(), "title": f"Bicicleta aro 29 #{i}", "description": "Pouco uso. " * 20,
+        "price": 850.0 + i, "stock": 3, "categoryId": ObjectId(), "status": "active",
+        "images": [base + ".jpg", base + "1.jpg"],
+        "imageVariants": [{"w160": base + "_w160.webp", "w480": base + "_w480.webp"}, None],
+        "sellerName": "Maria Souza", "createdAt": datetime.now(timezone.utc),
+    }
+
+
+def sample_order(i: int) -> dict:
+    now = datetime.now(timezone.utc)
+    items = [
+        {"listingId": ObjectId(), "title": f"Item {j}", "unitPrice": 10.0 + j, "quantity": 2,
+         "lineTotal": 2 * (10.0 + j), "thumbnail": f"http://localhost:8000/media/{j:064x}_w160.webp"}
+        for j in range(3)
+    ]
+    return {
+        "_id": ObjectId(), "userId": ObjectId(), "status": "pending", "items": items,
+        "total": sum(x["lineTotal"] for x in items), "shippingAddress": "Rua A, 123",
+        "notes": None, "createdAt": now, "updatedAt": now,
+    }
+
+
+def sample_favorite(i: int) -> dict:
+    return {
+        "_id": ObjectId(), "listingId": ObjectId(), "userId": ObjectId(),
+        "createdAt": datetime.now(timezone.utc), "title": f"Anúncio {i}", "price": 99.9,
+        "thumbnail": f"http://localhost:8000/media/{i:064x}_w160.webp",
+    }
+
+
+def main(n_items: int, calls: int):
+    from typing import List
+
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+
+    from app.core.serialization import JSONBytesResponse, orjson
+    from app.models.favorite import FavoriteOut
+    from app.models.listing import ListingOut
+    from app.models.order import OrderOut
+    from app.services import serializers
+
+    endpoints = [
+        ("GET /api/listings", ListingOut, sample_listing, serializers.listing_out),
+        ("GET /orders", OrderOut, sample_order, serializers.order_out),
+        ("GET /favorites", FavoriteOut, sample_favorite, serializers.favorite_out),
+    ]
+
+    print(f"itens por resposta={n_items} orjson={'sim' if orjson else 'não'}")
+    print(f"{'endpoint':<20} {'pydantic µs':>12} {'direto µs':>10} {'ganho':>7}")
+    for name, model, make, to_dict in endpoints:
+        docs = [make(i) for i in range(n_items)]
+        adapter = TypeAdapter(List[model])
+
+        def old():
+            # o router montava os modelos e o FastAPI revalidava e serializava
+            built = [model(**to_dict(d)) for d in docs]
+            validated = adapter.validate_python(built, from_attributes=True)
+            return JSONResponse(adapter.dump_python(validated, mode="json")).body
+
+        def new():
+            return JSONBytesResponse([to_dict(d) for d in docs]).body
+
+        if json.loads(old()) != json.loads(new()):
+            raise SystemExit(f"{name}: saída diferente entre os dois caminhos")
+
+        t_old = timeit.timeit(old, number=calls) / calls * 1e6
+        t_new = timeit.timeit(new, number=calls) / calls * 1e6
+        print(f"{name:<20} {t_old:>12.1f} {t_new:>10.1f} {t_old / t_new:>6.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=50)
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.items, args.calls)
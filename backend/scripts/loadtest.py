@@ -0,0 +1,425 @@
+# scripts/loadtest.py
+"""
+Teste de carga reproduzível do app real (httpx + ASGITransport, sem rede).
+
+1) Popula um banco descartável (--db, sempre terminado em _loadtest; é
+   apagado no começo e no fim, MONGO_DB_NAME do ambiente é ignorado) com
+   um catálogo sintético: N usuários, anúncios, favoritos e pedidos
+   (mesmo vocabulário do bench_search).
+2) Fase "mixed": W workers executam cenários sorteados por peso até
+   --duration segundos:
+     feed      GET /api/listings (+ 2 páginas pelo cursor, às vezes por categoria)
+     search    GET /api/listings?q=...
+     favorite  POST /favorites, GET /favorites?live=true, DELETE /favorites/by-listing/{id}
+     checkout  POST /cart/items (2x), POST /cart/checkout com Idempotency-Key
+     upload    POST /api/listings/upload (PNG gerado) + POST /api/listings
+3) Fase "burst": --burst checkouts disparados ao mesmo tempo.
+4) Mostra, por endpoint, requisições/s e p50/p95/p99 e grava tudo em JSON
+   (--out); com --compare, mostra a variação em relação a um JSON anterior.
+
+Com --mock usa mongomock-motor (sem Mongo; busca $text não existe lá, então
+o cenário search fica de fora e os números servem só para comparar o custo
+do próprio app). --seed fixa o sorteio, para execuções comparáveis.
+Obs.: no ASGITransport as background tasks rodam antes da resposta
+terminar, então o upload inclui a geração das miniaturas.
+
+Uso (a partir de backend/):
+    python -m scripts.loadtest --mock --duration 10 --out loadtest.json
+    python -m scripts.loadtest --users 200 --listings 20000 --concurrency 32 \\
+        --out after.json --compare before.json          # Mongo de MONGODB_URI
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+import zlib
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+# sufixo obrigatório do banco (apagado no começo e no fim da execução)
+DB_SUFFIX = "_loadtest"
+
+SCENARIOS = {"feed": 5, "search": 2, "favorite": 2, "checkout": 1, "upload": 0.3}
+
+
+# ===== medição =====
+class Recorder:
+    """Latências (ms) e status por endpoint (método + template da rota)."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+
+    async def call(self, http, endpoint: str, method: str, url: str, **kwargs):
+        t0 = time.perf_counter()
+        r = await http.request(method, url, **kwargs)
+        self.samples[endpoint].append((time.perf_counter() - t0) * 1000)
+        self.statuses[endpoint][r.status_code] += 1
+        return r
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for name, samples in sorted(self.samples.items()):
+            samples.sort()
+            codes = self.statuses[name]
+            endpoints[name] = {
+                "requests": len(samples),
+                "throughputRps": round(len(samples) / elapsed, 2),
+                "errors": sum(n for code, n in codes.items() if code >= 500),
+                "statuses": {str(k): v for k, v in sorted(codes.items())},
+                "p50Ms": percentile(samples, 50),
+                "p95Ms": percentile(samples, 95),
+                "p99Ms": percentile(samples, 99),
+                "maxMs": round(samples[-1], 3),
+            }
+        total = sum(len(s) for s in self.samples.values())
+        return {
+            "elapsedS": round(elapsed, 3),
+            "requests": total,
+            "throughputRps": round(total / elapsed, 2) if elapsed else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+def percentile(sorted_samples: List[float], p: float) -> float:
+    """Percentil por posição (nearest-rank) de uma lista já ordenada."""
+    idx = max(0, math.ceil(p / 100 * len(sorted_samples)) - 1)
+    return round(sorted_samples[idx], 3)
+
+
+# ===== dados sintéticos =====
+def tiny_png(seed: int) -> bytes:
+    """PNG 8x8 de uma cor (muda com seed, para não cair na deduplicação do /media)."""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    color = seed.to_bytes(3, "big", signed=False)
+    raw = b"".join(b"\x00" + color * 8 for _ in range(8))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", 8, 8, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw))
+        + chunk(b"IEND", b"")
+    )
+
+
+async def seed_catalog(db, rng: random.Random, n_users: int, n_listings: int, n_favorites: int, n_orders: int) -> dict:
+    from bson import ObjectId
+
+    from scripts.bench_search import ADJETIVOS, MATERIAIS
+
+    now = datetime.now(timezone.utc)
+    users = [ObjectId() for _ in range(n_users)]
+    categories = [ObjectId() for _ in range(12)]
+    await db["users"].insert_many([
+        {"_id": u, "name": f"Usuário {i}", "email": f"user{i}@loadtest.local", "cpf": f"{i:011d}", "createdAt": now}
+        for i, u in enumerate(users)
+    ])
+
+    listings = []
+    for i in range(n_listings):
+        mat = rng.choice(MATERIAIS)
+        created = now - timedelta(minutes=n_listings - i)
+        listings.append({
+            "_id": ObjectId(),
+            "title": f"{mat.capitalize()} {rng.choice(ADJETIVOS)}",
+            "description": f"Lote de {mat} {rng.choice(ADJETIVOS)}, retirada no local.",
+            "price": round(rng.uniform(1, 500), 2),
+            "stock": rng.randint(5, 500),
+            "categoryId": rng.choice(categories),
+            "images": [],
+            "status": "active" if rng.random() < 0.9 else "paused",
+            "sellerId": rng.choice(users),
+            "sellerName": "Vendedor",
+            "createdAt": created,
+            "updatedAt": created,
+        })
+    if listings:
+        await db["listings"].insert_many(listings)
+
+    pairs = set()
+    while listings and len(pairs) < min(n_favorites, n_users * n_listings):
+        pairs.add((rng.choice(users), rng.randrange(n_listings)))
+    if pairs:
+        await db["favorites"].insert_many([
+            {"userId": str(u), "listingId": listings[i]["_id"], "listingActive": listings[i]["status"] == "active",
+             "createdAt": now - timedelta(seconds=n)}
+            for n, (u, i) in enumerate(pairs)
+        ])
+
+    orders = []
+    for n in range(n_orders if listings else 0):
+        picked = rng.sample(listings, k=min(len(listings), rng.randint(1, 3)))
+        items = [
+            {"listingId": str(l["_id"]), "sellerId": str(l["sellerId"]), "title": l["title"],
+             "unitPrice": l["price"], "quantity": 1, "lineTotal": l["price"], "thumbnail": None}
+            for l in picked
+        ]
+        orders.append({
+            "userId": str(rng.choice(users)), "status": rng.choice(["pending", "paid", "shipped", "delivered"]),
+            "items": items, "total": sum(i["lineTotal"] for i in items),
+            "shippingAddress": None, "notes": None,
+            "createdAt": now - timedelta(seconds=n), "updatedAt": now,
+        })
+    if orders:
+        await db["orders"].insert_many(orders)
+
+    active = [str(l["_id"]) for l in listings if l["status"] == "active"]
+    return {
+        "users": [str(u) for u in users],
+        "categories": [str(c) for c in categories],
+        "active": active,
+        "owner": {str(l["_id"]): str(l["sellerId"]) for l in listings},
+    }
+
+
+# ===== cenários =====
+class Scenarios:
+    def __init__(self, http, rec: Recorder, catalog: dict, rng: random.Random, tokens: Dict[str, dict]):
+        self.http, self.rec, self.catalog, self.rng, self.tokens = http, rec, catalog, rng, tokens
+
+    def user(self) -> tuple:
+        uid = self.rng.choice(self.catalog["users"])
+        return uid, self.tokens[uid]
+
+    def listing_for(self, uid: str) -> str:
+        # o feed esconde os anúncios do próprio usuário; o carrinho também os recusa
+        for _ in range(20):
+            lid = self.rng.choice(self.catalog["active"])
+            if self.catalog["owner"][lid] != uid:
+                break
+        return lid
+
+    async def feed(self):
+        _, auth = self.user()
+        params = {"limit": 20}
+        if self.rng.random() < 0.3:
+            params["categoryId"] = self.rng.choice(self.catalog["categories"])
+        endpoint = "GET /api/listings" + ("?categoryId" if "categoryId" in params else "")
+        r = await self.rec.call(self.http, endpoint, "GET", "/api/listings", params=params, headers=auth)
+        for _ in range(2):
+            cursor = r.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+            r = await self.rec.call(
+                self.http, "GET /api/listings?cursor", "GET", "/api/listings",
+                params={**params, "cursor": cursor}, headers=auth,
+            )
+
+    async def search(self):
+        from scripts.bench_search import QUERIES
+
+        _, auth = self.user()
+        await self.rec.call(
+            self.http, "GET /api/listings?q", "GET", "/api/listings",
+            params={"q": self.rng.choice(QUERIES), "limit": 20}, headers=auth,
+        )
+
+    async def favorite(self):
+        uid, auth = self.user()
+        lid = self.listing_for(uid)
+        await self.rec.call(self.http, "POST /favorites", "POST", "/favorites", json={"listingId": lid}, headers=auth)
+        await self.rec.call(self.http, "GET /favorites?live", "GET", "/favorites", params={"live": "true"}, headers=auth)
+        if self.rng.random() < 0.5:
+            await self.rec.call(
+                self.http, "DELETE /favorites/by-listing/{listing_id}", "DELETE",
+                f"/favorites/by-listing/{lid}", headers=auth,
+            )
+
+    async def checkout(self):
+        uid, auth = self.user()
+        for _ in range(2):
+            await self.rec.call(
+                self.http, "POST /cart/items", "POST", "/cart/items",
+                json={"listingId": self.listing_for(uid), "quantity": 1}, headers=auth,
+            )
+        await self.rec.call(
+            self.http, "POST /cart/checkout", "POST", "/cart/checkout",
+            json={"shippingAddress": "Rua do Teste, 1"},
+            headers={**auth, "Idempotency-Key": str(uuid.uuid4())},
+        )
+
+    async def upload(self):
+        _, auth = self.user()
+        r = await self.rec.call(
+            self.http, "POST /api/listings/upload", "POST", "/api/listings/upload",
+            files=[("files", ("foto.png", tiny_png(self.rng.randrange(1 << 24)), "image/png"))], headers=auth,
+        )
+        if r.status_code == 201:
+            await self.rec.call(
+                self.http, "POST /api/listings", "POST", "/api/listings",
+                json={"title": "Lote de teste", "description": "carga", "price": 10, "stock": 5,
+                      "categoryId": self.rng.choice(self.catalog["categories"]), "images": r.json()},
+                headers=auth,
+            )
+
+
+async def run_mixed(scenarios: Scenarios, weights: Dict[str, float], concurrency: int, duration: float) -> float:
+    names = [n for n, w in weights.items() if w > 0]
+    cum = [weights[n] for n in names]
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            name = scenarios.rng.choices(names, weights=cum)[0]
+            await getattr(scenarios, name)()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - t0
+
+
+async def run_burst(scenarios: Scenarios, size: int) -> float:
+    t0 = time.perf_counter()
+    await asyncio.gather(*(scenarios.checkout() for _ in range(size)))
+    return time.perf_counter() - t0
+
+
+# ===== saída =====
+def print_phase(name: str, phase: dict) -> None:
+    print(f"\n[{name}] {phase['requests']} requisições em {phase['elapsedS']}s = {phase['throughputRps']} req/s")
+    print(f"{'endpoint':<44} {'n':>6} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'5xx':>5}")
+    for ep, s in phase["endpoints"].items():
+        print(f"{ep:<44} {s['requests']:>6} {s['throughputRps']:>8} {s['p50Ms']:>8} {s['p95Ms']:>8} {s['p99Ms']:>8} {s['errors']:>5}")
+
+
+def print_compare(current: dict, previous: dict) -> None:
+    print("\nvariação x execução anterior (p95 e req/s; + = pior latência / mais vazão)")
+    for name, phase in current["phases"].items():
+        old_phase = previous.get("phases", {}).get(name, {})
+        for ep, s in phase["endpoints"].items():
+            old = old_phase.get("endpoints", {}).get(ep)
+            if not old:
+                continue
+            dp95 = (s["p95Ms"] - old["p95Ms"]) / old["p95Ms"] * 100 if old["p95Ms"] else 0.0
+            drps = (s["throughputRps"] - old["throughputRps"]) / old["throughputRps"] * 100 if old["throughputRps"] else 0.0
+            print(f"[{name}] {ep:<44} p95 {old['p95Ms']:>8} -> {s['p95Ms']:>8} ({dp95:+.1f}%)  req/s {drps:+.1f}%")
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args) -> int:
+    import httpx
+    from app.core.config import settings
+    from app.core.security import create_access_token
+    from app.db import mongo
+    from app.db.indexes import ensure_indexes
+
+    if args.mock:
+        from mongomock_motor import AsyncMongoMockClient
+
+        mongo.client = AsyncMongoMockClient()
+    client = await mongo.get_client()
+    if not settings.MONGO_DB_NAME.endswith(DB_SUFFIX):
+        # o banco é apagado no começo e no fim: nunca um nome que não seja de teste
+        print(f"recusado: o banco {settings.MONGO_DB_NAME!r} não termina em {DB_SUFFIX!r}")
+        return 2
+    await client.drop_database(settings.MONGO_DB_NAME)
+    db = client[settings.MONGO_DB_NAME]
+    if not args.mock:
+        await ensure_indexes(db)
+
+    from app.main import app
+
+    rng = random.Random(args.seed)
+    t0 = time.perf_counter()
+    catalog = await seed_catalog(db, rng, args.users, args.listings, args.favorites, args.orders)
+    print(f"catálogo: {args.users} usuários, {args.listings} anúncios, {args.favorites} favoritos, "
+          f"{args.orders} pedidos em {time.perf_counter() - t0:.1f}s")
+
+    weights = dict(SCENARIOS)
+    for name in args.skip:
+        weights.pop(name, None)
+    if args.mock:
+        weights.pop("search", None)  # mongomock não implementa $text
+
+    tokens = {u: {"Authorization": f"Bearer {create_access_token(u)}"} for u in catalog["users"]}
+    phases = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as http:
+        rec = Recorder()
+        elapsed = await run_mixed(Scenarios(http, rec, catalog, rng, tokens), weights, args.concurrency, args.duration)
+        phases["mixed"] = rec.report(elapsed)
+        if args.burst and "checkout" in weights:
+            rec = Recorder()
+            elapsed = await run_burst(Scenarios(http, rec, catalog, rng, tokens), args.burst)
+            phases["burst"] = rec.report(elapsed)
+
+    result = {
+        "startedAt": datetime.now(timezone.utc).isoformat(),
+        "git": git_revision(),
+        "environment": {
+            "python": platform.python_version(),
+            "backend": "mongomock-motor" if args.mock else "mongodb",
+            "transactions": await mongo.transactions_enabled(),
+            "cache": settings.CACHE_BACKEND,
+        },
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "scenarios": weights,
+        "phases": phases,
+    }
+    for name, phase in phases.items():
+        print_phase(name, phase)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_compare(result, json.load(f))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"\nresultado gravado em {args.out}")
+
+    if not args.keep:
+        await client.drop_database(settings.MONGO_DB_NAME)
+        if settings.MEDIA_DIR == os.environ.get("LOADTEST_MEDIA_DIR"):
+            shutil.rmtree(settings.MEDIA_DIR, ignore_errors=True)
+    errors = sum(s["errors"] for p in phases.values() for s in p["endpoints"].values())
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--listings", type=int, default=2000)
+    parser.add_argument("--favorites", type=int, default=2000)
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16, help="workers da fase mixed")
+    parser.add_argument("--duration", type=float, default=20, help="segundos da fase mixed")
+    parser.add_argument("--burst", type=int, default=50, help="checkouts simultâneos da fase burst (0 desliga)")
+    parser.add_argument("--skip", nargs="*", default=[], choices=sorted(SCENARIOS), help="cenários a pular")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mock", action="store_true", help="usa mongomock-motor em vez de MONGODB_URI")
+    parser.add_argument("--keep", action="store_true", help="não apaga o banco no final")
+    parser.add_argument("--db", default=f"appdb{DB_SUFFIX}", help=f"banco descartável (precisa terminar em {DB_SUFFIX})")
+    parser.add_argument("--out", help="arquivo JSON com o resultado")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args()
+
+    if not args.db.endswith(DB_SUFFIX):
+        parser.error(f"--db precisa terminar em {DB_SUFFIX} (o banco é apagado)")
+    # sempre um banco próprio, mesmo com MONGO_DB_NAME exportado no shell
+    os.environ["MONGO_DB_NAME"] = args.db
+    if "MEDIA_DIR" not in os.environ:
+        # uploads vão para uma pasta temporária, apagada no final (salvo --keep)
+        os.environ["MEDIA_DIR"] = os.environ["LOADTEST_MEDIA_DIR"] = tempfile.mkdtemp(prefix="loadtest_media_")
+    if args.mock:
+        os.environ.setdefault("MONGODB_URI", "mongodb://mock")
+        os.environ.setdefault("MONGO_TRANSACTIONS", "false")  # mongomock não tem sessões
+    sys.exit(asyncio.run(main(args)))
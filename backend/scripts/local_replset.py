@@ -0,0 +1,130 @@
+# scripts/local_replset.py
+"""
+Sobe um replica set local (3 mongod em pastas temporárias) para testar
+transações do checkout e o roteamento de leituras para secundários.
+
+Uso (a partir de backend/, com o binário mongod no PATH):
+    python -m scripts.local_replset                 # sobe e fica rodando (Ctrl+C encerra)
+    python -m scripts.local_replset --check-routing # sobe, confere e encerra
+
+--check-routing faz uma leitura por perfil de app.db.mongo.READ_ROUTES
+usando as dependências read_db reais e mostra qual membro respondeu
+(primário ou secundário), via CommandListener.
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+from pymongo import MongoClient, monitoring
+
+
+def start_members(n: int, base_port: int, rs: str):
+    root = tempfile.mkdtemp(prefix="reuse-rs-")
+    procs = []
+    for i in range(n):
+        dbpath = os.path.join(root, f"m{i}")
+        os.makedirs(dbpath)
+        procs.append(subprocess.Popen(
+            ["mongod", "--replSet", rs, "--port", str(base_port + i), "--dbpath", dbpath,
+             "--bind_ip", "127.0.0.1", "--quiet", "--logpath", os.path.join(dbpath, "mongod.log")],
+        ))
+    return root, procs
+
+
+def initiate(n: int, base_port: int, rs: str, timeout: float = 60) -> str:
+    seed = MongoClient(f"mongodb://127.0.0.1:{base_port}", directConnection=True, serverSelectionTimeoutMS=timeout * 1000)
+    seed.admin.command("replSetInitiate", {
+        "_id": rs,
+        "members": [
+            # o primeiro membro tem prioridade para ser sempre o primário
+            {"_id": i, "host": f"127.0.0.1:{base_port + i}", "priority": 2 if i == 0 else 1}
+            for i in range(n)
+        ],
+    })
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = seed.admin.command("replSetGetStatus")
+        states = [m["stateStr"] for m in status["members"]]
+        if states.count("PRIMARY") == 1 and states.count("SECONDARY") == n - 1:
+            break
+        time.sleep(0.5)
+    else:
+        raise RuntimeError("replica set não ficou pronto a tempo")
+    seed.close()
+    hosts = ",".join(f"127.0.0.1:{base_port + i}" for i in range(n))
+    return f"mongodb://{hosts}/?replicaSet={rs}"
+
+
+class ServedBy(monitoring.CommandListener):
+    def __init__(self):
+        self.last = None
+
+    def started(self, event):
+        if event.command_name == "find":
+            self.last = event.connection_id
+
+    def succeeded(self, event): pass
+    def failed(self, event): pass
+
+
+async def check_routing(uri: str):
+    os.environ["MONGODB_URI"] = uri
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from app.db import mongo
+
+    listener = ServedBy()
+    opts = mongo.client_options()
+    opts["event_listeners"] = [*opts["event_listeners"], listener]
+    mongo.client = AsyncIOMotorClient(uri, **opts)
+    cli = await mongo.open_client()
+    primary = (await cli.admin.command("hello"))["primary"]
+
+    for route in mongo.READ_ROUTES:
+        db = await mongo.read_db(route)()
+        await db["routing_probe"].find_one({})
+        host = "%s:%s" % listener.last
+        role = "primário" if host == primary else "secundário"
+        print(f"{route:>10}: {db.read_preference!r:<60} -> {host} ({role})")
+    mongo.close_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=3)
+    parser.add_argument("--port", type=int, default=27117)
+    parser.add_argument("--name", default="rs0")
+    parser.add_argument("--check-routing", action="store_true")
+    args = parser.parse_args()
+
+    if shutil.which("mongod") is None:
+        raise SystemExit("mongod não encontrado no PATH")
+
+    root, procs = start_members(args.members, args.port, args.name)
+    try:
+        uri = initiate(args.members, args.port, args.name)
+        print(f"MONGODB_URI={uri}")
+        if args.check_routing:
+            os.environ.setdefault("MONGO_READ_PREFERENCE", "secondaryPreferred")
+            os.environ.setdefault("MONGO_READ_ROUTES", "orders=primary")
+            asyncio.run(check_routing(uri))
+        else:
+            print("Ctrl+C para encerrar")
+            while True:
+                time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.wait()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# scripts/rebuild_seller_stats.py
+"""
+Recalcula o painel dos vendedores (seller_stats e listing_stats) a partir
+de orders e listings e compara com os contadores incrementais gravados.
+
+Sem --apply só mostra as divergências (sai com código 1 se houver);
+com --apply grava os valores recalculados (upsert por documento; ids
+que não existem mais são apagados).
+
+Uso (a partir de backend/):
+    python -m scripts.rebuild_seller_stats            # confere
+    python -m scripts.rebuild_seller_stats --apply    # corrige
+"""
+import argparse
+import asyncio
+import sys
+
+from app.db.mongo import get_db
+from app.services.seller_stats import (
+    LISTING_COUNTERS, SELLER_COUNTERS, compute_stats, diff_stats, rebuild_stats,
+)
+
+
+async def main(apply: bool) -> int:
+    db = await get_db()
+
+    if apply:
+        sellers, listings = await rebuild_stats(db)
+        print(f"reconstruído: {sellers} vendedores, {listings} anúncios")
+        return 0
+
+    seller_docs, listing_docs = await compute_stats(db)
+    diffs = [
+        ("vendedor", *d) for d in diff_stats(
+            await db["seller_stats"].find().to_list(length=None), seller_docs, SELLER_COUNTERS)
+    ] + [
+        ("anúncio", *d) for d in diff_stats(
+            await db["listing_stats"].find().to_list(length=None), listing_docs, LISTING_COUNTERS)
+    ]
+    for kind, _id, field, got, expected in diffs:
+        print(f"{kind} {_id} {field}: gravado={got} esperado={expected}")
+    print(f"{len(seller_docs)} vendedores, {len(listing_docs)} anúncios, {len(diffs)} divergências")
+    return 1 if diffs else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apply", action="store_true")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.apply)))
@@ -0,0 +1,119 @@
+# scripts/stress_cancel.py
+"""
+Teste de estresse de cancelamento concorrente com checkout.
+
+Num banco descartável cria um anúncio com estoque S e P pedidos de Q
+unidades. Depois dispara, ao mesmo tempo:
+  - R cancelamentos de cada pedido (o mesmo pedido cancelado em paralelo);
+  - B compras novas do mesmo anúncio.
+E confere as invariantes:
+  - cada pedido foi cancelado uma vez só (um 200, o resto 409);
+  - estoque final == S - unidades dos pedidos não cancelados (nada
+    devolvido duas vezes, nada vendido além do estoque);
+  - o painel do vendedor bate com o recálculo a partir de orders.
+
+Uso (a partir de backend/, com MONGODB_URI apontando para um replica set):
+    python -m scripts.stress_cancel --stock 60 --orders 20 --repeat 4 --buyers 40
+    MONGO_TRANSACTIONS=false python -m scripts.stress_cancel   # modo standalone
+"""
+import argparse
+import asyncio
+import os
+import sys
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+
+async def main(stock: int, n_orders: int, repeat: int, buyers: int, qty: int) -> int:
+    import httpx
+    from bson import ObjectId
+
+    from app.core.config import settings
+    from app.core.security import create_access_token
+    from app.db.mongo import get_client
+    from app.main import app
+    from app.services.seller_stats import SELLER_COUNTERS, compute_stats, diff_stats, record_listing_change
+
+    client = await get_client()
+    db = client[settings.MONGO_DB_NAME]
+    now = datetime.now(timezone.utc)
+    seller_id = ObjectId()
+    listing = {
+        "title": "stress", "description": "stress", "price": 1.0, "stock": stock,
+        "categoryId": ObjectId(), "images": [], "status": "active",
+        "sellerId": seller_id, "createdAt": now, "updatedAt": now,
+    }
+    listing_id = (await db["listings"].insert_one(listing)).inserted_id
+    await record_listing_change(db, seller_id, None, listing)  # como o POST /listings faria
+    body = {"items": [{"listingId": str(listing_id), "quantity": qty}], "notes": "stress"}
+
+    def auth(uid: str) -> dict:
+        return {"Authorization": f"Bearer {create_access_token(uid)}"}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://stress") as http:
+        # 1) pedidos iniciais
+        owners = {}
+        for _ in range(n_orders):
+            uid = str(ObjectId())
+            r = await http.post("/orders", json=body, headers=auth(uid))
+            if r.status_code == 201:
+                owners[r.json()["id"]] = uid
+        print(f"pedidos iniciais: {len(owners)}")
+
+        # 2) cancelamentos repetidos + compras novas, tudo junto
+        async def cancel(order_id: str):
+            r = await http.patch(
+                f"/orders/{order_id}/status", params={"new_status": "cancelled"}, headers=auth(owners[order_id])
+            )
+            return "cancel", order_id, r.status_code
+
+        async def buy():
+            r = await http.post("/orders", json=body, headers=auth(str(ObjectId())))
+            return "buy", None, r.status_code
+
+        jobs = [cancel(o) for o in owners for _ in range(repeat)] + [buy() for _ in range(buyers)]
+        results = await asyncio.gather(*jobs)
+
+    per_order = defaultdict(Counter)
+    buys = Counter()
+    for kind, order_id, code in results:
+        if kind == "cancel":
+            per_order[order_id][code] += 1
+        else:
+            buys[code] += 1
+
+    cancelled_once = all(c[200] == 1 and c[409] == repeat - 1 for c in per_order.values())
+    final = (await db["listings"].find_one({"_id": listing_id}))["stock"]
+    live = await db["orders"].count_documents({"items.listingId": str(listing_id), "status": {"$ne": "cancelled"}})
+    expected = stock - live * qty
+
+    seller_docs, _ = await compute_stats(db)
+    stored = await db["seller_stats"].find({"_id": str(seller_id)}).to_list(length=1)
+    stats_diff = diff_stats(stored, [d for d in seller_docs if d["_id"] == str(seller_id)], SELLER_COUNTERS)
+
+    print(f"cancelamentos por pedido: {dict(Counter(tuple(sorted(c.items())) for c in per_order.values()))}")
+    print(f"compras novas: {dict(buys)}")
+    print(f"estoque inicial={stock} final={final} esperado={expected} pedidos ativos={live}")
+    print(f"painel do vendedor: {'ok' if not stats_diff else stats_diff}")
+
+    ok = cancelled_once and final == expected and final >= 0 and not stats_diff
+    print("OK" if ok else "FALHOU: invariantes violadas")
+
+    await db["orders"].delete_many({"items.listingId": str(listing_id)})
+    await db["listings"].delete_one({"_id": listing_id})
+    await db["seller_stats"].delete_one({"_id": str(seller_id)})
+    await db["listing_stats"].delete_one({"_id": str(listing_id)})
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stock", type=int, default=60)
+    parser.add_argument("--orders", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=4, help="cancelamentos simultâneos de cada pedido")
+    parser.add_argument("--buyers", type=int, default=40)
+    parser.add_argument("--qty", type=int, default=2)
+    args = parser.parse_args()
+    os.environ.setdefault("MONGO_DB_NAME", "appdb_stress")
+    sys.exit(asyncio.run(main(args.stock, args.orders, args.repeat, args.buyers, args.qty)))
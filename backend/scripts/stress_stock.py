@@ -0,0 +1,77 @@
+# scripts/stress_stock.py
+"""
+Teste de estresse do checkout: muitas corrotinas comprando o mesmo anúncio.
+
+Cria um anúncio com estoque S num banco descartável, dispara C pedidos
+concorrentes de Q unidades contra o app real (httpx + ASGITransport) e
+confere as invariantes:
+  - o estoque final nunca é negativo;
+  - unidades vendidas (pedidos 201 * Q) == S - estoque final;
+  - nº de pedidos gravados == nº de respostas 201.
+
+Uso (a partir de backend/, com MONGODB_URI apontando para um replica set):
+    python -m scripts.stress_stock --stock 100 --buyers 500 --qty 3
+    MONGO_TRANSACTIONS=false python -m scripts.stress_stock   # modo standalone
+"""
+import argparse
+import asyncio
+import os
+import sys
+from collections import Counter
+from datetime import datetime, timezone
+
+
+async def main(stock: int, buyers: int, qty: int) -> int:
+    import httpx
+    from bson import ObjectId
+
+    from app.core.config import settings
+    from app.core.security import create_access_token
+    from app.db.mongo import get_client
+    from app.main import app
+
+    client = await get_client()
+    db = client[settings.MONGO_DB_NAME]
+    now = datetime.now(timezone.utc)
+    listing_id = (await db["listings"].insert_one({
+        "title": "stress", "description": "stress", "price": 1.0, "stock": stock,
+        "categoryId": ObjectId(), "images": [], "status": "active",
+        "sellerId": ObjectId(), "createdAt": now, "updatedAt": now,
+    })).inserted_id
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://stress") as http:
+        async def buy(i: int) -> int:
+            token = create_access_token(str(ObjectId()))
+            r = await http.post(
+                "/orders",
+                json={"items": [{"listingId": str(listing_id), "quantity": qty}], "notes": "stress"},
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            return r.status_code
+
+        codes = Counter(await asyncio.gather(*(buy(i) for i in range(buyers))))
+
+    final = (await db["listings"].find_one({"_id": listing_id}))["stock"]
+    orders = await db["orders"].count_documents({"items.listingId": str(listing_id)})
+    sold = codes[201] * qty
+
+    print(f"respostas: {dict(codes)}")
+    print(f"estoque inicial={stock} final={final} vendido={sold} pedidos={orders}")
+
+    ok = final >= 0 and sold == stock - final and orders == codes[201]
+    print("OK" if ok else "FALHOU: invariantes de estoque violadas")
+
+    await db["orders"].delete_many({"items.listingId": str(listing_id)})
+    await db["listings"].delete_one({"_id": listing_id})
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--buyers", type=int, default=500)
+    parser.add_argument("--qty", type=int, default=3)
+    args = parser.parse_args()
+    os.environ.setdefault("MONGO_DB_NAME", "appdb_stress")
+    sys.exit(asyncio.run(main(args.stock, args.buyers, args.qty)))
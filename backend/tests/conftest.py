@@ -0,0 +1,70 @@
+# tests/conftest.py
+"""
+Fixtures dos testes: app real via httpx + ASGITransport sobre mongomock-motor.
+
+mongomock não tem sessões, então os testes rodam no modo standalone
+(MONGO_TRANSACTIONS=false), o caminho com compensação das escritas.
+"""
+import os
+from datetime import datetime, timezone
+
+os.environ.setdefault("MONGODB_URI", "mongodb://mock")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+os.environ["MONGO_DB_NAME"] = "appdb_test"
+os.environ["MONGO_TRANSACTIONS"] = "false"
+os.environ["CACHE_BACKEND"] = "off"
+
+import httpx
+import pytest
+from bson import ObjectId
+from mongomock_motor import AsyncMongoMockClient
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.db import mongo
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def db():
+    mongo.client = AsyncMongoMockClient()
+    yield mongo.client[settings.MONGO_DB_NAME]
+    mongo.client = None
+
+
+@pytest.fixture
+async def http(db):
+    from app.main import app
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+def _auth(user_id: str) -> dict:
+    return {"Authorization": f"Bearer {create_access_token(user_id)}"}
+
+
+@pytest.fixture
+def auth():
+    """Headers com o token de um usuário: auth(user_id)."""
+    return _auth
+
+
+@pytest.fixture
+def make_listing(db):
+    """Insere um anúncio ativo direto no banco: await make_listing(stock=..., price=...)."""
+
+    async def make(stock: int, price: float = 10.0) -> ObjectId:
+        now = datetime.now(timezone.utc)
+        result = await db["listings"].insert_one({
+            "title": "teste", "description": "d", "price": price, "stock": stock,
+            "categoryId": ObjectId(), "images": [], "status": "active",
+            "sellerId": ObjectId(), "createdAt": now, "updatedAt": now,
+        })
+        return result.inserted_id
+
+    return make
@@ -0,0 +1,22 @@
+# tests/test_admin.py
+import pytest
+from bson import ObjectId
+
+from app.core import deps
+from app.main import API_PREFIX
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def admin(monkeypatch):
+    admin_id = str(ObjectId())
+    monkeypatch.setattr(deps, "ADMIN_USER_IDS", frozenset({admin_id}))
+    return admin_id
+
+
+@pytest.mark.parametrize("path", ["/db/pool", "/cache/stats"])
+async def test_internal_stats_require_admin(http, auth, admin, path):
+    assert (await http.get(API_PREFIX + path)).status_code == 401
+    assert (await http.get(API_PREFIX + path, headers=auth(str(ObjectId())))).status_code == 403
+    assert (await http.get(API_PREFIX + path, headers=auth(admin))).status_code == 200
@@ -0,0 +1,36 @@
+# tests/test_auth.py
+import threading
+import time
+
+from app.core.deps import VerifiedTokenCache
+
+
+def test_revoked_token_is_not_cached_again():
+    cache = VerifiedTokenCache(10)
+    exp = time.time() + 60
+    # requisição passou pelo is_revoked e ainda decodificava quando o token foi revogado
+    cache.revoke("t", exp)
+    cache.put("t", "user", exp)
+    assert cache.get("t") is None
+
+
+def test_expired_entry_read_from_many_threads():
+    cache = VerifiedTokenCache(1000)
+    errors = []
+
+    def read():
+        try:
+            for i in range(200):
+                cache.get(f"t{i}")
+        except Exception as e:  # KeyError sem o lock
+            errors.append(e)
+
+    for _ in range(20):
+        for i in range(200):
+            cache.put(f"t{i}", "user", time.time() - 1)
+        threads = [threading.Thread(target=read) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    assert errors == []
@@ -0,0 +1,52 @@
+# tests/test_cart.py
+import asyncio
+from collections import Counter
+
+import pytest
+from bson import ObjectId
+
+from app.routers import cart as cart_router
+
+pytestmark = pytest.mark.anyio
+
+
+async def fill_cart(http, headers, listing_id: ObjectId, quantity: int) -> None:
+    r = await http.post("/cart/items", json={"listingId": str(listing_id), "quantity": quantity}, headers=headers)
+    assert r.status_code == 200
+
+
+async def test_concurrent_checkouts_place_one_order(db, http, auth, make_listing, monkeypatch):
+    headers = auth(str(ObjectId()))
+    listing_id = await make_listing(stock=10)
+    await fill_cart(http, headers, listing_id, 2)
+
+    # todas as requisições leem o carrinho antes de qualquer uma escrever
+    run_in_transaction = cart_router.run_in_transaction
+
+    async def after_all_reads(fn):
+        await asyncio.sleep(0.01)
+        return await run_in_transaction(fn)
+
+    monkeypatch.setattr(cart_router, "run_in_transaction", after_all_reads)
+
+    responses = await asyncio.gather(*(http.post("/cart/checkout", json={}, headers=headers) for _ in range(4)))
+
+    assert Counter(r.status_code for r in responses) == {201: 1, 409: 3}
+    assert await db["orders"].count_documents({}) == 1
+    assert (await db["listings"].find_one({"_id": listing_id}))["stock"] == 8
+    assert (await http.get("/cart", headers=headers)).json()["items"] == []
+
+
+async def test_failed_checkout_restores_the_cart(db, http, auth, make_listing):
+    headers = auth(str(ObjectId()))
+    listing_id = await make_listing(stock=3)
+    await fill_cart(http, headers, listing_id, 3)
+    # outro comprador levou parte do estoque depois do snapshot
+    await db["listings"].update_one({"_id": listing_id}, {"$set": {"stock": 1}})
+
+    r = await http.post("/cart/checkout", json={}, headers=headers)
+
+    assert r.status_code == 409
+    assert await db["orders"].count_documents({}) == 0
+    cart = (await http.get("/cart", headers=headers)).json()
+    assert [i["quantity"] for i in cart["items"]] == [3]
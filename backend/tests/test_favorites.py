@@ -0,0 +1,49 @@
+# tests/test_favorites.py
+import asyncio
+
+import pytest
+
+from app.services.favorites import FavoriteIdCache
+
+pytestmark = pytest.mark.anyio
+
+
+class SlowFavorites:
+    """Coleção cuja leitura só termina quando `release` é liberado."""
+
+    def __init__(self, listing_ids):
+        self.listing_ids = listing_ids
+        self.release = asyncio.Event()
+
+    def find(self, query, projection):
+        async def rows():
+            await self.release.wait()
+            for lid in self.listing_ids:
+                yield {"listingId": lid}
+
+        return rows()
+
+
+async def test_load_older_than_a_change_is_not_cached():
+    cache = FavoriteIdCache(max_users=10, ttl=60)
+    favorites = SlowFavorites(["a"])
+
+    load = asyncio.create_task(cache.get(favorites, "u1"))
+    await asyncio.sleep(0)
+    await cache.added("u1", "b")  # favoritou enquanto a carga lia o banco
+    favorites.release.set()
+    await load
+
+    # a carga antiga não foi para o cache: a próxima leitura vai ao banco de novo
+    favorites.listing_ids = ["a", "b"]
+    assert await cache.get(favorites, "u1") == frozenset({"a", "b"})
+
+
+async def test_load_without_changes_is_cached():
+    cache = FavoriteIdCache(max_users=10, ttl=60)
+    favorites = SlowFavorites(["a"])
+    favorites.release.set()
+
+    assert await cache.get(favorites, "u1") == frozenset({"a"})
+    favorites.listing_ids = []
+    assert await cache.get(favorites, "u1") == frozenset({"a"})
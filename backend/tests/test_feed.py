@@ -0,0 +1,55 @@
+# tests/test_feed.py
+import pytest
+from bson import ObjectId
+
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.main import API_PREFIX
+from app.services.cache import feed_cache
+
+pytestmark = pytest.mark.anyio
+
+FEED = f"{API_PREFIX}/listings"
+
+
+@pytest.fixture
+async def memory_cache(monkeypatch):
+    from app.services.cache import MemoryBackend
+
+    monkeypatch.setattr(feed_cache, "backend", MemoryBackend())
+    monkeypatch.setattr(feed_cache, "hits", 0)
+    monkeypatch.setattr(feed_cache, "misses", 0)
+
+
+async def test_users_share_one_cached_page(db, http, auth, make_listing, memory_cache):
+    for _ in range(3):
+        await make_listing(stock=1)
+
+    first = await http.get(FEED, params={"limit": 2}, headers=auth(str(ObjectId())))
+    second = await http.get(FEED, params={"limit": 2}, headers=auth(str(ObjectId())))
+
+    assert first.json() == second.json()
+    assert (feed_cache.misses, feed_cache.hits) == (1, 1)
+
+
+async def test_own_listings_removed_after_the_cache(db, http, auth, make_listing, memory_cache):
+    seller = ObjectId()
+    # do mais antigo para o mais novo: feed = A, B, OWN, C, D, E
+    e, d, c = [await make_listing(stock=1) for _ in range(3)]
+    own = await make_listing(stock=1)
+    await db["listings"].update_one({"_id": own}, {"$set": {"sellerId": seller}})
+    b, a = [await make_listing(stock=1) for _ in range(2)]
+
+    first = await http.get(FEED, params={"limit": 2}, headers=auth(str(ObjectId())))
+    assert [i["id"] for i in first.json()] == [str(a), str(b)]
+    cursor = first.headers[NEXT_CURSOR_HEADER]
+
+    buyer = await http.get(FEED, params={"limit": 2, "cursor": cursor}, headers=auth(str(ObjectId())))
+    mine = await http.get(FEED, params={"limit": 2, "cursor": cursor}, headers=auth(str(seller)))
+
+    assert [i["id"] for i in buyer.json()] == [str(own), str(c)]
+    # o vendedor não vê o próprio anúncio e a página continua com 2 itens (leitura a mais)
+    assert [i["id"] for i in mine.json()] == [str(c), str(d)]
+    params = {"limit": 2, "cursor": mine.headers[NEXT_CURSOR_HEADER]}
+    after = await http.get(FEED, params=params, headers=auth(str(seller)))
+    assert [i["id"] for i in after.json()] == [str(e)]
+    assert feed_cache.hits == 1  # as duas páginas com o mesmo cursor vieram de uma entrada
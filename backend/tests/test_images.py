@@ -0,0 +1,47 @@
+# tests/test_images.py
+import hashlib
+
+import pytest
+from bson import ObjectId
+
+from app.core.config import settings
+from app.main import API_PREFIX
+from app.routers.anuncios.listings import attach_variants
+from app.services.images import VARIANT_WIDTHS, variant_name
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_variants_finished_after_create_are_attached(db, http, monkeypatch, tmp_path, auth):
+    monkeypatch.setattr(settings, "MEDIA_DIR", str(tmp_path))
+    name = hashlib.sha256(b"foto").hexdigest() + ".png"
+    (tmp_path / name).write_bytes(b"\x89PNG\r\n\x1a\n")
+    url = f"http://test/media/{name}"
+
+    # anúncio criado antes das miniaturas ficarem prontas
+    body = {
+        "title": "Bicicleta", "description": "aro 29", "price": 900, "stock": 1,
+        "categoryId": str(ObjectId()), "images": [url],
+    }
+    r = await http.post(f"{API_PREFIX}/listings", json=body, headers=auth(str(ObjectId())))
+    assert r.status_code == 201
+    listing_id = ObjectId(r.json()["id"])
+    assert (await db["listings"].find_one({"_id": listing_id}))["imageVariants"] == [None]
+
+    # fim da geração (background task do upload)
+    for width in VARIANT_WIDTHS:
+        (tmp_path / variant_name(name, width)).write_bytes(b"webp")
+    await attach_variants(db, [url], "test")
+
+    doc = await db["listings"].find_one({"_id": listing_id})
+    assert doc["imageVariants"][0]["w160"] == f"http://test/media/{variant_name(name, 160)}"
+
+
+async def test_external_images_are_left_alone(db, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "MEDIA_DIR", str(tmp_path))
+    url = "https://cdn.example.com/media/" + hashlib.sha256(b"x").hexdigest() + ".png"
+    await db["listings"].insert_one({"images": [url], "imageVariants": [None]})
+
+    await attach_variants(db, [url], "test")
+
+    assert (await db["listings"].find_one({}))["imageVariants"] == [None]
@@ -0,0 +1,21 @@
+# tests/test_metrics.py
+import pytest
+from bson import ObjectId
+
+from app.core import metrics
+from app.core.config import settings
+from app.main import API_PREFIX
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_route_labels_drop_the_api_prefix(http, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_ENABLED", True)
+
+    await http.get(f"{API_PREFIX}/health")
+    await http.get(f"{API_PREFIX}/listings/{ObjectId()}")
+    await http.get(f"{API_PREFIX}/nao-existe")
+
+    routes = {labels[1] for labels in metrics.http_requests._values}
+    assert {"/health", "/listings/{listing_id}", "unmatched"} <= routes
+    assert not any(r.startswith(API_PREFIX + "/") for r in routes)
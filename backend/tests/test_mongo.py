@@ -0,0 +1,21 @@
+# tests/test_mongo.py
+import pytest
+
+from app.db import mongo
+
+
+def test_read_routes_validated(monkeypatch):
+    monkeypatch.setattr(mongo.settings, "MONGO_READ_ROUTES", "feed=secondaryPreferred,orders=primaryPreferred")
+    mongo.check_read_routes()
+
+
+@pytest.mark.parametrize("routes, preference", [
+    ("feed=secondaryPrefered", "primary"),   # modo com erro de digitação
+    ("", "nearestt"),                        # padrão inválido
+    ("fed=secondary", "primary"),            # rota que não existe
+])
+def test_invalid_read_routes_fail_at_startup(monkeypatch, routes, preference):
+    monkeypatch.setattr(mongo.settings, "MONGO_READ_ROUTES", routes)
+    monkeypatch.setattr(mongo.settings, "MONGO_READ_PREFERENCE", preference)
+    with pytest.raises(ValueError):
+        mongo.check_read_routes()
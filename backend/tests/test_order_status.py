@@ -0,0 +1,63 @@
+# tests/test_order_status.py
+import asyncio
+from collections import Counter
+
+import pytest
+from bson import ObjectId
+
+from app.db.mongo import run_in_transaction
+from app.services.orders import transition_order
+
+pytestmark = pytest.mark.anyio
+
+
+async def place(http, auth, user_id: str, listing_id: ObjectId, quantity: int) -> str:
+    body = {"items": [{"listingId": str(listing_id), "quantity": quantity}]}
+    r = await http.post("/orders", json=body, headers=auth(user_id))
+    assert r.status_code == 201
+    return r.json()["id"]
+
+
+async def stock_of(db, listing_id: ObjectId) -> int:
+    return (await db["listings"].find_one({"_id": listing_id}))["stock"]
+
+
+async def test_double_cancel_restocks_once(db, http, auth, make_listing):
+    user_id = str(ObjectId())
+    listing_id = await make_listing(stock=10)
+    order_id = await place(http, auth, user_id, listing_id, 3)
+    assert await stock_of(db, listing_id) == 7
+
+    responses = await asyncio.gather(*(
+        http.patch(f"/orders/{order_id}/status", params={"new_status": "cancelled"}, headers=auth(user_id))
+        for _ in range(5)
+    ))
+
+    assert Counter(r.status_code for r in responses) == {200: 1, 409: 4}
+    assert await stock_of(db, listing_id) == 10
+    order = await db["orders"].find_one({"_id": ObjectId(order_id)})
+    assert order["status"] == "cancelled"
+    # a venda foi descontada do painel uma vez só
+    stats = await db["listing_stats"].find_one({"_id": str(listing_id)})
+    assert stats["unitsSold"] == 0
+
+
+@pytest.mark.parametrize("first", ["shipped", "cancelled"])
+async def test_cancel_and_ship_race_has_one_winner(db, http, first, auth, make_listing):
+    user_id = str(ObjectId())
+    listing_id = await make_listing(stock=10)
+    order_oid = ObjectId(await place(http, auth, user_id, listing_id, 4))
+    await db["orders"].update_one({"_id": order_oid}, {"$set": {"status": "paid"}})
+
+    # o envio vem do vendedor/backoffice: chama o serviço direto, como a rota faria
+    second = "cancelled" if first == "shipped" else "shipped"
+    results = await asyncio.gather(*(
+        run_in_transaction(lambda session, s=s: transition_order(db, order_oid, user_id, s, session=session))
+        for s in (first, second)
+    ))
+
+    winners = [r["status"] for r in results if r is not None]
+    assert len(winners) == 1
+    order = await db["orders"].find_one({"_id": order_oid})
+    assert order["status"] == winners[0]
+    assert await stock_of(db, listing_id) == (10 if winners[0] == "cancelled" else 6)
@@ -0,0 +1,32 @@
+# tests/test_orders.py
+import pytest
+from bson import ObjectId
+
+from app.services.serializers import ORDER_SUMMARY_FIELDS, ORDER_SUMMARY_PROJECTION, order_summary_projection
+
+pytestmark = pytest.mark.anyio
+
+
+def test_summary_projection_follows_fields():
+    assert order_summary_projection(None) == ORDER_SUMMARY_PROJECTION
+
+    projection = order_summary_projection(ORDER_SUMMARY_FIELDS.parse("id,total"))
+    assert set(projection) == {"_id", "status", "createdAt", "total"}
+
+    projection = order_summary_projection(ORDER_SUMMARY_FIELDS.parse("itemCount"))
+    assert projection["itemCount"] == ORDER_SUMMARY_PROJECTION["itemCount"]
+    assert "thumbnail" not in projection
+
+
+async def test_summary_with_fields(db, http, auth, make_listing):
+    listing_id = await make_listing(stock=5, price=12.5)
+    headers = auth(str(ObjectId()))
+    body = {"items": [{"listingId": str(listing_id), "quantity": 2}]}
+    assert (await http.post("/orders", json=body, headers=headers)).status_code == 201
+
+    r = await http.get("/orders", params={"summary": "true", "fields": "id,itemCount"}, headers=headers)
+
+    assert r.status_code == 200
+    [order] = r.json()
+    assert set(order) == {"id", "itemCount"}
+    assert order["itemCount"] == 2
@@ -0,0 +1,38 @@
+# tests/test_profiler.py
+import asyncio
+import threading
+
+import pytest
+
+from app.db.profiler import SlowQueryProfiler
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeDatabase:
+    async def command(self, cmd):
+        return {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}, "executionStats": {"nReturned": 1}}
+
+
+class FakeClient:
+    def __getitem__(self, name):
+        return FakeDatabase()
+
+
+async def test_explain_scheduled_before_stop_still_runs():
+    profiler = SlowQueryProfiler(threshold_ms=1, max_shapes=10, explain=True)
+    profiler.start(FakeClient())
+
+    # evento chega da thread do driver e o lifespan encerra antes do callback rodar
+    thread = threading.Thread(
+        target=profiler._record, args=("find", "appdb", {"find": "listings", "filter": {"a": 1}}, 5.0)
+    )
+    thread.start()
+    thread.join()
+    profiler.stop()
+
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+    [entry] = profiler.snapshot()
+    assert entry["explain"]["collscan"] is True
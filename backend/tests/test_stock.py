@@ -0,0 +1,109 @@
+# tests/test_stock.py
+import asyncio
+from collections import Counter
+
+import pytest
+from bson import ObjectId
+
+from app.db import mongo
+from app.services.orders import place_order
+from app.services.seller_stats import record_order
+from app.services.stock import InsufficientStock, reserve_stock
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_concurrent_orders_never_oversell(db, http, auth, make_listing):
+    listing_id = await make_listing(stock=10)
+    body = {"items": [{"listingId": str(listing_id), "quantity": 1}]}
+
+    responses = await asyncio.gather(*(
+        http.post("/orders", json=body, headers=auth(str(ObjectId()))) for _ in range(30)
+    ))
+
+    # recusa pela leitura (400) ou pela escrita condicional (409), nunca venda a mais
+    codes = Counter(r.status_code for r in responses)
+    assert codes[201] == 10
+    assert set(codes) <= {201, 400, 409}
+    assert (await db["listings"].find_one({"_id": listing_id}))["stock"] == 0
+    assert await db["orders"].count_documents({}) == 10
+
+
+async def test_concurrent_reservations_never_oversell(db, make_listing):
+    listing_id = await make_listing(stock=7)
+
+    async def buy():
+        try:
+            await reserve_stock(db["listings"], {listing_id: 1})
+            return True
+        except InsufficientStock:
+            return False
+
+    results = await asyncio.gather(*(buy() for _ in range(20)))
+
+    doc = await db["listings"].find_one({"_id": listing_id})
+    assert sum(results) == 7
+    assert doc["stock"] == 0
+
+
+async def test_partial_reservation_is_compensated(db, make_listing):
+    enough = await make_listing(stock=5)
+    short = await make_listing(stock=1)
+
+    with pytest.raises(InsufficientStock):
+        await reserve_stock(db["listings"], {enough: 2, short: 3})
+
+    first = await db["listings"].find_one({"_id": enough})
+    assert first["stock"] == 5
+    assert (await db["listings"].find_one({"_id": short}))["stock"] == 1
+
+
+async def test_transactions_detected_from_hello(db, monkeypatch):
+    monkeypatch.setattr(mongo.settings, "MONGO_TRANSACTIONS", None)
+
+    # mongomock não responde hello: tratado como standalone
+    monkeypatch.setattr(mongo, "_transactions", None)
+    assert await mongo.transactions_enabled() is False
+
+    class ReplicaSetAdmin:
+        async def command(self, name):
+            return {"isWritablePrimary": True, "setName": "rs0"}
+
+    class ReplicaSetClient:
+        admin = ReplicaSetAdmin()
+
+    monkeypatch.setattr(mongo, "client", ReplicaSetClient())
+    monkeypatch.setattr(mongo, "_transactions", None)
+    assert await mongo.transactions_enabled() is True
+
+
+async def test_failed_order_insert_restores_stock(db, make_listing, monkeypatch):
+    listing_id = await make_listing(stock=5)
+
+    async def broken_insert(*args, **kwargs):
+        raise RuntimeError("primário caiu")
+
+    # classe da coleção do mongomock: as instâncias são criadas a cada db["orders"]
+    monkeypatch.setattr(type(db["orders"]), "insert_one", broken_insert)
+
+    with pytest.raises(RuntimeError):
+        await place_order(db, "u1", [], {listing_id: 2})
+
+    assert (await db["listings"].find_one({"_id": listing_id}))["stock"] == 5
+
+
+async def test_concurrent_orders_count_low_stock_once(db, make_listing):
+    # LOW_STOCK_THRESHOLD = 2: 4 -> 3 -> 2 cruza o limite uma vez só
+    listing_id = await make_listing(stock=4)
+    listing = await db["listings"].find_one({"_id": listing_id})
+    seller = str(listing["sellerId"])
+    item = {"listingId": str(listing_id), "quantity": 1, "lineTotal": 10.0, "sellerId": listing["sellerId"]}
+
+    # as duas reservas terminam antes de qualquer painel ser atualizado
+    first = await reserve_stock(db["listings"], {listing_id: 1})
+    second = await reserve_stock(db["listings"], {listing_id: 1})
+    for after in (first, second):
+        await record_order(db, {"items": [item]}, +1, stock_delta={listing_id: -1}, stock_after=after)
+
+    stats = await db["seller_stats"].find_one({"_id": seller})
+    assert stats["lowStockCount"] == 1
@@ -0,0 +1,55 @@
+# tests/test_upload.py
+import pytest
+from bson import ObjectId
+
+from app.core.config import settings
+from app.main import API_PREFIX
+from app.services import media
+
+pytestmark = pytest.mark.anyio
+
+UPLOAD = f"{API_PREFIX}/listings/upload"
+PNG = b"\x89PNG\r\n\x1a\n" + b"\0" * 1024
+
+
+@pytest.fixture
+def small_limit(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "UPLOAD_MAX_REQUEST_MB", 1)
+    monkeypatch.setattr(settings, "MEDIA_DIR", str(tmp_path))
+
+
+async def test_upload_within_limit(http, small_limit, auth):
+    r = await http.post(
+        UPLOAD, files={"files": ("a.png", PNG, "image/png")}, headers=auth(str(ObjectId()))
+    )
+    assert r.status_code == 201
+
+
+async def test_upload_rejected_by_content_length(http, small_limit, auth):
+    big = PNG + b"\0" * (2 * media.MB)
+    r = await http.post(
+        UPLOAD, files={"files": ("a.png", big, "image/png")}, headers=auth(str(ObjectId()))
+    )
+    assert r.status_code == 413
+
+
+async def test_chunked_upload_stops_at_limit(http, small_limit, auth):
+    boundary = "limite"
+    chunks_sent = 0
+
+    async def body():
+        nonlocal chunks_sent
+        yield (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="files"; filename="a.png"\r\n'
+            "Content-Type: image/png\r\n\r\n"
+        ).encode() + PNG
+        for _ in range(64):
+            chunks_sent += 1
+            yield b"\0" * (256 * 1024)
+        yield f"\r\n--{boundary}--\r\n".encode()
+
+    headers = {**auth(str(ObjectId())), "Content-Type": f"multipart/form-data; boundary={boundary}"}
+    r = await http.post(UPLOAD, content=body(), headers=headers)
+
+    assert r.status_code == 413
+    assert chunks_sent < 64